@@ -29,7 +29,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 # 导入应用配置和模型
 from app.core.config import settings
 from app.core.database import Base
-from app.models import *  # 导入所有模型
+import app.models  # noqa: F401  导入模型包以注册所有表到 Base.metadata
 
 # Alembic 配置对象
 config = context.config
@@ -44,9 +44,6 @@ if config.config_file_name is not None:
 # 目标元数据
 target_metadata = Base.metadata
 
-# 其他配置
-config.set_main_option("sqlalchemy.url", settings.database_url_sync)
-
 
 def run_migrations_offline() -> None:
     """
@@ -60,6 +57,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        compare_type=False,
     )
 
     with context.begin_transaction():
@@ -73,7 +71,11 @@ def do_run_migrations(connection: Connection) -> None:
     Args:
         connection: 数据库连接
     """
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=False,  # 跳过列类型反射比较
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -107,6 +109,11 @@ def run_migrations_online() -> None:
     
     连接到数据库并执行迁移
     """
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(run_async_migrations())
 
 
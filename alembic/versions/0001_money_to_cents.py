@@ -0,0 +1,59 @@
+"""money columns to integer cents
+
+将购物车、支付相关金额列由 Numeric(10, 2) 转换为 BigInteger（分）。
+仅转换当前仍为 Numeric 的列，已由 create_all 以 BigInteger 创建的库不受影响。
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+MONEY_COLUMNS = {
+    "carts": ["subtotal", "tax_amount", "shipping_fee", "discount_amount", "total_amount"],
+    "cart_items": ["unit_price", "total_price"],
+    "payments": ["amount", "fee_amount", "net_amount", "refunded_amount"],
+    "payment_refunds": ["amount"],
+}
+
+
+def _columns_of_type(type_cls):
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table, columns in MONEY_COLUMNS.items():
+        if table not in tables:
+            continue
+        types = {col["name"]: col["type"] for col in inspector.get_columns(table)}
+        for column in columns:
+            if isinstance(types.get(column), type_cls):
+                yield table, column
+
+
+def upgrade() -> None:
+    for table, column in list(_columns_of_type(sa.Numeric)):
+        op.alter_column(
+            table,
+            column,
+            type_=sa.BigInteger(),
+            postgresql_using=f"round({column} * 100)::bigint",
+        )
+
+
+def downgrade() -> None:
+    for table, column in list(_columns_of_type(sa.BigInteger)):
+        op.alter_column(
+            table,
+            column,
+            type_=sa.Numeric(10, 2),
+            postgresql_using=f"({column} / 100.0)::numeric(10, 2)",
+        )
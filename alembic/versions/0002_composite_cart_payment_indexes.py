@@ -0,0 +1,46 @@
+"""composite cart and payment indexes
+
+以复合（覆盖）索引替换购物车、支付表上的单列索引。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_carts_user_status_updated "
+        "ON carts (user_id, status, updated_at DESC) INCLUDE (item_count, total_amount)"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_carts_user")
+    op.execute("DROP INDEX IF EXISTS idx_carts_status")
+    op.execute("DROP INDEX IF EXISTS idx_carts_updated")
+
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_payments_order_status_created "
+        "ON payments (order_id, status, created_at DESC)"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_payments_order")
+    op.execute("DROP INDEX IF EXISTS idx_payments_status")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS idx_payments_status ON payments (status)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_payments_order ON payments (order_id)")
+    op.execute("DROP INDEX IF EXISTS idx_payments_order_status_created")
+
+    op.execute("CREATE INDEX IF NOT EXISTS idx_carts_updated ON carts (updated_at)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_carts_status ON carts (status)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_carts_user ON carts (user_id)")
+    op.execute("DROP INDEX IF EXISTS idx_carts_user_status_updated")
@@ -0,0 +1,83 @@
+"""cart/payment enum columns to varchar
+
+将购物车、支付相关的 PostgreSQL 枚举列改为 VARCHAR(20) + CHECK 约束，
+新增状态时无需 ALTER TYPE。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+CART_STATUSES = ("active", "abandoned", "converted")
+PAYMENT_STATUSES = (
+    "pending", "processing", "success", "failed",
+    "cancelled", "refunded", "partially_refunded",
+)
+PAYMENT_METHOD_TYPES = (
+    "credit_card", "debit_card", "bank_transfer", "digital_wallet",
+    "cash", "points", "coupon",
+)
+
+# (表, 列, 约束名, 允许值, 原枚举类型名)
+STATUS_COLUMNS = [
+    ("carts", "status", "ck_carts_status", CART_STATUSES, "cartstatus"),
+    ("payments", "status", "ck_payments_status", PAYMENT_STATUSES, "paymentstatus"),
+    ("payments", "payment_method_type", "ck_payments_payment_method_type",
+     PAYMENT_METHOD_TYPES, "paymentmethodtype"),
+    ("payment_methods", "type", "ck_payment_methods_type", PAYMENT_METHOD_TYPES, "paymentmethodtype"),
+]
+
+
+def _in_list(values) -> str:
+    return ", ".join(f"'{v}'" for v in values)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, column, constraint, values, _ in STATUS_COLUMNS:
+        types = {col["name"]: col["type"] for col in inspector.get_columns(table)}
+        if not isinstance(types.get(column), sa.Enum):
+            continue
+        op.alter_column(
+            table,
+            column,
+            type_=sa.String(20),
+            postgresql_using=f"lower({column}::text)",
+        )
+        op.create_check_constraint(constraint, table, f"{column} IN ({_in_list(values)})")
+
+    # 枚举类型仅在不再被其他表（如 orders.payment_status）引用时删除
+    op.execute("DROP TYPE IF EXISTS cartstatus")
+    op.execute("DROP TYPE IF EXISTS paymentmethodtype")
+
+
+def downgrade() -> None:
+    op.execute(f"CREATE TYPE cartstatus AS ENUM ({_in_list(v.upper() for v in CART_STATUSES)})")
+    op.execute(
+        f"CREATE TYPE paymentmethodtype AS ENUM ({_in_list(v.upper() for v in PAYMENT_METHOD_TYPES)})"
+    )
+    op.execute(
+        "DO $$ BEGIN "
+        f"CREATE TYPE paymentstatus AS ENUM ({_in_list(v.upper() for v in PAYMENT_STATUSES)}); "
+        "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+    )
+    for table, column, constraint, _, enum_name in STATUS_COLUMNS:
+        op.drop_constraint(constraint, table, type_="check")
+        op.alter_column(
+            table,
+            column,
+            type_=postgresql.ENUM(name=enum_name, create_type=False),
+            postgresql_using=f"upper({column})::{enum_name}",
+        )
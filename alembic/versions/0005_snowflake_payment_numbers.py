@@ -0,0 +1,61 @@
+"""payment/refund numbers to snowflake bigint
+
+支付编号、退款编号由 VARCHAR(50) 改为 Snowflake BIGINT。
+已有记录按 created_at 与 id 生成时间有序的编号（原字符串编号不保留）。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+# 与 app.models.ids.EPOCH_MS 保持一致
+EPOCH_MS = 1704067200000
+
+# (表, 列, 旧索引)
+NUMBER_COLUMNS = [
+    ("payments", "payment_number", ("idx_payments_number", "ix_payments_payment_number")),
+    ("payment_refunds", "refund_number", ("idx_payment_refunds_number", "ix_payment_refunds_refund_number")),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, column, old_indexes in NUMBER_COLUMNS:
+        types = {col["name"]: col["type"] for col in inspector.get_columns(table)}
+        if not isinstance(types.get(column), sa.String):
+            continue
+        for index in old_indexes:
+            op.execute(f"DROP INDEX IF EXISTS {index}")
+        op.alter_column(
+            table,
+            column,
+            type_=sa.BigInteger(),
+            postgresql_using=(
+                f"((floor(extract(epoch from created_at) * 1000)::bigint - {EPOCH_MS}) << 22)"
+                " | (id & 4194303)"
+            ),
+        )
+        op.create_unique_constraint(f"{table}_{column}_key", table, [column])
+
+
+def downgrade() -> None:
+    for table, column, old_indexes in NUMBER_COLUMNS:
+        op.drop_constraint(f"{table}_{column}_key", table, type_="unique")
+        op.alter_column(
+            table,
+            column,
+            type_=sa.String(50),
+            postgresql_using=f"{column}::text",
+        )
+        op.create_index(old_indexes[1], table, [column], unique=True)
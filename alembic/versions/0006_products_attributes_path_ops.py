@@ -0,0 +1,37 @@
+"""products attributes gin jsonb_path_ops
+
+将 products.attributes 的 GIN 索引改为 jsonb_path_ops 操作符类。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_attributes")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_attributes "
+            "ON products USING gin (attributes jsonb_path_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_attributes")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_attributes "
+            "ON products USING gin (attributes)"
+        )
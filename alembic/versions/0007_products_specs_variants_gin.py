@@ -0,0 +1,37 @@
+"""products specifications/variants gin indexes
+
+为 products.specifications 与 products.variants 添加 jsonb_path_ops GIN 索引。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行，且不阻塞写入
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_specifications "
+            "ON products USING gin (specifications jsonb_path_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_variants "
+            "ON products USING gin (variants jsonb_path_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_variants")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_specifications")
@@ -0,0 +1,36 @@
+"""products hot attribute expression indexes
+
+为 products.attributes 的热点键 brand / color 添加 BTREE 表达式索引。
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_attr_brand "
+            "ON products ((attributes->>'brand'))"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_attr_color "
+            "ON products ((attributes->>'color'))"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_attr_color")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_attr_brand")
@@ -0,0 +1,47 @@
+"""soft delete partial indexes
+
+商品、用户的列表类索引改为 WHERE is_deleted = false 的部分索引。
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+# (索引名, 表, 列)
+PARTIAL_INDEXES = [
+    ("idx_products_merchant_status", "products", "merchant_id, status"),
+    ("idx_products_price", "products", "price"),
+    ("idx_products_rating", "products", "rating"),
+    ("idx_products_sales", "products", "sales_count"),
+    ("idx_products_created", "products", "created_at"),
+    ("idx_products_published", "products", "published_at"),
+    ("idx_users_email_active", "users", "email, is_active"),
+    ("idx_users_role_status", "users", "role, status"),
+    ("idx_users_created_at", "users", "created_at"),
+]
+
+
+def _rebuild(where: str) -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in PARTIAL_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.execute(f"CREATE INDEX CONCURRENTLY {name} ON {table} ({columns}){where}")
+
+
+def upgrade() -> None:
+    _rebuild(" WHERE is_deleted = false")
+
+
+def downgrade() -> None:
+    _rebuild("")
@@ -0,0 +1,76 @@
+"""generated columns
+
+将 users.full_name、products.is_available、products.discount_percentage
+改为 STORED 生成列，并为可售商品列表添加部分索引。
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "full_name",
+            sa.String(255),
+            sa.Computed(
+                "coalesce(first_name || ' ' || last_name, first_name, last_name, "
+                "username, split_part(email, '@', 1))",
+                persisted=True,
+            ),
+            comment="全名（生成列）",
+        ),
+    )
+    op.add_column(
+        "products",
+        sa.Column(
+            "is_available",
+            sa.Boolean(),
+            sa.Computed(
+                "status = 'ACTIVE' AND stock > 0 AND NOT coalesce(is_deleted, false)",
+                persisted=True,
+            ),
+            comment="是否可售",
+        ),
+    )
+    op.add_column(
+        "products",
+        sa.Column(
+            "discount_percentage",
+            sa.Numeric(5, 2),
+            sa.Computed(
+                "CASE WHEN original_price > price "
+                "THEN round((1 - price / original_price) * 100, 2) END",
+                persisted=True,
+            ),
+            comment="折扣百分比",
+        ),
+    )
+
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_available_created "
+            "ON products (created_at) WHERE is_available"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_available_created")
+
+    op.drop_column("products", "discount_percentage")
+    op.drop_column("products", "is_available")
+    op.drop_column("users", "full_name")
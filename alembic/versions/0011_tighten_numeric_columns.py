@@ -0,0 +1,48 @@
+"""tighten numeric columns
+
+将 products.rating / weight 与 merchants.delivery_fee / min_order_amount
+从 double precision 改为定长精度 NUMERIC。
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+# (表名, 列名, 新类型)
+COLUMNS = [
+    ("products", "rating", sa.Numeric(3, 2)),
+    ("products", "weight", sa.Numeric(6, 3)),
+    ("merchants", "delivery_fee", sa.Numeric(10, 2)),
+    ("merchants", "min_order_amount", sa.Numeric(10, 2)),
+]
+
+
+def upgrade() -> None:
+    for table, column, type_ in COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=type_,
+            existing_type=sa.Float(),
+            postgresql_using=f"{column}::numeric({type_.precision},{type_.scale})",
+        )
+
+
+def downgrade() -> None:
+    for table, column, type_ in COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.Float(),
+            existing_type=type_,
+            postgresql_using=f"{column}::double precision",
+        )
@@ -0,0 +1,90 @@
+"""product tag link
+
+以 product_tag_link 关联表替代 products.tags 数组列，
+由触发器维护 product_tags.usage_count。
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_tag_link",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("product_tags.id", ondelete="CASCADE"), primary_key=True),
+    )
+    op.create_index("idx_product_tag_link_tag", "product_tag_link", ["tag_id", "product_id"])
+
+    # 补齐数组中存在但标签表中缺失的标签
+    op.execute(
+        "INSERT INTO product_tags (name, slug, usage_count, is_active, created_at, updated_at) "
+        "SELECT DISTINCT tn, tn, 0, true, now(), now() "
+        "FROM products p, unnest(p.tags) AS tn "
+        "ON CONFLICT DO NOTHING"
+    )
+    op.execute(
+        "INSERT INTO product_tag_link (product_id, tag_id) "
+        "SELECT DISTINCT p.id, t.id "
+        "FROM products p, unnest(p.tags) AS tn "
+        "JOIN product_tags t ON t.name = tn"
+    )
+    op.execute(
+        "UPDATE product_tags t SET usage_count = "
+        "(SELECT count(*) FROM product_tag_link l WHERE l.tag_id = t.id)"
+    )
+
+    # 关联增删时维护 usage_count
+    op.execute("""
+        CREATE OR REPLACE FUNCTION product_tag_link_usage_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE product_tags SET usage_count = usage_count + 1 WHERE id = NEW.tag_id;
+                RETURN NEW;
+            ELSE
+                UPDATE product_tags SET usage_count = usage_count - 1 WHERE id = OLD.tag_id;
+                RETURN OLD;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_product_tag_link_usage_count "
+        "AFTER INSERT OR DELETE ON product_tag_link "
+        "FOR EACH ROW EXECUTE FUNCTION product_tag_link_usage_count()"
+    )
+
+    op.drop_index("idx_products_tags", table_name="products")
+    op.drop_column("products", "tags")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column("tags", postgresql.ARRAY(sa.String()), comment="商品标签"),
+    )
+    op.execute(
+        "UPDATE products p SET tags = l.names "
+        "FROM (SELECT l.product_id, array_agg(t.name ORDER BY t.name) AS names "
+        "FROM product_tag_link l JOIN product_tags t ON t.id = l.tag_id "
+        "GROUP BY l.product_id) l "
+        "WHERE p.id = l.product_id"
+    )
+    op.create_index("idx_products_tags", "products", ["tags"], postgresql_using="gin")
+
+    op.execute("DROP TRIGGER IF EXISTS trg_product_tag_link_usage_count ON product_tag_link")
+    op.execute("DROP FUNCTION IF EXISTS product_tag_link_usage_count()")
+    op.drop_index("idx_product_tag_link_tag", table_name="product_tag_link")
+    op.drop_table("product_tag_link")
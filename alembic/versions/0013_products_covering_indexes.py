@@ -0,0 +1,52 @@
+"""products covering indexes
+
+商家/分类列表索引 INCLUDE 列表展示字段 (price, rating, sales_count, title)，
+支持 index-only scan。
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+INCLUDE = "INCLUDE (price, rating, sales_count, title)"
+WHERE = "WHERE is_deleted = false"
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_category_cover "
+            f"ON products (category_id, status) {INCLUDE} {WHERE}"
+        )
+        # 先建新索引再替换，重建期间列表查询始终有索引可用
+        op.execute(
+            "CREATE INDEX CONCURRENTLY idx_products_merchant_status_new "
+            f"ON products (merchant_id, status) {INCLUDE} {WHERE}"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_merchant_status")
+        op.execute("ALTER INDEX idx_products_merchant_status_new RENAME TO idx_products_merchant_status")
+        # 更新可见性映射，使 index-only scan 无需回表
+        op.execute("VACUUM (ANALYZE) products")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY idx_products_merchant_status_old "
+            f"ON products (merchant_id, status) {WHERE}"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_merchant_status")
+        op.execute("ALTER INDEX idx_products_merchant_status_old RENAME TO idx_products_merchant_status")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_category_cover")
@@ -0,0 +1,72 @@
+"""products main image url
+
+新增 products.main_image_url 冗余字段，由 product_images 触发器维护。
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column("main_image_url", sa.String(500), comment="主图URL"),
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION refresh_product_main_image(pid integer) RETURNS void AS $$
+        BEGIN
+            UPDATE products SET main_image_url = (
+                SELECT url FROM product_images
+                WHERE product_id = pid
+                ORDER BY order_index, id
+                LIMIT 1
+            )
+            WHERE id = pid;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION product_images_main_image() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM refresh_product_main_image(OLD.product_id);
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.product_id <> OLD.product_id) THEN
+                PERFORM refresh_product_main_image(NEW.product_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_product_images_main_image "
+        "AFTER INSERT OR DELETE OR UPDATE OF product_id, url, order_index ON product_images "
+        "FOR EACH ROW EXECUTE FUNCTION product_images_main_image()"
+    )
+
+    # 回填现有商品主图
+    op.execute(
+        "UPDATE products p SET main_image_url = i.url "
+        "FROM (SELECT DISTINCT ON (product_id) product_id, url FROM product_images "
+        "ORDER BY product_id, order_index, id) i "
+        "WHERE p.id = i.product_id"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_product_images_main_image ON product_images")
+    op.execute("DROP FUNCTION IF EXISTS product_images_main_image()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_product_main_image(integer)")
+    op.drop_column("products", "main_image_url")
@@ -0,0 +1,105 @@
+"""product categories ltree
+
+product_categories.path 改为 ltree 分类ID路径，由触发器根据 parent_id
+维护 path / level（含子树移动），并添加 GiST 索引。
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS ltree")
+
+    # 原 path 为自由文本，无法直接转换，改类型后按 parent_id 重新生成
+    op.execute(
+        "ALTER TABLE product_categories ALTER COLUMN path TYPE ltree USING NULL"
+    )
+    op.execute("""
+        WITH RECURSIVE tree AS (
+            SELECT id, text2ltree(id::text) AS path
+            FROM product_categories WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, t.path || c.id::text
+            FROM product_categories c JOIN tree t ON c.parent_id = t.id
+        )
+        UPDATE product_categories pc
+        SET path = tree.path, level = nlevel(tree.path) - 1
+        FROM tree WHERE pc.id = tree.id
+    """)
+
+    # 新增或修改 parent_id 时计算自身 path / level
+    op.execute("""
+        CREATE OR REPLACE FUNCTION product_categories_set_path() RETURNS trigger AS $$
+        DECLARE
+            parent_path ltree;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                NEW.path = text2ltree(NEW.id::text);
+            ELSE
+                SELECT path INTO parent_path FROM product_categories WHERE id = NEW.parent_id;
+                IF parent_path IS NULL THEN
+                    RAISE EXCEPTION 'invalid parent_id %', NEW.parent_id;
+                END IF;
+                IF TG_OP = 'UPDATE' AND parent_path <@ OLD.path THEN
+                    RAISE EXCEPTION 'category % cannot be moved under its own subtree', NEW.id;
+                END IF;
+                NEW.path = parent_path || NEW.id::text;
+            END IF;
+            NEW.level = nlevel(NEW.path) - 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_product_categories_set_path "
+        "BEFORE INSERT OR UPDATE OF parent_id ON product_categories "
+        "FOR EACH ROW EXECUTE FUNCTION product_categories_set_path()"
+    )
+
+    # 子树移动时同步更新所有后代的 path / level
+    op.execute("""
+        CREATE OR REPLACE FUNCTION product_categories_move_subtree() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.path IS DISTINCT FROM OLD.path THEN
+                UPDATE product_categories
+                SET path = NEW.path || subpath(path, nlevel(OLD.path)),
+                    level = nlevel(NEW.path) + nlevel(path) - nlevel(OLD.path) - 1
+                WHERE path <@ OLD.path AND id <> NEW.id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_product_categories_move_subtree "
+        "AFTER UPDATE OF parent_id ON product_categories "
+        "FOR EACH ROW EXECUTE FUNCTION product_categories_move_subtree()"
+    )
+
+    op.create_index(
+        "idx_product_categories_path_gist", "product_categories", ["path"],
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_product_categories_path_gist", table_name="product_categories")
+    op.execute("DROP TRIGGER IF EXISTS trg_product_categories_move_subtree ON product_categories")
+    op.execute("DROP TRIGGER IF EXISTS trg_product_categories_set_path ON product_categories")
+    op.execute("DROP FUNCTION IF EXISTS product_categories_move_subtree()")
+    op.execute("DROP FUNCTION IF EXISTS product_categories_set_path()")
+    op.execute(
+        "ALTER TABLE product_categories ALTER COLUMN path TYPE varchar(500) USING path::text"
+    )
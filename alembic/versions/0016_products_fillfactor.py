@@ -0,0 +1,27 @@
+"""products fillfactor
+
+products 表设置 fillfactor = 70，为频繁更新的计数/库存列预留页内空间，
+使更新尽量走 HOT 路径。仅对新写入的页生效，存量页在下次表重写后生效。
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE products SET (fillfactor = 70)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE products RESET (fillfactor)")
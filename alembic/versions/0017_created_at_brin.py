@@ -0,0 +1,46 @@
+"""created_at brin indexes
+
+products.created_at、users.created_at 的 BTREE 索引替换为 BRIN 索引。
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+
+# (BTREE 索引名, BRIN 索引名, 表)
+INDEXES = [
+    ("idx_products_created", "idx_products_created_brin", "products"),
+    ("idx_users_created_at", "idx_users_created_at_brin", "users"),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        for btree_name, brin_name, table in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {brin_name} "
+                f"ON {table} USING brin (created_at) WITH (pages_per_range = 32)"
+            )
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {btree_name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for btree_name, brin_name, table in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {btree_name} "
+                f"ON {table} (created_at) WHERE is_deleted = false"
+            )
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {brin_name}")
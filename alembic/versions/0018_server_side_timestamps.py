@@ -0,0 +1,74 @@
+"""server side timestamps
+
+用户、商家、商品相关表的 created_at / updated_at 改为 timestamptz，
+由数据库默认值 now() 和 BEFORE UPDATE 触发器维护。
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+
+# (表名, 是否有 updated_at)
+TABLES = [
+    ("users", True),
+    ("merchants", True),
+    ("products", True),
+    ("product_images", False),
+    ("product_categories", True),
+    ("product_tags", True),
+]
+
+
+def _columns(has_updated_at: bool) -> list:
+    return ["created_at", "updated_at"] if has_updated_at else ["created_at"]
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, has_updated_at in TABLES:
+        # 原值为应用写入的 UTC 时间
+        alters = ", ".join(
+            f"ALTER COLUMN {column} TYPE timestamptz USING {column} AT TIME ZONE 'UTC', "
+            f"ALTER COLUMN {column} SET DEFAULT now()"
+            for column in _columns(has_updated_at)
+        )
+        op.execute(f"ALTER TABLE {table} {alters}")
+        if has_updated_at:
+            op.execute(
+                f"CREATE TRIGGER trg_{table}_set_updated_at "
+                f"BEFORE UPDATE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+            )
+
+
+def downgrade() -> None:
+    for table, has_updated_at in TABLES:
+        if has_updated_at:
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_set_updated_at ON {table}")
+        alters = ", ".join(
+            f"ALTER COLUMN {column} DROP DEFAULT, "
+            f"ALTER COLUMN {column} TYPE timestamp USING {column} AT TIME ZONE 'UTC'"
+            for column in _columns(has_updated_at)
+        )
+        op.execute(f"ALTER TABLE {table} {alters}")
+
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
@@ -0,0 +1,42 @@
+"""products merchant list index
+
+商家后台列表索引 (merchant_id, status, created_at DESC, id DESC)，
+替代 idx_products_merchant_status。
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0019'
+down_revision = '0018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_merchant_list "
+            "ON products (merchant_id, status, created_at DESC, id DESC) "
+            "INCLUDE (price, rating, sales_count, title, stock) "
+            "WHERE is_deleted = false"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_merchant_status")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_merchant_status "
+            "ON products (merchant_id, status) "
+            "INCLUDE (price, rating, sales_count, title) "
+            "WHERE is_deleted = false"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_merchant_list")
@@ -0,0 +1,78 @@
+"""product images primary unique
+
+product_images 添加 (product_id) WHERE is_primary 部分唯一索引，
+主图冗余字段 products.main_image_url 优先取 is_primary 图片。
+
+Revision ID: 0020
+Revises: 0019
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0020'
+down_revision = '0019'
+branch_labels = None
+depends_on = None
+
+
+def _refresh_function(order_by: str) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION refresh_product_main_image(pid integer) RETURNS void AS $$
+        BEGIN
+            UPDATE products SET main_image_url = (
+                SELECT url FROM product_images
+                WHERE product_id = pid
+                ORDER BY {order_by}
+                LIMIT 1
+            )
+            WHERE id = pid;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def _recreate_trigger(columns: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_product_images_main_image ON product_images")
+    op.execute(
+        "CREATE TRIGGER trg_product_images_main_image "
+        f"AFTER INSERT OR DELETE OR UPDATE OF {columns} ON product_images "
+        "FOR EACH ROW EXECUTE FUNCTION product_images_main_image()"
+    )
+
+
+def upgrade() -> None:
+    # 清理重复主图：每个商品仅保留排序最前的一张
+    op.execute(
+        "UPDATE product_images SET is_primary = false "
+        "WHERE is_primary AND id NOT IN ("
+        "SELECT DISTINCT ON (product_id) id FROM product_images "
+        "WHERE is_primary ORDER BY product_id, order_index, id)"
+    )
+
+    op.execute(_refresh_function("is_primary DESC, order_index, id"))
+    _recreate_trigger("product_id, url, order_index, is_primary")
+    op.execute(
+        "UPDATE products p SET main_image_url = i.url "
+        "FROM (SELECT DISTINCT ON (product_id) product_id, url FROM product_images "
+        "ORDER BY product_id, is_primary DESC, order_index, id) i "
+        "WHERE p.id = i.product_id"
+    )
+
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_product_images_primary "
+            "ON product_images (product_id) WHERE is_primary"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_product_images_primary")
+
+    op.execute(_refresh_function("order_index, id"))
+    _recreate_trigger("product_id, url, order_index")
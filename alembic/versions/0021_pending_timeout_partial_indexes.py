@@ -0,0 +1,40 @@
+"""pending timeout partial indexes
+
+超时扫描的部分索引：orders (created_at) WHERE 待支付，
+payments (created_at) WHERE status = 'pending'。
+
+Revision ID: 0021
+Revises: 0020
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0021'
+down_revision = '0020'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        # orders.status / payment_status 为原生枚举，按名称存储
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_pending_created "
+            "ON orders (created_at) "
+            "WHERE status = 'PENDING' AND payment_status = 'PENDING'"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payments_pending_created "
+            "ON payments (created_at) WHERE status = 'pending'"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_payments_pending_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_orders_pending_created")
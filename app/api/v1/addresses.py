@@ -1,18 +1,49 @@
 """
-地址路由（占位）
-==============
+地址路由
+========
 """
-from fastapi import APIRouter, Depends
+import hashlib
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_async_db
 from ...core.security import require_user
+from ...models.address import Address
+from ...services.user_service import get_user_addresses_page, get_user_addresses_version
 
 router = APIRouter()
 
+# 地址列表为用户私有数据，仅允许客户端短时缓存
+CACHE_CONTROL = "private, max-age=30"
+
+
+def _address_to_dict(address: Address) -> dict:
+    return {attr.key: getattr(address, attr.key) for attr in inspect(Address).column_attrs}
+
 
 @router.get("/")
-async def list_addresses(db: AsyncSession = Depends(get_async_db), user=Depends(require_user)):
-    # 占位：返回空列表，后续可接入 AddressService
-    return {"items": [], "total": 0}
+async def list_addresses(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(require_user),
+):
+    version = await get_user_addresses_version(db, user.user_id)
+    etag = '"' + hashlib.sha256(f"{user.user_id}:{version}:{cursor}:{limit}".encode("utf-8")).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
+    try:
+        addresses, next_cursor = await get_user_addresses_page(db, user.user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
 
+    response.headers.update(headers)
+    return {
+        "items": [_address_to_dict(a) for a in addresses],
+        "next_cursor": next_cursor,
+    }
@@ -2,19 +2,41 @@
 AI 助手路由（RAG 占位）
 =====================
 """
+from celery import group
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_async_db
 from ...core.security import require_user, require_merchant
-from ...services.ai_service import AIService
+from ...tasks.ai_tasks import generate_product_embeddings
 
 router = APIRouter()
 
+# 每个 Celery 任务处理的商品数，用于摊薄模型前向计算开销
+EMBEDDING_BATCH_SIZE = 32
+
+
+def _enqueue_embeddings(product_ids: list[int]) -> int:
+    # group 内的任务一次性发布，减少 broker 往返
+    chunks = [
+        product_ids[i:i + EMBEDDING_BATCH_SIZE]
+        for i in range(0, len(product_ids), EMBEDDING_BATCH_SIZE)
+    ]
+    group(generate_product_embeddings.s(chunk) for chunk in chunks).apply_async()
+    return len(chunks)
+
+
+@router.post("/embed/batch")
+async def generate_embeddings_batch(product_ids: list[int], user=Depends(require_merchant)):
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return {"ok": True, "queued": 0, "tasks": 0}
+    tasks = _enqueue_embeddings(ids)
+    return {"ok": True, "queued": len(ids), "tasks": tasks}
+
 
 @router.post("/embed/{product_id}")
-async def generate_embedding(product_id: int, db: AsyncSession = Depends(get_async_db), user=Depends(require_merchant)):
-    svc = AIService(db)
-    await svc.generate_product_embedding(product_id)
+async def generate_embedding(product_id: int, user=Depends(require_merchant)):
+    _enqueue_embeddings([product_id])
     return {"ok": True}
 
 
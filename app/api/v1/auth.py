@@ -27,7 +27,9 @@ from ...core.security import (
     create_user_tokens,
     verify_token,
     add_token_to_blacklist,
-    get_password_hash
+    get_password_hash,
+    publish_user_invalidation,
+    extract_bearer
 )
 from ...core.config import settings
 from ...models.user import User
@@ -134,6 +136,7 @@ async def login(
         # 更新最后登录时间
         user_service = UserService(db)
         await user_service.update_last_login(user.id)
+        await db.commit()
         
         logger.info("User logged in successfully", user_id=user.id, email=user.email)
         
@@ -199,7 +202,7 @@ async def refresh_token(
 
 @router.post("/logout")
 async def logout(
-    token: str = Depends(oauth2_scheme)
+    token: str = Depends(extract_bearer)
 ) -> Any:
     """
     用户登出
@@ -210,6 +213,11 @@ async def logout(
         # 将令牌加入黑名单
         await add_token_to_blacklist(token)
         
+        # 失效各进程中缓存的用户状态
+        payload = verify_token(token)
+        if payload and payload.get("user_id"):
+            await publish_user_invalidation(payload["user_id"])
+        
         logger.info("User logged out successfully")
         
         return {"message": "登出成功"}
@@ -239,6 +247,7 @@ async def request_password_reset(
         if user and user.is_active:
             # 生成重置令牌
             reset_token = await user_service.generate_password_reset_token(user.id)
+            await db.commit()
             
             # 发送重置邮件
             email_service = EmailService()
@@ -285,6 +294,7 @@ async def confirm_password_reset(
             user_id, 
             password_reset_confirm.new_password
         )
+        await db.commit()
         
         logger.info("Password reset completed", user_id=user_id)
         
@@ -323,6 +333,7 @@ async def verify_email(
         
         # 标记邮箱为已验证
         await user_service.mark_email_verified(user_id)
+        await db.commit()
         
         logger.info("Email verified successfully", user_id=user_id)
         
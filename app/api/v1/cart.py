@@ -36,7 +36,7 @@ async def get_cart(user=Depends(require_user)):
     """
     # 创建服务实例并调用获取购物车方法
     svc = CartService()
-    return await svc.get_cart(user.id)
+    return await svc.get_cart(user.user_id)
 
 
 @router.post("/")
@@ -46,7 +46,7 @@ async def set_cart(items: list[dict], user=Depends(require_user)):
     
     Args:
         items (list[dict]): 购物车商品列表，每个字典包含商品信息
-        user: 依赖注入的用户对象，通过require_user获取当前登录用户
+        user: 依赖注入的认证主体（AuthPrincipal），通过require_user获取当前登录用户
 
     Returns:
         dict: 操作结果，成功时返回{"ok": True}
@@ -54,7 +54,7 @@ async def set_cart(items: list[dict], user=Depends(require_user)):
     # 创建购物车服务实例
     svc = CartService()
     # 调用服务层方法设置购物车商品
-    await svc.set_cart(user.id, items)
+    await svc.set_cart(user.user_id, items)
     return {"ok": True}
 
 
@@ -72,5 +72,5 @@ async def clear_cart(user=Depends(require_user)):
     """
     # 创建服务实例并调用清空购物车方法
     svc = CartService()
-    await svc.clear(user.id)
+    await svc.clear(user.user_id)
     return {"ok": True}
\ No newline at end of file
@@ -14,7 +14,7 @@ router = APIRouter()
 @router.get("/me")
 async def my_merchant(db: AsyncSession = Depends(get_async_db), user=Depends(require_merchant)):
     svc = MerchantService(db)
-    m = await svc.get_by_user(user.id)
+    m = await svc.get_by_user(user.user_id)
     if not m:
         raise HTTPException(status_code=404, detail="未找到商家档案")
     return m
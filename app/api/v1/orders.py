@@ -2,11 +2,12 @@
 订单路由
 =======
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_async_db
 from ...core.security import require_user
-from ...services.order_service import OrderService
+from ...services.order_service import OrderService, merge_item_quantities
+from ...services.product_service import decrement_cached_stocks
 
 router = APIRouter()
 
@@ -14,7 +15,12 @@ router = APIRouter()
 @router.post("/")
 async def create_order(items: list[dict], db: AsyncSession = Depends(get_async_db), user=Depends(require_user)):
     svc = OrderService(db)
-    order = await svc.create_simple(user.id, items)
+    order = await svc.create_simple(user.user_id, items)
+    if not order:
+        raise HTTPException(status_code=400, detail="商品不可用或库存不足")
+    await db.commit()
+    # 数据库库存已扣减，同步扣减 Redis 中的缓存库存
+    await decrement_cached_stocks(merge_item_quantities(items))
     return order
 
 
@@ -16,10 +16,11 @@ router = APIRouter()
 @router.post("/intent/{order_id}")
 async def create_intent(order_id: int, db: AsyncSession = Depends(get_async_db), user=Depends(require_user)):
     order = (await db.execute(select(Order).where(Order.id == order_id))).scalar_one_or_none()
-    if not order or order.user_id != user.id:
+    if not order or order.user_id != user.user_id:
         raise HTTPException(status_code=404, detail="订单不存在")
     svc = PaymentService(db)
     pay = await svc.create_payment_intent(order)
+    await db.commit()
     return pay
 
 
@@ -30,6 +31,7 @@ async def mock_callback(order_id: int, db: AsyncSession = Depends(get_async_db))
         raise HTTPException(status_code=404, detail="订单不存在")
     svc = PaymentService(db)
     await svc.mark_paid(order)
+    await db.commit()
     return {"ok": True}
 
 
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_async_db
 from ...core.security import require_merchant
-from ...services.product_service import ProductService
+from ...services.product_service import ProductService, invalidate_product_view
 
 router = APIRouter()
 
@@ -22,6 +22,7 @@ async def list_products(skip: int = 0, limit: int = 20, db: AsyncSession = Depen
 async def create_product(payload: dict, db: AsyncSession = Depends(get_async_db)):
     svc = ProductService(db)
     obj = await svc.create(payload)
+    await db.commit()
     return obj
 
 
@@ -29,6 +30,8 @@ async def create_product(payload: dict, db: AsyncSession = Depends(get_async_db)
 async def update_product(pid: int, payload: dict, db: AsyncSession = Depends(get_async_db), user=Depends(require_merchant)):
     svc = ProductService(db)
     obj = await svc.update(pid, payload)
+    await db.commit()
+    await invalidate_product_view(pid)
     return obj
 
 
@@ -36,6 +39,8 @@ async def update_product(pid: int, payload: dict, db: AsyncSession = Depends(get
 async def publish_product(pid: int, active: bool = True, db: AsyncSession = Depends(get_async_db), user=Depends(require_merchant)):
     svc = ProductService(db)
     obj = await svc.publish(pid, active)
+    await db.commit()
+    await invalidate_product_view(pid)
     return obj
 
 
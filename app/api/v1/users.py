@@ -2,7 +2,7 @@
 用户路由
 ========
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_async_db
 from ...core.security import get_current_active_user, require_admin
@@ -12,23 +12,30 @@ from ...schemas.user import UserUpdate, UserResponse
 router = APIRouter()
 
 
+def _to_user_response(user) -> UserResponse:
+    # 数据来自本服务的 ORM 写入，已可信，跳过 pydantic 校验
+    return UserResponse.model_construct(
+        **{name: getattr(user, name) for name in UserResponse.model_fields}
+    )
+
+
 @router.get("/me", response_model=UserResponse)
 async def me(user=Depends(get_current_active_user)):
     return user
 
 
-@router.patch("/me", response_model=UserResponse)
+@router.patch("/me", response_model=None, responses={200: {"model": UserResponse}})
 async def update_me(payload: UserUpdate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_active_user)):
     svc = UserService(db)
     updated = await svc.update_user(user.id, payload)
-    return updated
+    if not updated:
+        raise HTTPException(status_code=400, detail="更新用户信息失败")
+    await db.commit()
+    return _to_user_response(updated)
 
 
 @router.get("/", dependencies=[Depends(require_admin)])
 async def list_users(skip: int = 0, limit: int = 20, db: AsyncSession = Depends(get_async_db)):
     svc = UserService(db)
-    items = await svc.get_users(skip=skip, limit=limit)
-    return {"items": items, "total": len(items)}
-
-
-
+    items, total = await svc.get_users(skip=skip, limit=limit)
+    return {"items": [_to_user_response(u) for u in items], "total": total}
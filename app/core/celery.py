@@ -3,18 +3,27 @@ Celery 初始化
 ===========
 
 提供 Celery 应用、队列与定时任务（Beat）初始化。
-生产中可切换为 RabbitMQ/Kafka 作为 broker；示例默认使用 Redis。
+生产环境默认使用 RabbitMQ 作为 broker；开发环境使用 Redis。
 """
 
 from celery import Celery
 from celery.schedules import crontab
+import asyncio
 import os
 
 from .config import settings
 
+# Worker 内任务通过 asyncio.run 执行异步服务，优先使用 uvloop 事件循环
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:  # pragma: no cover - uvloop 不支持 Windows
+    pass
+
 
 def _broker_url() -> str:
-    return os.getenv("CELERY_BROKER_URL", settings.celery_broker_url)
+    default = settings.rabbitmq_url if settings.is_production else settings.celery_broker_url
+    return os.getenv("CELERY_BROKER_URL", default)
 
 
 def _result_backend() -> str:
@@ -29,24 +38,45 @@ celery_app = Celery(
         "app.tasks.ai_tasks",
         "app.tasks.email_tasks",
         "app.tasks.inventory_tasks",
+        "app.tasks.product_tasks",
     ],
 )
 
 # 基础配置（可按需扩展）
 celery_app.conf.update(
     timezone="Asia/Shanghai",
+    broker_pool_limit=settings.celery_broker_pool_limit,
+    broker_connection_retry_on_startup=True,
     task_acks_late=True,
+    # acks_late 下每个进程只预取一个任务，避免短任务排在长任务之后
+    worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
     task_default_queue="default",
+    # AI 任务（网络/IO 密集）走独立队列，由线程池 worker 消费；其余任务走默认 prefork worker
+    task_routes={
+        "app.tasks.ai_tasks.*": {"queue": "ai"},
+    },
     beat_schedule={
         # 示例：每小时同步商品 embedding 过期项
         "sync-outdated-embeddings": {
             "task": "app.tasks.ai_tasks.refresh_outdated_embeddings",
             "schedule": crontab(minute=0, hour="*"),
         },
+        # 每分钟将缓冲的商品计数写回数据库
+        "flush-product-counters": {
+            "task": "app.tasks.product_tasks.flush_product_counters",
+            "schedule": crontab(minute="*"),
+        },
     },
 )
 
+# Redis broker：保持长连接并设置可见性超时（RabbitMQ 无需这些选项）
+if celery_app.conf.broker_url.startswith(("redis://", "rediss://")):
+    celery_app.conf.broker_transport_options = {
+        "visibility_timeout": settings.celery_visibility_timeout,
+        "socket_keepalive": True,
+    }
+
 
 @celery_app.task(name="app.tasks.heartbeat")
 def heartbeat() -> str:
@@ -13,12 +13,17 @@
 5. 集成 Alembic 进行数据库迁移管理
 """
 
-from typing import AsyncGenerator, Generator
-from sqlalchemy import create_engine, MetaData
+import asyncio
+import copy
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, Type, TypeVar
+from sqlalchemy import create_engine, event, inspect, MetaData
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import make_transient_to_detached, sessionmaker, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+import orjson
 import structlog
 
 from .config import settings
@@ -40,31 +45,80 @@ metadata = MetaData(
     }
 )
 
+
+def _json_serializer(value) -> str:
+    """JSON/JSONB 列序列化（orjson，非字符串键按 json 模块行为转为字符串）"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# asyncpg 连接参数（Web 与 Celery 任务引擎共用）
+_ASYNCPG_CONNECT_ARGS = {
+    "server_settings": {
+        "application_name": "fastapi_shop",
+    },
+    "statement_cache_size": 2048,  # asyncpg 驱动层预编译语句缓存
+    "prepared_statement_cache_size": 2048,  # SQLAlchemy asyncpg 适配层预编译语句缓存
+}
+
 # 异步数据库引擎配置
 async_engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,  # 开发环境下打印SQL语句
-    poolclass=QueuePool,
-    pool_size=20,  # 连接池大小
-    max_overflow=30,  # 最大溢出连接数
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.db_pool_size,  # 连接池大小
+    max_overflow=settings.db_max_overflow,  # 最大溢出连接数
+    pool_timeout=settings.db_pool_timeout,  # 连接池耗尽时快速失败，避免请求堆积
     pool_pre_ping=True,  # 连接前检查连接是否有效
     pool_recycle=3600,  # 连接回收时间(秒)
-    connect_args={
-        "server_settings": {
-            "application_name": "fastapi_shop",
-        }
-    }
+    pool_use_lifo=True,  # 优先复用最近使用的连接，保持热连接
+    query_cache_size=1200,  # SQLAlchemy 编译语句缓存（按语句结构缓存）
+    json_serializer=_json_serializer,  # JSON/JSONB 列使用 orjson 编解码
+    json_deserializer=orjson.loads,
+    connect_args=_ASYNCPG_CONNECT_ARGS,
+)
+
+# Celery 任务异步引擎配置
+# 任务通过 asyncio.run 在各自的事件循环中执行（线程池 worker 中多个循环并存），
+# asyncpg 连接不能跨事件循环复用，因此不使用连接池，连接随会话关闭
+task_engine = create_async_engine(
+    settings.database_url,
+    echo=settings.debug,
+    poolclass=NullPool,
+    query_cache_size=1200,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args=_ASYNCPG_CONNECT_ARGS,
 )
 
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """记录语句开始时间"""
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """超过阈值的语句记录为慢查询"""
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    if elapsed_ms >= settings.db_slow_query_ms:
+        logger.warning("Slow query", statement=statement, elapsed_ms=round(elapsed_ms, 2))
+
+
+# 慢查询日志
+if settings.db_slow_query_ms > 0:
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(task_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(task_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
 # 同步数据库引擎配置（用于 Alembic 迁移）
+# 仅迁移与偶发同步操作使用，不保留空闲连接
 sync_engine = create_engine(
     settings.database_url_sync,
     echo=settings.debug,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    poolclass=NullPool,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 # 异步会话工厂
@@ -76,6 +130,15 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,  # 手动提交
 )
 
+# Celery 任务异步会话工厂（每个会话独立建连，不跨事件循环复用连接）
+TaskSessionLocal = async_sessionmaker(
+    bind=task_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=True,
+    autocommit=False,
+)
+
 # 同步会话工厂
 SessionLocal = sessionmaker(
     bind=sync_engine,
@@ -84,15 +147,61 @@ SessionLocal = sessionmaker(
 )
 
 
+_T = TypeVar("_T")
+
+
+def snapshot_instance(obj: Any) -> Dict[str, Any]:
+    """
+    提取 ORM 对象已加载列属性的快照（深拷贝，不含关系与未加载的延迟列）
+    
+    用于进程内缓存：缓存快照而不是仍挂在某个会话上的对象本身
+    
+    Args:
+        obj: ORM 对象
+        
+    Returns:
+        Dict[str, Any]: 列属性名 -> 值
+    """
+    state = inspect(obj)
+    return copy.deepcopy({
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    })
+
+
+def restore_instance(cls: Type[_T], snapshot: Dict[str, Any]) -> _T:
+    """
+    由快照重建脱离会话的 ORM 对象（属性均为已提交状态）
+    
+    返回的对象可通过 session.merge(obj, load=False) 挂到当前会话而不查询数据库
+    
+    Args:
+        cls: ORM 模型类
+        snapshot: snapshot_instance 返回的快照
+        
+    Returns:
+        ORM 对象（detached）
+    """
+    obj = inspect(cls).class_manager.new_instance()
+    for key, value in copy.deepcopy(snapshot).items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    return obj
+
+
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
     获取异步数据库会话的依赖注入函数
     
+    会话不会自动提交：只读请求无需额外的 COMMIT 往返，
+    写操作需在路由或服务层成功后显式调用 commit()。
+    
     使用方式:
-    @router.get("/")
+    @router.post("/")
     async def endpoint(db: AsyncSession = Depends(get_async_db)):
         # 使用 db 进行数据库操作
-        pass
+        await db.commit()
     
     Yields:
         AsyncSession: 异步数据库会话
@@ -100,7 +209,6 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()  # 自动提交事务
         except Exception as e:
             await session.rollback()  # 发生异常时回滚
             logger.error("Database session error", error=str(e))
@@ -146,16 +254,37 @@ async def init_db() -> None:
         raise
 
 
+async def warmup_db() -> None:
+    """
+    预热数据库连接池
+    
+    启动时预先建立 pool_size 个连接并归还连接池，
+    避免首批请求承担建连握手开销
+    """
+    try:
+        connections = await asyncio.gather(
+            *(async_engine.connect() for _ in range(settings.db_pool_size))
+        )
+        await asyncio.gather(*(conn.close() for conn in connections))
+        logger.info("Database pool warmed up", connections=len(connections))
+    except Exception as e:
+        logger.error("Failed to warm up database pool", error=str(e))
+
+
 async def check_db_health() -> bool:
     """
     检查数据库连接健康状态
     
+    不开启事务，直接通过 asyncpg 驱动连接执行 ping，
+    语句由 asyncpg 的预编译语句缓存复用，免去重复解析
+    
     Returns:
         bool: 数据库是否健康
     """
     try:
-        async with async_engine.begin() as conn:
-            await conn.execute("SELECT 1")
+        async with async_engine.connect() as conn:
+            raw_conn = await conn.get_raw_connection()
+            await raw_conn.driver_connection.fetchval("SELECT 1")
         return True
     except Exception as e:
         logger.error("Database health check failed", error=str(e))
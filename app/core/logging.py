@@ -0,0 +1,70 @@
+"""
+日志配置
+========
+
+配置 structlog 结构化日志，并将标准库日志输出移出事件循环。
+
+设计思路:
+1. structlog 通过标准库 logging 输出，保留按级别过滤
+2. 根 logger 只挂 QueueHandler，调用方仅把记录放入队列
+3. QueueListener 在后台线程中格式化并写出，避免 I/O 阻塞事件循环
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import logging
+import queue
+import sys
+
+import structlog
+
+from .config import settings
+
+# 后台日志线程
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging() -> None:
+    """配置结构化日志与后台日志线程（重复调用无副作用）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(logging.DEBUG if settings.debug else logging.INFO)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    # 配置结构化日志
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer()
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+
+def shutdown_logging() -> None:
+    """停止后台日志线程，并输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
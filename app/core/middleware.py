@@ -0,0 +1,136 @@
+"""
+中间件
+======
+
+以纯 ASGI 形式实现的应用中间件，包含请求日志、安全响应头等。
+
+设计思路:
+1. 直接实现 ASGI 接口 (scope, receive, send)，避免 BaseHTTPMiddleware
+   为每个请求创建任务组并构造 Request/Response 对象的开销
+2. 非 HTTP 请求 (websocket/lifespan) 直接透传
+3. 通过包装 send 在 http.response.start 阶段注入响应头
+4. 热点路径 (FAST_PATHS) 跳过非必要的中间件处理
+"""
+
+import time
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import URL
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import structlog
+
+from .config import settings
+
+# 配置日志
+logger = structlog.get_logger(__name__)
+
+# 热点路径：跳过请求日志等非必要处理，直接进入路由
+FAST_PATHS: FrozenSet[str] = frozenset({
+    "/health",
+    "/metrics",
+    "/api/v1/orders/",
+    "/api/v1/ai/search",
+})
+
+# 安全响应头（预编码为 bytes，避免每个请求重复编码）
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+]
+
+HSTS_HEADER: Tuple[bytes, bytes] = (
+    b"strict-transport-security",
+    b"max-age=31536000; includeSubDomains",
+)
+
+
+def _get_header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    """从 ASGI 原始请求头中读取指定头的值"""
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestLoggingMiddleware:
+    """
+    请求日志中间件
+
+    记录所有 HTTP 请求的详细信息，并添加 X-Process-Time 响应头。
+    skip_paths 中的路径直接透传，不做任何处理。
+    """
+
+    def __init__(self, app: ASGIApp, skip_paths: FrozenSet[str] = FAST_PATHS) -> None:
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        url = str(URL(scope=scope))
+        client = scope.get("client")
+
+        # 记录请求信息
+        logger.info(
+            "Request started",
+            method=method,
+            url=url,
+            client_ip=client[0] if client else None,
+            user_agent=_get_header(scope["headers"], b"user-agent")
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # 计算处理时间
+                process_time = time.perf_counter() - start_time
+
+                # 记录响应信息
+                logger.info(
+                    "Request completed",
+                    method=method,
+                    url=url,
+                    status_code=message["status"],
+                    process_time=round(process_time, 4)
+                )
+
+                # 添加处理时间头
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(process_time).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class SecurityHeadersMiddleware:
+    """
+    安全头中间件
+
+    添加安全相关的 HTTP 头
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.headers = list(SECURITY_HEADERS)
+        if settings.is_production:
+            self.headers.append(HSTS_HEADER)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.extend(self.headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,116 @@
+"""
+Redis 连接
+==========
+
+统一构造应用使用的 Redis 异步客户端及其连接池。
+
+设计思路:
+1. 连接池上限按并发量配置，避免默认 10 个连接使购物车等热点操作排队
+2. 定期健康检查与 TCP keepalive，及时发现被服务端或网络设备断开的空闲连接
+3. Redis 与应用同机部署时可配置 unix socket，跳过 TCP 协议栈
+4. 客户端在首次使用时惰性创建（get_redis），导入模块不建立连接池；
+   预加载后 fork 的各 worker 进程各自持有连接池
+"""
+
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlparse
+import secrets
+
+from redis import asyncio as aioredis
+
+from .config import settings
+
+
+def redis_connection_url(url: Optional[str] = None) -> str:
+    """
+    解析实际使用的 Redis 连接 URL
+
+    配置了 redis_socket_path 时改用 unix socket，并沿用原 URL 中的数据库编号
+
+    Args:
+        url: Redis 连接 URL，默认使用 settings.redis_url
+
+    Returns:
+        str: 连接 URL
+    """
+    url = url or settings.redis_url
+    if not settings.redis_socket_path:
+        return url
+    db = urlparse(url).path.lstrip("/") or "0"
+    return f"unix://{settings.redis_socket_path}?db={db}"
+
+
+def create_redis_client(url: Optional[str] = None) -> aioredis.Redis:
+    """
+    创建 Redis 异步客户端（返回原始 bytes，由调用方自行解码）
+
+    Args:
+        url: Redis 连接 URL，默认使用 settings.redis_url
+
+    Returns:
+        aioredis.Redis: Redis 客户端
+    """
+    return aioredis.from_url(
+        redis_connection_url(url),
+        max_connections=settings.redis_max_connections,
+        health_check_interval=settings.redis_health_check_interval,
+        socket_keepalive=True,
+        retry_on_timeout=True,
+        decode_responses=False,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> aioredis.Redis:
+    """获取当前进程共用的 Redis 客户端（首次调用时创建）"""
+    return create_redis_client()
+
+
+async def close_redis() -> None:
+    """关闭共用的 Redis 客户端及其连接池（下次 get_redis 时重新创建）"""
+    if get_redis.cache_info().currsize:
+        await get_redis().aclose()
+        get_redis.cache_clear()
+
+
+# 仅当锁仍由自己持有（值与令牌一致）时删除，避免误删他人在锁过期后获得的锁
+_RELEASE_LOCK_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+else
+    return 0
+end
+"""
+
+
+async def acquire_lock(key: str, ttl_ms: int) -> Optional[str]:
+    """
+    获取 Redis 分布式锁（单实例 SET NX PX）
+
+    Args:
+        key: 锁键
+        ttl_ms: 锁持有时间（毫秒），到期自动释放
+
+    Returns:
+        Optional[str]: 锁令牌（释放时使用），锁已被占用返回None
+    """
+    token = secrets.token_hex(16)
+    if await get_redis().set(key, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+async def release_lock(key: str, token: str) -> bool:
+    """
+    释放 Redis 分布式锁
+
+    Args:
+        key: 锁键
+        token: acquire_lock 返回的令牌
+
+    Returns:
+        bool: 是否释放成功（锁已过期或被他人持有时返回 False）
+    """
+    client = get_redis()
+    return bool(await client.eval(_RELEASE_LOCK_LUA, 1, key, token))
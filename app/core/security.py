@@ -6,16 +6,18 @@
 支持用户认证、权限控制、令牌刷新等操作。
 
 设计思路:
-1. 使用 bcrypt 进行密码加密
-2. 使用 PyJWT 进行 JWT 令牌生成和验证
+1. 使用 passlib CryptContext (argon2id，兼容 bcrypt) 进行密码加密
+2. 使用 PyJWT 进行 JWT 令牌生成和验证（支持 HS256 共享密钥与 EdDSA 非对称密钥）
 3. 支持访问令牌和刷新令牌
-4. 集成 Redis 进行令牌黑名单管理
+4. 集成 Redis 进行令牌黑名单管理（键为令牌 blake2s 摘要，TTL 为令牌剩余有效期）
 5. 提供权限验证装饰器
 
 主要组件和调用关系:
 1. 密码处理函数:
-   - get_password_hash(): 使用 bcrypt 对密码进行哈希处理
-   - verify_password(): 验证明文密码与哈希密码是否匹配
+   - get_password_hash(): 使用 argon2id 对密码进行哈希处理 (pwd_context)
+   - verify_password(): 验证明文密码与哈希密码是否匹配（兼容历史 bcrypt 哈希）
+   - aget_password_hash() / averify_password(): 在线程池中执行的异步版本，供请求处理路径使用
+   - averify_and_update_password(): 验证密码并在哈希过时（bcrypt/参数变更）时返回新哈希
 
 2. JWT令牌处理函数:
    - create_access_token(): 创建访问令牌
@@ -26,23 +28,34 @@
 
 3. 权限检查函数:
    - is_user_in_role(): 检查用户是否具有指定角色
+   - get_current_principal(): 仅基于令牌载荷的认证主体（FastAPI依赖项，无需加载 User）
    - get_current_user(): 获取当前认证用户（FastAPI依赖项）
    - get_current_active_user(): 获取当前活跃用户（FastAPI依赖项）
    - get_current_merchant(): 获取当前商家用户（FastAPI依赖项）
    - get_current_admin(): 获取当前管理员用户（FastAPI依赖项）
-   - require_permission(): 权限检查装饰器工厂函数
+   - get_merchant_principal() / get_admin_principal(): 基于认证主体的角色检查（无需加载 User）
+   - require_user / require_merchant / require_admin: 路由层使用的依赖别名（返回 AuthPrincipal）
+   - BearerToken / DBSession / CurrentUser / CurrentPrincipal: Annotated 依赖类型别名
+   - authorize(): 统一的权限检查依赖，通过 Security(authorize, scopes=[...]) 使用
+   - require_permission(): 返回 Security(authorize, scopes=[role]) 的便捷函数
 
 4. 主要调用关系:
-   - 认证流程: oauth2_scheme -> get_current_user -> get_user_by_id
-   - 权限检查: require_permission -> permission_checker -> verify_token
+   - 认证流程: extract_bearer -> get_current_user -> get_active_user_by_id
+   - 权限检查: Security(authorize, scopes) -> get_current_principal -> verify_token
    - 令牌创建: create_tokens_for_user -> create_access_token & create_refresh_token
 """
 
-from datetime import datetime, timedelta
-from typing import Optional, Union, Dict, Any
-import bcrypt
+from datetime import timedelta
+from typing import Optional, Union, Dict, Any, FrozenSet, Tuple
+import hashlib
+import time
+from cachetools import TTLCache
+from cryptography.hazmat.primitives import serialization
+from fastapi.concurrency import run_in_threadpool
 import jwt
 from jwt import PyJWTError
+from jwt.algorithms import get_default_algorithms
+from passlib.context import CryptContext
 import structlog
 
 from .config import settings
@@ -55,9 +68,63 @@ logger = structlog.get_logger(__name__)
 JWT_ALGORITHM = settings.algorithm
 JWT_SECRET_KEY = settings.secret_key
 
+
+def _load_jwt_keys() -> Tuple[Any, Any]:
+    """
+    加载 JWT 签名/验证密钥（模块导入时执行一次）
+    
+    HS* 算法使用共享密钥；非对称算法（如 EdDSA）从 PEM 文件加载为密钥对象，
+    PyJWT 收到密钥对象后不再逐次解析 PEM。API 节点可只配置公钥。
+    
+    Returns:
+        Tuple[Any, Any]: (签名密钥, 验证密钥)，未配置私钥时签名密钥为 None
+    """
+    if JWT_ALGORITHM.startswith("HS"):
+        key = get_default_algorithms()[JWT_ALGORITHM].prepare_key(JWT_SECRET_KEY)
+        return key, key
+    
+    signing_key = None
+    if settings.jwt_private_key_path:
+        with open(settings.jwt_private_key_path, "rb") as f:
+            signing_key = serialization.load_pem_private_key(f.read(), password=None)
+    
+    if settings.jwt_public_key_path:
+        with open(settings.jwt_public_key_path, "rb") as f:
+            verify_key = serialization.load_pem_public_key(f.read())
+    elif signing_key is not None:
+        verify_key = signing_key.public_key()
+    else:
+        raise RuntimeError(f"JWT public key is required for algorithm {JWT_ALGORITHM}")
+    
+    return signing_key, verify_key
+
+
+# 预构建的 JWT 编解码器与密钥对象，避免每次调用重新构造实例和处理密钥
+_JWT = jwt.PyJWT()
+_JWT_ALGORITHMS = (JWT_ALGORITHM,)
+_SIGNING_KEY, _VERIFY_KEY = _load_jwt_keys()
+
 # 令牌过期时间配置，从配置中获取
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+ACCESS_TOKEN_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+REFRESH_TOKEN_EXPIRE_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+# 密码哈希上下文：模块导入时创建一次，复用成本参数与盐生成器
+# 新密码使用 argon2id (argon2-cffi / libargon2)；bcrypt 仅用于校验历史哈希，登录成功后自动升级
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated=["bcrypt"],
+    argon2__type="ID",
+    argon2__time_cost=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__parallelism=settings.argon2_parallelism,
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+# 已验证令牌缓存：token -> payload，客户端在令牌有效期内重复使用同一令牌，
+# 命中时跳过 base64 解码与 HMAC 验签（str 的哈希值会被缓存，无需额外摘要计算）
+_verified_token_cache: TTLCache = TTLCache(maxsize=50_000, ttl=60)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -72,10 +139,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         bool: 密码是否匹配
     """
     try:
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'), 
-            hashed_password.encode('utf-8')
-        )
+        return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
         logger.error("Password verification error", error=str(e))
         return False
@@ -92,14 +156,68 @@ def get_password_hash(password: str) -> str:
         str: 哈希后的密码
     """
     try:
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return pwd_context.hash(password)
     except Exception as e:
         logger.error("Password hashing error", error=str(e))
         raise
 
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    异步验证密码（哈希计算在线程池中执行，避免阻塞事件循环）
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希密码
+        
+    Returns:
+        bool: 密码是否匹配
+    """
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，哈希过时（历史 bcrypt 或参数变更）时同时生成新哈希
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希密码
+        
+    Returns:
+        Tuple[bool, Optional[str]]: (密码是否匹配, 需要回写的新哈希或 None)
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        logger.error("Password verification error", error=str(e))
+        return False, None
+
+
+async def averify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """异步版本的 verify_and_update_password（在线程池中执行）"""
+    return await run_in_threadpool(verify_and_update_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """
+    异步哈希密码（哈希计算在线程池中执行，避免阻塞事件循环）
+    
+    Args:
+        password: 明文密码
+        
+    Returns:
+        str: 哈希后的密码
+    """
+    return await run_in_threadpool(get_password_hash, password)
+
+
 def create_access_token(
     data: dict, 
     expires_delta: Optional[timedelta] = None
@@ -116,13 +234,14 @@ def create_access_token(
     """
     try:
         to_encode = data.copy()
+        now = int(time.time())
         if expires_delta:
-            expire = datetime.utcnow() + expires_delta
+            expire = now + int(expires_delta.total_seconds())
         else:
-            expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+            expire = now + ACCESS_TOKEN_EXPIRE_SECONDS
         
         to_encode.update({"exp": expire, "type": "access"})
-        encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        encoded_jwt = _JWT.encode(to_encode, _SIGNING_KEY, algorithm=JWT_ALGORITHM)
         return encoded_jwt
     except Exception as e:
         logger.error("Access token creation error", error=str(e))
@@ -145,13 +264,14 @@ def create_refresh_token(
     """
     try:
         to_encode = data.copy()
+        now = int(time.time())
         if expires_delta:
-            expire = datetime.utcnow() + expires_delta
+            expire = now + int(expires_delta.total_seconds())
         else:
-            expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+            expire = now + REFRESH_TOKEN_EXPIRE_SECONDS
         
         to_encode.update({"exp": expire, "type": "refresh"})
-        encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        encoded_jwt = _JWT.encode(to_encode, _SIGNING_KEY, algorithm=JWT_ALGORITHM)
         return encoded_jwt
     except Exception as e:
         logger.error("Refresh token creation error", error=str(e))
@@ -169,7 +289,7 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
         Optional[Dict[str, Any]]: 解码后的数据，如果失败返回 None
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = _JWT.decode(token, _VERIFY_KEY, algorithms=_JWT_ALGORITHMS)
         return payload
     except PyJWTError as e:
         logger.warning("Token decode error", error=str(e))
@@ -189,6 +309,13 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: 验证后的数据，如果失败返回 None
     """
+    payload = _verified_token_cache.get(token)
+    if payload is not None:
+        exp = payload.get("exp")
+        if not exp or exp > time.time():
+            return payload
+        _verified_token_cache.pop(token, None)
+    
     payload = decode_token(token)
     if not payload:
         return None
@@ -198,12 +325,8 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         logger.warning("Token missing type", token=token)
         return None
     
-    # 检查过期时间
-    exp = payload.get("exp")
-    if exp and datetime.utcfromtimestamp(exp) < datetime.utcnow():
-        logger.info("Token expired", token=token)
-        return None
-    
+    # 过期时间已由 PyJWT 在解码时校验
+    _verified_token_cache[token] = payload
     return payload
 
 
@@ -230,19 +353,12 @@ def create_tokens_for_user(user: User) -> Dict[str, str]:
         refresh_data = {
             "user_id": user.id,
             "email": user.email,
-            "token_id": f"{user.id}-{int(datetime.utcnow().timestamp())}"
+            "token_id": f"{user.id}-{int(time.time())}"
         }
         
         # 创建令牌
-        access_token = create_access_token(
-            data=access_data,
-            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        )
-        
-        refresh_token = create_refresh_token(
-            data=refresh_data,
-            expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        )
+        access_token = create_access_token(data=access_data)
+        refresh_token = create_refresh_token(data=refresh_data)
         
         return {
             "access_token": access_token,
@@ -279,31 +395,264 @@ def is_user_in_role(payload: Dict[str, Any], required_role: Union[str, UserRole]
     return user_role == required_role
 
 
-# 权限装饰器常量，定义各角色可访问的权限级别
-PERMISSIONS = {
-    "user": [UserRole.USER, UserRole.MERCHANT, UserRole.ADMIN],
-    "merchant": [UserRole.MERCHANT, UserRole.ADMIN],
-    "admin": [UserRole.ADMIN]
+# 权限装饰器常量，定义各角色可访问的权限级别（以角色字符串值为键，避免每次请求构造枚举）
+PERMISSIONS: Dict[str, FrozenSet[str]] = {
+    "user": frozenset({UserRole.USER.value, UserRole.MERCHANT.value, UserRole.ADMIN.value}),
+    "merchant": frozenset({UserRole.MERCHANT.value, UserRole.ADMIN.value}),
+    "admin": frozenset({UserRole.ADMIN.value}),
 }
 
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from dataclasses import dataclass
+import asyncio
+
+from fastapi import Depends, HTTPException, Request, Security, status
+from fastapi.security import OAuth2PasswordBearer, SecurityScopes
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, Tuple
+from typing import Annotated, Optional, Tuple
 
 from ..core.database import get_async_db
+from ..core.redis import get_redis
 from ..models.user import User
-from ..services.user_service import get_user_by_id
+
+
+class BearerTokenExtractor(OAuth2PasswordBearer):
+    """
+    Bearer 令牌提取器
+    
+    继承 OAuth2PasswordBearer 以保留 OpenAPI 安全方案声明，
+    请求时直接切片 authorization 头，跳过通用的方案解析。
+    """
+    
+    async def __call__(self, request: Request) -> str:
+        authorization = request.headers.get("authorization")
+        if not authorization or authorization[:7].lower() != "bearer ":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return authorization[7:]
 
 
 # OAuth2 密码流，用于从请求头中提取Bearer Token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
+extract_bearer = BearerTokenExtractor(tokenUrl="api/v1/auth/login")
+oauth2_scheme = extract_bearer  # 兼容旧名称
+
+# 依赖别名：各依赖共用同一 Depends 对象，签名解析与请求内结果缓存均以此为键
+BearerToken = Annotated[str, Depends(extract_bearer)]
+DBSession = Annotated[AsyncSession, Depends(get_async_db)]
+
+# 用户状态缓存：user_id -> 是否可用（活跃且未删除），减少每个请求的数据库查询
+_user_status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+# 跨进程失效通知频道（登出、角色/状态变更时发布）
+USER_INVALIDATE_CHANNEL = "user:invalidate"
+
+
+@dataclass(frozen=True)
+class AuthPrincipal:
+    """认证主体：直接由访问令牌载荷构建，无需查询数据库"""
+    user_id: int
+    email: Optional[str]
+    role: Optional[str]
+    username: Optional[str]
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "AuthPrincipal":
+        return cls(
+            user_id=payload["user_id"],
+            email=payload.get("email"),
+            role=payload.get("role"),
+            username=payload.get("username"),
+        )
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """移除本进程内缓存的用户状态"""
+    _user_status_cache.pop(user_id, None)
+
+
+async def publish_user_invalidation(user_id: int) -> None:
+    """
+    失效用户状态缓存并通知其他进程
+    
+    Args:
+        user_id: 用户ID
+    """
+    invalidate_user_cache(user_id)
+    try:
+        await get_redis().publish(USER_INVALIDATE_CHANNEL, str(user_id))
+    except Exception as e:
+        logger.warning("Publish user invalidation failed", error=str(e), user_id=user_id)
+
+
+async def listen_user_invalidations() -> None:
+    """订阅用户失效频道并清理本地缓存（在应用生命周期内作为后台任务运行）"""
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(USER_INVALIDATE_CHANNEL)
+            try:
+                async for message in pubsub.listen():
+                    try:
+                        invalidate_user_cache(int(message["data"]))
+                    except (TypeError, ValueError):
+                        continue
+            finally:
+                await pubsub.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("User invalidation listener error", error=str(e))
+            await asyncio.sleep(5)
+
+
+def _blacklist_key(token: str) -> str:
+    """令牌黑名单键：blake2s 摘要（16 字节）代替原始令牌，键长固定"""
+    return "bl:" + hashlib.blake2s(token.encode("utf-8"), digest_size=16).hexdigest()
+
+
+async def add_token_to_blacklist(token: str) -> bool:
+    """
+    将令牌加入黑名单，过期时间与令牌剩余有效期一致，到期由 Redis 自动清除
+    
+    Args:
+        token: JWT 令牌
+        
+    Returns:
+        bool: 是否加入成功（令牌无效或已过期时返回 False）
+    """
+    payload = verify_token(token)
+    if not payload:
+        return False
+    
+    _verified_token_cache.pop(token, None)
+    ttl = max(1, int(payload.get("exp", 0) - time.time()))
+    await get_redis().set(_blacklist_key(token), "1", ex=ttl)
+    return True
+
+
+async def is_token_blacklisted(token: str) -> bool:
+    """
+    检查令牌是否在黑名单中
+    
+    Args:
+        token: JWT 令牌
+        
+    Returns:
+        bool: 是否已被拉黑（Redis 不可用时按未拉黑处理）
+    """
+    try:
+        return bool(await get_redis().exists(_blacklist_key(token)))
+    except Exception as e:
+        logger.warning("Token blacklist check failed", error=str(e))
+        return False
+
+
+async def _is_user_usable(db: AsyncSession, user_id: int) -> Optional[bool]:
+    """
+    查询用户是否可用（优先使用缓存）
+    
+    Returns:
+        Optional[bool]: 是否活跃且未删除，用户不存在时返回 None
+    """
+    usable = _user_status_cache.get(user_id)
+    if usable is not None:
+        return usable
+    
+    result = await db.execute(
+        select(User.is_active, User.is_deleted).where(User.id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    
+    usable = row.is_active and not row.is_deleted
+    _user_status_cache[user_id] = usable
+    return usable
+
+
+async def get_current_principal(
+    token: BearerToken,
+    db: DBSession
+) -> AuthPrincipal:
+    """
+    获取当前认证主体
+    
+    仅解析令牌并校验（缓存的）用户状态，适用于只需要用户ID/角色的接口。
+    
+    Args:
+        token: JWT 令牌
+        db: 数据库会话
+        
+    Returns:
+        AuthPrincipal: 当前认证主体
+        
+    Raises:
+        HTTPException: 认证失败时抛出异常
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    payload = verify_token(token)
+    if not payload or not payload.get("user_id"):
+        raise credentials_exception
+    if await is_token_blacklisted(token):
+        raise credentials_exception
+    
+    usable = await _is_user_usable(db, payload["user_id"])
+    if usable is None:
+        raise credentials_exception
+    if not usable:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive or deleted"
+        )
+    
+    return AuthPrincipal.from_payload(payload)
+
+
+CurrentPrincipal = Annotated[AuthPrincipal, Depends(get_current_principal)]
+
+
+def _check_principal_role(principal: AuthPrincipal, permission: str, detail: str) -> AuthPrincipal:
+    """按 PERMISSIONS 检查认证主体的角色，不满足时抛出 403"""
+    if principal.role not in PERMISSIONS[permission]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    return principal
+
+
+async def get_merchant_principal(principal: CurrentPrincipal) -> AuthPrincipal:
+    """
+    获取当前商家（或管理员）认证主体，无需加载 User
+    
+    Raises:
+        HTTPException: 用户不是商家时抛出异常
+    """
+    return _check_principal_role(principal, "merchant", "Merchant access required")
+
+
+async def get_admin_principal(principal: CurrentPrincipal) -> AuthPrincipal:
+    """
+    获取当前管理员认证主体，无需加载 User
+    
+    Raises:
+        HTTPException: 用户不是管理员时抛出异常
+    """
+    return _check_principal_role(principal, "admin", "Admin access required")
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_async_db)
+    token: BearerToken,
+    db: DBSession
 ) -> User:
     """
     获取当前认证用户
@@ -324,9 +673,9 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # 验证令牌
+    # 验证令牌（签名、过期与黑名单）
     payload = verify_token(token)
-    if not payload:
+    if not payload or await is_token_blacklisted(token):
         raise credentials_exception
     
     # 获取用户ID
@@ -334,23 +683,26 @@ async def get_current_user(
     if not user_id:
         raise credentials_exception
     
-    # 获取用户
-    user = await get_user_by_id(db, user_id)
-    if not user:
+    # 已缓存为不可用的用户直接拒绝，无需查询数据库
+    if _user_status_cache.get(user_id) is False:
         raise credentials_exception
     
-    # 检查用户状态
-    if not user.is_active or user.is_deleted:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User account is inactive or deleted"
-        )
+    # 获取用户（活跃/未删除条件在 SQL 中过滤，不可用用户不加载整行）
+    # user_service 在模块级导入本模块的密码、令牌与失效通知函数，此处延迟导入以避免循环导入
+    from ..services.user_service import get_active_user_by_id
+    user = await get_active_user_by_id(db, user_id)
+    _user_status_cache[user_id] = user is not None
+    if not user:
+        raise credentials_exception
     
     return user
 
 
+CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser
 ) -> User:
     """
     获取当前活跃用户
@@ -373,7 +725,7 @@ async def get_current_active_user(
 
 
 async def get_current_merchant(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser
 ) -> User:
     """
     获取当前商家用户
@@ -396,7 +748,7 @@ async def get_current_merchant(
 
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser
 ) -> User:
     """
     获取当前管理员用户
@@ -418,75 +770,68 @@ async def get_current_admin(
     return current_user
 
 
-def require_permission(required_role: str):
+async def authorize(
+    security_scopes: SecurityScopes,
+    principal: CurrentPrincipal
+) -> AuthPrincipal:
     """
-    权限检查装饰器
+    统一的权限检查依赖
+    
+    所需角色通过 Security(authorize, scopes=[...]) 声明，所有权限要求共用这一个依赖，
+    同一请求内相同 scopes 的结果由 FastAPI 缓存，不会重复验证。
+    角色取自令牌载荷，用户状态使用缓存校验，不加载 User。
     
     Args:
-        required_role: 所需角色
+        security_scopes: 所需权限（PERMISSIONS 的键）
+        principal: 当前认证主体
         
     Returns:
-        callable: 依赖注入函数
-    """
-    async def permission_checker(
-        token: str = Depends(oauth2_scheme),
-        db: AsyncSession = Depends(get_async_db)
-    ) -> Tuple[User, Dict[str, Any]]:
-        """
-        权限检查器
-        
-        Args:
-            token: JWT 令牌
-            db: 数据库会话
-            
-        Returns:
-            Tuple[User, Dict[str, Any]]: 用户对象和令牌载荷
-            
-        Raises:
-            HTTPException: 权限不足时抛出异常
-        """
-        credentials_exception = HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-        
-        # 验证令牌
-        payload = verify_token(token)
-        if not payload:
-            raise credentials_exception
+        AuthPrincipal: 当前认证主体
         
-        # 检查角色权限
-        if required_role not in PERMISSIONS:
+    Raises:
+        HTTPException: 认证失败或权限不足时抛出异常
+    """
+    authenticate_value = (
+        f'Bearer scope="{security_scopes.scope_str}"' if security_scopes.scopes else "Bearer"
+    )
+    
+    # 检查角色权限
+    for required_role in security_scopes.scopes:
+        allowed_roles = PERMISSIONS.get(required_role)
+        if allowed_roles is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Invalid permission requirement"
             )
-        
-        allowed_roles = PERMISSIONS[required_role]
-        user_role = payload.get("role")
-        if not user_role or UserRole(user_role) not in allowed_roles:
+        if principal.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"{required_role} permission required"
+                detail=f"{required_role} permission required",
+                headers={"WWW-Authenticate": authenticate_value},
             )
+    
+    return principal
+
+
+def require_permission(required_role: str):
+    """
+    权限检查依赖工厂
+    
+    Args:
+        required_role: 所需角色
         
-        # 获取用户
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise credentials_exception
-        
-        user = await get_user_by_id(db, user_id)
-        if not user:
-            raise credentials_exception
-        
-        # 检查用户状态
-        if not user.is_active or user.is_deleted:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User account is inactive or deleted"
-            )
+    Returns:
+        Security 依赖，等价于 Security(authorize, scopes=[required_role])
         
-        return user, payload
-    
-    return permission_checker
\ No newline at end of file
+    Raises:
+        ValueError: 未知的权限要求
+    """
+    if required_role not in PERMISSIONS:
+        raise ValueError(f"Invalid permission requirement: {required_role}")
+    return Security(authorize, scopes=[required_role])
+
+# 路由依赖别名：均为 async def，FastAPI 直接在事件循环中调用，不经过线程池；
+# 只需用户ID/角色，基于令牌载荷与缓存的用户状态，不加载 User（需要完整用户时使用 get_current_active_user）
+require_user = get_current_principal
+require_merchant = get_merchant_principal
+require_admin = get_admin_principal
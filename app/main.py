@@ -17,36 +17,28 @@ FastAPI 应用主入口
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import contextlib
 import structlog
 import time
 import uvicorn
 
 from .core.config import settings
-from .core.database import init_db, close_db, check_db_health
+from .core.database import init_db, warmup_db, close_db, check_db_health
 from .core.exceptions import FastAPIShopException, create_http_exception
+from .core.logging import configure_logging, shutdown_logging
+from .core.middleware import RequestLoggingMiddleware, SecurityHeadersMiddleware
+from .core.redis import close_redis
+from .core.security import listen_user_invalidations
+from .models.ids import init_id_generator
 from .api import api_router
 
 # 配置结构化日志
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+configure_logging()
 
 logger = structlog.get_logger(__name__)
 
@@ -59,18 +51,28 @@ async def lifespan(app: FastAPI):
     处理应用启动和关闭事件
     """
     # 启动事件
+    configure_logging()
     logger.info("Starting FastAPI Shop application")
     
     try:
+        # 租用本进程的 Snowflake worker ID（非开发环境租用失败时启动失败）
+        init_id_generator()
+        
         # 初始化数据库
         await init_db()
         logger.info("Database initialized successfully")
         
+        # 预热连接池
+        await warmup_db()
+        
         # 检查数据库健康状态
         db_healthy = await check_db_health()
         if not db_healthy:
             logger.warning("Database health check failed")
         
+        # 订阅用户状态失效通知
+        invalidation_task = asyncio.create_task(listen_user_invalidations())
+        
         logger.info("Application startup completed")
         
     except Exception as e:
@@ -82,15 +84,26 @@ async def lifespan(app: FastAPI):
     # 关闭事件
     logger.info("Shutting down FastAPI Shop application")
     
+    invalidation_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await invalidation_task
+    
     try:
         # 关闭数据库连接
         await close_db()
         logger.info("Database connections closed")
         
+        # 关闭 Redis 连接池
+        await close_redis()
+        logger.info("Redis connections closed")
+        
         logger.info("Application shutdown completed")
         
     except Exception as e:
         logger.error("Application shutdown failed", error=str(e))
+    
+    # 最后停止后台日志线程，确保关闭日志已输出
+    shutdown_logging()
 
 
 # 创建 FastAPI 应用
@@ -101,6 +114,7 @@ app = FastAPI(
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
     openapi_url="/openapi.json" if settings.debug else None,
+    default_response_class=ORJSONResponse,  # 使用 orjson 序列化响应
     lifespan=lifespan
 )
 
@@ -121,64 +135,12 @@ if settings.is_production:
     )
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """
-    请求日志中间件
-    
-    记录所有 HTTP 请求的详细信息
-    """
-    start_time = time.time()
-    
-    # 记录请求信息
-    logger.info(
-        "Request started",
-        method=request.method,
-        url=str(request.url),
-        client_ip=request.client.host if request.client else None,
-        user_agent=request.headers.get("user-agent")
-    )
-    
-    # 处理请求
-    response = await call_next(request)
-    
-    # 计算处理时间
-    process_time = time.time() - start_time
-    
-    # 记录响应信息
-    logger.info(
-        "Request completed",
-        method=request.method,
-        url=str(request.url),
-        status_code=response.status_code,
-        process_time=round(process_time, 4)
-    )
-    
-    # 添加处理时间头
-    response.headers["X-Process-Time"] = str(process_time)
-    
-    return response
+# 配置 GZip 压缩中间件（纯 ASGI 实现，仅压缩 ≥1KB 的响应）
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
-
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    """
-    安全头中间件
-    
-    添加安全相关的 HTTP 头
-    """
-    response = await call_next(request)
-    
-    # 添加安全头
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    
-    if settings.is_production:
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    
-    return response
+# 配置 请求日志 与 安全头 中间件（纯 ASGI 实现）
+app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
 
 
 # 注册 API 路由
@@ -224,11 +186,11 @@ async def health_check():
         
         status_code = 200 if db_healthy else 503
         
-        return JSONResponse(content=health_status, status_code=status_code)
+        return ORJSONResponse(content=health_status, status_code=status_code)
         
     except Exception as e:
         logger.error("Health check failed", error=str(e))
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "unhealthy",
                 "timestamp": time.time(),
@@ -288,7 +250,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         method=request.method
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error_code": "HTTP_ERROR",
@@ -314,7 +276,7 @@ async def general_exception_handler(request: Request, exc: Exception):
         exc_info=True
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error_code": "INTERNAL_SERVER_ERROR",
@@ -350,6 +312,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
+        loop="uvloop",
+        http="httptools",
         reload=settings.debug,
         log_level="info" if settings.debug else "warning"
     )
@@ -162,7 +162,8 @@ class Address(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="地址元数据"
     )
@@ -131,7 +131,8 @@ class ProductEmbedding(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="嵌入元数据"
     )
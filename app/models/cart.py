@@ -21,15 +21,17 @@ from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, Enum, JSON, Index, Numeric
+    ForeignKey, JSON, Index, BigInteger, CheckConstraint, func, text
 )
-from sqlalchemy.orm import relationship, Mapped, mapped_column
+from sqlalchemy.orm import relationship, Mapped, mapped_column, validates
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import enum
 import uuid
 
 # 引入数据库基类
 from ..core.database import Base
+from .money import cents_hybrid
 
 
 class CartStatus(str, enum.Enum):
@@ -57,38 +59,48 @@ class Cart(Base):
     )
     
     # 购物车状态
-    status: Mapped[CartStatus] = mapped_column(
-        Enum(CartStatus),
-        default=CartStatus.ACTIVE,
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default=CartStatus.ACTIVE.value,
         comment="购物车状态"
     )
     
     # 价格信息
-    subtotal: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="商品小计"
-    )
-    tax_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="税费"
-    )
-    shipping_fee: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="配送费"
-    )
-    discount_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="折扣金额"
-    )
-    total_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="购物车总额"
+    subtotal_cents: Mapped[int] = mapped_column(
+        "subtotal",
+        BigInteger,
+        default=0,
+        comment="商品小计(分)"
+    )
+    subtotal = cents_hybrid("subtotal_cents")
+    tax_amount_cents: Mapped[int] = mapped_column(
+        "tax_amount",
+        BigInteger,
+        default=0,
+        comment="税费(分)"
     )
+    tax_amount = cents_hybrid("tax_amount_cents")
+    shipping_fee_cents: Mapped[int] = mapped_column(
+        "shipping_fee",
+        BigInteger,
+        default=0,
+        comment="配送费(分)"
+    )
+    shipping_fee = cents_hybrid("shipping_fee_cents")
+    discount_amount_cents: Mapped[int] = mapped_column(
+        "discount_amount",
+        BigInteger,
+        default=0,
+        comment="折扣金额(分)"
+    )
+    discount_amount = cents_hybrid("discount_amount_cents")
+    total_amount_cents: Mapped[int] = mapped_column(
+        "total_amount",
+        BigInteger,
+        default=0,
+        comment="购物车总额(分)"
+    )
+    total_amount = cents_hybrid("total_amount_cents")
     
     # 商品统计
     item_count: Mapped[int] = mapped_column(
@@ -103,7 +115,8 @@ class Cart(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="购物车元数据"
     )
@@ -133,23 +146,41 @@ class Cart(Base):
     items: Mapped[List["CartItem"]] = relationship(
         "CartItem", 
         back_populates="cart",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="selectin"  # 批量加载购物车项，避免 N+1 查询
     )
     
     # 索引
     __table_args__ = (
-        Index("idx_carts_user", "user_id"),
-        Index("idx_carts_status", "status"),
+        # 覆盖"用户的活跃购物车，按更新时间倒序"查询，可走仅索引扫描
+        Index(
+            "idx_carts_user_status_updated",
+            "user_id", "status", text("updated_at DESC"),
+            postgresql_include=["item_count", "total_amount"],
+        ),
         Index("idx_carts_expires", "expires_at"),
-        Index("idx_carts_updated", "updated_at"),
+        CheckConstraint(
+            "status IN (" + ", ".join(f"'{s.value}'" for s in CartStatus) + ")",
+            name="ck_carts_status",
+        ),
     )
     
-    @property
+    @validates("status")
+    def validate_status(self, key: str, value: str) -> str:
+        """校验购物车状态取值"""
+        return CartStatus(value).value
+    
+    @hybrid_property
     def is_expired(self) -> bool:
         """购物车是否已过期"""
         return datetime.utcnow() > self.expires_at
     
-    @property
+    @is_expired.expression
+    def is_expired(cls):
+        # expires_at 为 UTC 无时区时间
+        return cls.expires_at < func.timezone("UTC", func.now())
+    
+    @hybrid_property
     def is_empty(self) -> bool:
         """购物车是否为空"""
         return self.item_count == 0
@@ -198,21 +229,25 @@ class CartItem(Base):
     )
     
     # 价格和数量
-    unit_price: Mapped[float] = mapped_column(
-        Numeric(10, 2),
+    unit_price_cents: Mapped[int] = mapped_column(
+        "unit_price",
+        BigInteger,
         nullable=False,
-        comment="单价"
+        comment="单价(分)"
     )
+    unit_price = cents_hybrid("unit_price_cents")
     quantity: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
         comment="数量"
     )
-    total_price: Mapped[float] = mapped_column(
-        Numeric(10, 2),
+    total_price_cents: Mapped[int] = mapped_column(
+        "total_price",
+        BigInteger,
         nullable=False,
-        comment="小计"
+        comment="小计(分)"
     )
+    total_price = cents_hybrid("total_price_cents")
     
     # 商品属性
     product_attributes: Mapped[Optional[Dict[str, Any]]] = mapped_column(
@@ -225,7 +260,8 @@ class CartItem(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="购物车项元数据"
     )
@@ -257,6 +293,7 @@ class CartItem(Base):
     __table_args__ = (
         Index("idx_cart_items_cart", "cart_id"),
         Index("idx_cart_items_product", "product_id"),
+        # 唯一约束同时作为 CartService.upsert_cart_item 的 ON CONFLICT 目标
         Index("idx_cart_items_cart_product", "cart_id", "product_id", unique=True),
     )
     
@@ -0,0 +1,154 @@
+"""
+业务编号生成
+============
+
+支付编号、退款编号等使用 Snowflake 风格的 64 位整数：
+[41 位毫秒时间戳 | 10 位 worker ID | 12 位序列号]
+
+整数编号按时间递增，以 BigInteger 存储时唯一索引更小、比较更快；
+对外展示时编码为 Crockford Base32 字符串。
+"""
+
+from typing import Optional
+import hashlib
+import os
+import socket
+import threading
+import time
+
+from redis import Redis as _SyncRedis
+
+from ..core.config import settings
+from ..core.redis import redis_connection_url
+
+# 自定义纪元 (2024-01-01 00:00:00 UTC)，41 位毫秒时间戳可用约 69 年
+EPOCH_MS = 1704067200000
+
+WORKER_ID_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+# Crockford Base32 字母表（去除 I、L、O、U 以避免混淆）
+_BASE32_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32_ALPHABET)}
+
+
+class SnowflakeGenerator:
+    """线程安全的 Snowflake ID 生成器"""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id & MAX_WORKER_ID
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms < self._last_ms:
+                # 时钟回拨：沿用上次时间戳，依靠序列号保证唯一
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+                if self._sequence == 0:
+                    # 同一毫秒序列号用尽，等待下一毫秒
+                    while now_ms <= self._last_ms:
+                        now_ms = int(time.time() * 1000)
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (
+                ((now_ms - EPOCH_MS) << (WORKER_ID_BITS + SEQUENCE_BITS))
+                | (self.worker_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+
+
+# worker ID 租约计数器：每个进程启动时 INCR 一次，取低 10 位作为 worker ID
+WORKER_ID_SEQ_KEY = "snowflake:worker_seq"
+
+
+def _lease_worker_id() -> int:
+    """从 Redis 计数器租用 worker ID（同步客户端，只在进程首次生成编号时调用一次）"""
+    client = _SyncRedis.from_url(redis_connection_url())
+    try:
+        return int(client.incr(WORKER_ID_SEQ_KEY)) & MAX_WORKER_ID
+    finally:
+        client.close()
+
+
+def resolve_worker_id() -> int:
+    """
+    解析当前进程使用的 worker ID
+    
+    每个进程（uvicorn 多 worker、Celery prefork 子进程、多个容器副本）各自从
+    Redis 计数器租用，进程间互不相同；计数器按 1024 取模循环，同时存活的进程数
+    不超过 1024 时不会重复。开发环境 Redis 不可用时按主机名与进程号派生。
+    
+    Returns:
+        int: worker ID (0-1023)
+        
+    Raises:
+        RuntimeError: 非开发环境无法从 Redis 租用 worker ID
+    """
+    try:
+        return _lease_worker_id()
+    except Exception as e:
+        if not settings.is_development:
+            raise RuntimeError(f"Failed to lease Snowflake worker ID from Redis: {e}") from e
+    digest = hashlib.blake2b(
+        f"{socket.gethostname()}:{os.getpid()}".encode(), digest_size=4
+    ).digest()
+    return int.from_bytes(digest, "big") & MAX_WORKER_ID
+
+
+# 生成器在首次使用时按当前进程创建（预加载后 fork 的子进程各自重新租用 worker ID）
+_generator: Optional[SnowflakeGenerator] = None
+_generator_pid: Optional[int] = None
+
+
+def init_id_generator() -> SnowflakeGenerator:
+    """
+    获取当前进程的 Snowflake 生成器（进程内首次调用时租用 worker ID）
+    
+    应用启动时调用，租用失败时启动即失败
+    """
+    global _generator, _generator_pid
+    pid = os.getpid()
+    if _generator is None or _generator_pid != pid:
+        _generator = SnowflakeGenerator(resolve_worker_id())
+        _generator_pid = pid
+    return _generator
+
+
+def next_id() -> int:
+    """生成下一个 Snowflake ID"""
+    return init_id_generator().next_id()
+
+
+def encode_base32(value: int) -> str:
+    """将非负整数编码为 Crockford Base32 字符串"""
+    if value == 0:
+        return _BASE32_ALPHABET[0]
+    chars = []
+    while value:
+        value, remainder = divmod(value, 32)
+        chars.append(_BASE32_ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def decode_base32(text: str) -> int:
+    """
+    将 Crockford Base32 字符串解码为整数
+
+    Raises:
+        ValueError: 包含非法字符
+    """
+    value = 0
+    for char in text.strip().upper():
+        try:
+            value = value * 32 + _BASE32_INDEX[char]
+        except KeyError:
+            raise ValueError(f"Invalid base32 character: {char!r}") from None
+    return value
@@ -0,0 +1,27 @@
+"""
+ltree 列类型
+============
+
+PostgreSQL ltree 扩展的最小 SQLAlchemy 映射。路径以字符串形式读写
+（如 "1.5.12"），并提供祖先/后代比较运算，配合 GiST 索引使用。
+"""
+
+from sqlalchemy.types import UserDefinedType
+
+
+class LtreeType(UserDefinedType):
+    """ltree 列类型"""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw) -> str:
+        return "LTREE"
+
+    class comparator_factory(UserDefinedType.Comparator):
+        def descendant_of(self, other):
+            """路径是 other 的后代（含自身）: path <@ other"""
+            return self.op("<@", is_comparison=True)(other)
+
+        def ancestor_of(self, other):
+            """路径是 other 的祖先（含自身）: path @> other"""
+            return self.op("@>", is_comparison=True)(other)
@@ -0,0 +1,57 @@
+"""
+金额字段工具
+============
+
+金额在数据库中以 BigInteger（分）存储，避免 Numeric 列在每行读取时
+实例化 decimal.Decimal，聚合也可直接使用整数加法。
+
+模型中以 ``xxx_cents`` 映射整数列，并通过 cents_hybrid() 暴露同名的
+以元为单位的属性，兼容原有的读写与展示代码。
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+from sqlalchemy.ext.hybrid import hybrid_property
+
+
+def to_cents(value: Union[int, float, Decimal, str]) -> int:
+    """
+    将以元为单位的金额转换为分（四舍五入）
+
+    Args:
+        value: 金额（元）
+
+    Returns:
+        int: 金额（分）
+    """
+    return int((Decimal(str(value)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: Optional[int]) -> Optional[float]:
+    """将分转换为以元为单位的金额"""
+    if cents is None:
+        return None
+    return cents / 100
+
+
+def cents_hybrid(cents_attr: str) -> hybrid_property:
+    """
+    构造以元为单位的金额属性，底层读写 cents_attr 整数列
+
+    Args:
+        cents_attr: 存储分的映射属性名
+
+    Returns:
+        hybrid_property: 实例上返回 float（元），类上返回 SQL 表达式 cents / 100
+    """
+    def fget(self) -> Optional[float]:
+        return from_cents(getattr(self, cents_attr))
+
+    def fset(self, value) -> None:
+        setattr(self, cents_attr, None if value is None else to_cents(value))
+
+    def expr(cls):
+        return getattr(cls, cents_attr) / 100
+
+    return hybrid_property(fget, fset, expr=expr)
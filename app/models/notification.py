@@ -154,7 +154,8 @@ class Notification(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="通知元数据"
     )
@@ -18,7 +18,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, Enum, JSON, Index, Numeric, BigInteger
+    ForeignKey, Enum, JSON, Index, Numeric, BigInteger, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -185,7 +185,8 @@ class Order(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="订单元数据"
     )
@@ -234,6 +235,12 @@ class Order(Base):
         Index("idx_orders_payment_status", "payment_status"),
         Index("idx_orders_created", "created_at"),
         Index("idx_orders_number", "order_number"),
+        # 超时取消扫描：仅索引待支付订单（原生枚举按名称存储）
+        Index(
+            "idx_orders_pending_created",
+            "created_at",
+            postgresql_where=text("status = 'PENDING' AND payment_status = 'PENDING'"),
+        ),
     )
     
     @property
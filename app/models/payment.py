@@ -18,14 +18,17 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, Enum, JSON, Index, Numeric
+    ForeignKey, JSON, Index, BigInteger, CheckConstraint, func, text
 )
-from sqlalchemy.orm import relationship, Mapped, mapped_column
+from sqlalchemy.orm import relationship, Mapped, mapped_column, validates
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import enum
 import uuid
 
 from ..core.database import Base
+from .ids import next_id, encode_base32
+from .money import cents_hybrid
 
 
 class PaymentStatus(str, enum.Enum):
@@ -39,6 +42,10 @@ class PaymentStatus(str, enum.Enum):
     PARTIALLY_REFUNDED = "partially_refunded"  # 部分退款
 
 
+# 已退款（含部分退款）状态
+REFUNDED_STATUSES = (PaymentStatus.REFUNDED.value, PaymentStatus.PARTIALLY_REFUNDED.value)
+
+
 class PaymentMethodType(str, enum.Enum):
     """支付方式类型枚举"""
     CREDIT_CARD = "credit_card"      # 信用卡
@@ -59,12 +66,12 @@ class Payment(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # 支付编号
-    payment_number: Mapped[str] = mapped_column(
-        String(50), 
+    payment_number: Mapped[int] = mapped_column(
+        BigInteger,
         unique=True,
-        index=True,
         nullable=False,
-        comment="支付编号"
+        default=next_id,
+        comment="支付编号(Snowflake)"
     )
     
     # 关联订单
@@ -76,9 +83,9 @@ class Payment(Base):
     )
     
     # 支付状态
-    status: Mapped[PaymentStatus] = mapped_column(
-        Enum(PaymentStatus),
-        default=PaymentStatus.PENDING,
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default=PaymentStatus.PENDING.value,
         comment="支付状态"
     )
     
@@ -88,39 +95,47 @@ class Payment(Base):
         nullable=False,
         comment="支付方式"
     )
-    payment_method_type: Mapped[PaymentMethodType] = mapped_column(
-        Enum(PaymentMethodType),
+    payment_method_type: Mapped[Optional[str]] = mapped_column(
+        String(20),
         comment="支付方式类型"
     )
     
     # 金额信息
-    amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
+    amount_cents: Mapped[int] = mapped_column(
+        "amount",
+        BigInteger,
         nullable=False,
-        comment="支付金额"
+        comment="支付金额(分)"
     )
+    amount = cents_hybrid("amount_cents")
     currency: Mapped[str] = mapped_column(
         String(3),
         default="CNY",
         comment="货币代码"
     )
-    fee_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="手续费"
+    fee_amount_cents: Mapped[int] = mapped_column(
+        "fee_amount",
+        BigInteger,
+        default=0,
+        comment="手续费(分)"
     )
-    net_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
+    fee_amount = cents_hybrid("fee_amount_cents")
+    net_amount_cents: Mapped[int] = mapped_column(
+        "net_amount",
+        BigInteger,
         nullable=False,
-        comment="实际到账金额"
+        comment="实际到账金额(分)"
     )
+    net_amount = cents_hybrid("net_amount_cents")
     
     # 退款信息
-    refunded_amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
-        default=0.0,
-        comment="已退款金额"
+    refunded_amount_cents: Mapped[int] = mapped_column(
+        "refunded_amount",
+        BigInteger,
+        default=0,
+        comment="已退款金额(分)"
     )
+    refunded_amount = cents_hybrid("refunded_amount_cents")
     refund_count: Mapped[int] = mapped_column(
         Integer,
         default=0,
@@ -172,7 +187,8 @@ class Payment(Base):
     )
     
     # 扩展信息
-    metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+    meta: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        "metadata",
         JSONB,
         comment="支付元数据"
     )
@@ -198,35 +214,71 @@ class Payment(Base):
     refunds: Mapped[List["PaymentRefund"]] = relationship(
         "PaymentRefund", 
         back_populates="payment",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="selectin"  # 批量加载退款记录，避免 N+1 查询
     )
     
     # 索引
     __table_args__ = (
-        Index("idx_payments_order", "order_id"),
-        Index("idx_payments_status", "status"),
+        Index("idx_payments_order_status_created", "order_id", "status", text("created_at DESC")),
         Index("idx_payments_gateway", "gateway_transaction_id"),
         Index("idx_payments_created", "created_at"),
-        Index("idx_payments_number", "payment_number"),
-    )
+        # 超时支付扫描：仅索引待支付记录
+        Index(
+            "idx_payments_pending_created",
+            "created_at",
+            postgresql_where=text(f"status = '{PaymentStatus.PENDING.value}'"),
+        ),
+        CheckConstraint(
+            "status IN (" + ", ".join(f"'{s.value}'" for s in PaymentStatus) + ")",
+            name="ck_payments_status",
+        ),
+        CheckConstraint(
+            "payment_method_type IN (" + ", ".join(f"'{t.value}'" for t in PaymentMethodType) + ")",
+            name="ck_payments_payment_method_type",
+        ),
+    )
+    
+    @validates("status")
+    def validate_status(self, key: str, value: str) -> str:
+        """校验支付状态取值"""
+        return PaymentStatus(value).value
+    
+    @validates("payment_method_type")
+    def validate_payment_method_type(self, key: str, value: Optional[str]) -> Optional[str]:
+        """校验支付方式类型取值"""
+        return None if value is None else PaymentMethodType(value).value
     
     @property
+    def public_number(self) -> str:
+        """对外展示的支付编号（Base32）"""
+        return encode_base32(self.payment_number)
+    
+    @hybrid_property
     def is_successful(self) -> bool:
         """支付是否成功"""
         return self.status == PaymentStatus.SUCCESS
     
-    @property
+    @hybrid_property
     def is_refunded(self) -> bool:
         """是否已退款"""
-        return self.status in [PaymentStatus.REFUNDED, PaymentStatus.PARTIALLY_REFUNDED]
+        return self.status in REFUNDED_STATUSES
     
-    @property
+    @is_refunded.expression
+    def is_refunded(cls):
+        return cls.status.in_(REFUNDED_STATUSES)
+    
+    @hybrid_property
     def remaining_amount(self) -> float:
         """剩余可退款金额"""
-        return float(self.amount - self.refunded_amount)
+        return (self.amount_cents - (self.refunded_amount_cents or 0)) / 100
+    
+    @remaining_amount.expression
+    def remaining_amount(cls):
+        return (cls.amount_cents - func.coalesce(cls.refunded_amount_cents, 0)) / 100
     
     def __repr__(self) -> str:
-        return f"<Payment(id={self.id}, payment_number='{self.payment_number}', status='{self.status}')>"
+        return f"<Payment(id={self.id}, payment_number={self.payment_number}, status='{self.status}')>"
 
 
 class PaymentRefund(Base):
@@ -246,20 +298,22 @@ class PaymentRefund(Base):
     )
     
     # 退款编号
-    refund_number: Mapped[str] = mapped_column(
-        String(50), 
+    refund_number: Mapped[int] = mapped_column(
+        BigInteger,
         unique=True,
-        index=True,
         nullable=False,
-        comment="退款编号"
+        default=next_id,
+        comment="退款编号(Snowflake)"
     )
     
     # 退款信息
-    amount: Mapped[float] = mapped_column(
-        Numeric(10, 2),
+    amount_cents: Mapped[int] = mapped_column(
+        "amount",
+        BigInteger,
         nullable=False,
-        comment="退款金额"
+        comment="退款金额(分)"
     )
+    amount = cents_hybrid("amount_cents")
     reason: Mapped[Optional[str]] = mapped_column(
         String(500),
         comment="退款原因"
@@ -309,12 +363,16 @@ class PaymentRefund(Base):
     # 索引
     __table_args__ = (
         Index("idx_payment_refunds_payment", "payment_id"),
-        Index("idx_payment_refunds_number", "refund_number"),
         Index("idx_payment_refunds_created", "created_at"),
     )
     
+    @property
+    def public_number(self) -> str:
+        """对外展示的退款编号（Base32）"""
+        return encode_base32(self.refund_number)
+    
     def __repr__(self) -> str:
-        return f"<PaymentRefund(id={self.id}, refund_number='{self.refund_number}', amount={self.amount})>"
+        return f"<PaymentRefund(id={self.id}, refund_number={self.refund_number}, amount={self.amount})>"
 
 
 class PaymentMethod(Base):
@@ -338,8 +396,8 @@ class PaymentMethod(Base):
         nullable=False,
         comment="支付方式代码"
     )
-    type: Mapped[PaymentMethodType] = mapped_column(
-        Enum(PaymentMethodType),
+    type: Mapped[str] = mapped_column(
+        String(20),
         nullable=False,
         comment="支付方式类型"
     )
@@ -394,8 +452,17 @@ class PaymentMethod(Base):
         Index("idx_payment_methods_code", "code"),
         Index("idx_payment_methods_active", "is_active"),
         Index("idx_payment_methods_type", "type"),
+        CheckConstraint(
+            "type IN (" + ", ".join(f"'{t.value}'" for t in PaymentMethodType) + ")",
+            name="ck_payment_methods_type",
+        ),
     )
     
+    @validates("type")
+    def validate_type(self, key: str, value: str) -> str:
+        """校验支付方式类型取值"""
+        return PaymentMethodType(value).value
+    
     def __repr__(self) -> str:
         return f"<PaymentMethod(id={self.id}, name='{self.name}', code='{self.code}')>"
 
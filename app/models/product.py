@@ -18,14 +18,16 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, Enum, JSON, Index, Numeric, BigInteger
+    ForeignKey, Enum, JSON, Index, Numeric, BigInteger, Computed, FetchedValue, Table,
+    func, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import enum
 import uuid
 
 from ..core.database import Base
+from .ltree import LtreeType
 
 
 class ProductStatus(str, enum.Enum):
@@ -44,10 +46,24 @@ class ProductType(str, enum.Enum):
     SERVICE = "service"    # 服务
 
 
+# 商品-标签关联表
+# 主键 (product_id, tag_id) 覆盖"商品的标签"，反向索引覆盖"标签下的商品"；
+# product_tags.usage_count 由数据库触发器随关联增删维护
+product_tag_link = Table(
+    "product_tag_link",
+    Base.metadata,
+    Column("product_id", Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("product_tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("idx_product_tag_link_tag", "tag_id", "product_id"),
+)
+
+
 class Product(Base):
     """商品模型"""
     
     __tablename__ = "products"
+    # 插入/更新后通过 RETURNING 取回数据库生成的时间戳和生成列，避免异步会话中的延迟加载
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -70,23 +86,32 @@ class Product(Base):
         String(300),
         comment="商品副标题"
     )
+    # 大字段按组延迟加载，列表查询不取；详情查询使用 options(undefer_group("detail"))
     description: Mapped[Optional[str]] = mapped_column(
         Text,
+        deferred=True,
+        deferred_group="detail",
         comment="商品描述"
     )
     short_description: Mapped[Optional[str]] = mapped_column(
         String(500),
         comment="商品简介"
     )
+    # 主图冗余字段，由 product_images 上的触发器维护（优先 is_primary，否则按 order_index 取第一张），
+    # 列表页无需加载 images 集合
+    main_image_url: Mapped[Optional[str]] = mapped_column(
+        String(500),
+        comment="主图URL"
+    )
     
-    # 商品类型和状态
+    # 商品类型和状态（PostgreSQL 原生枚举，4 字节定长）
     product_type: Mapped[ProductType] = mapped_column(
-        Enum(ProductType),
+        Enum(ProductType, name="producttype"),
         default=ProductType.PHYSICAL,
         comment="商品类型"
     )
     status: Mapped[ProductStatus] = mapped_column(
-        Enum(ProductStatus),
+        Enum(ProductStatus, name="productstatus"),
         default=ProductStatus.DRAFT,
         comment="商品状态"
     )
@@ -128,22 +153,23 @@ class Product(Base):
         ForeignKey("product_categories.id"),
         comment="商品分类ID"
     )
-    tags: Mapped[Optional[List[str]]] = mapped_column(
-        ARRAY(String),
-        comment="商品标签"
-    )
-    
     # 商品属性 (JSONB 存储灵活数据)
     attributes: Mapped[Optional[Dict[str, Any]]] = mapped_column(
         JSONB,
+        deferred=True,
+        deferred_group="detail",
         comment="商品属性"
     )
     specifications: Mapped[Optional[Dict[str, Any]]] = mapped_column(
         JSONB,
+        deferred=True,
+        deferred_group="detail",
         comment="商品规格"
     )
     variants: Mapped[Optional[List[Dict[str, Any]]]] = mapped_column(
         JSONB,
+        deferred=True,
+        deferred_group="detail",
         comment="商品变体"
     )
     
@@ -166,7 +192,8 @@ class Product(Base):
     
     # 评分信息
     rating: Mapped[Optional[float]] = mapped_column(
-        default=0.0,
+        Numeric(3, 2),
+        default=0,
         comment="平均评分"
     )
     review_count: Mapped[int] = mapped_column(
@@ -184,20 +211,27 @@ class Product(Base):
     )
     meta_title: Mapped[Optional[str]] = mapped_column(
         String(200),
+        deferred=True,
+        deferred_group="seo",
         comment="SEO 标题"
     )
     meta_description: Mapped[Optional[str]] = mapped_column(
         String(500),
+        deferred=True,
+        deferred_group="seo",
         comment="SEO 描述"
     )
     meta_keywords: Mapped[Optional[str]] = mapped_column(
         String(500),
+        deferred=True,
+        deferred_group="seo",
         comment="SEO 关键词"
     )
     
     # 配送信息
     weight: Mapped[Optional[float]] = mapped_column(
-        default=0.0,
+        Numeric(6, 3),
+        default=0,
         comment="重量(kg)"
     )
     dimensions: Mapped[Optional[Dict[str, float]]] = mapped_column(
@@ -211,14 +245,14 @@ class Product(Base):
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow, 
-        onupdate=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
         comment="更新时间"
     )
     published_at: Mapped[Optional[datetime]] = mapped_column(
@@ -237,6 +271,25 @@ class Product(Base):
         comment="删除时间"
     )
     
+    # 生成列（由数据库维护，可直接用于 WHERE / ORDER BY 和索引）
+    is_available: Mapped[bool] = mapped_column(
+        Boolean,
+        Computed(
+            "status = 'ACTIVE' AND stock > 0 AND NOT coalesce(is_deleted, false)",
+            persisted=True,
+        ),
+        comment="是否可售"
+    )
+    discount_percentage: Mapped[Optional[float]] = mapped_column(
+        Numeric(5, 2),
+        Computed(
+            "CASE WHEN original_price > price "
+            "THEN round((1 - price / original_price) * 100, 2) END",
+            persisted=True,
+        ),
+        comment="折扣百分比"
+    )
+    
     # 关系
     merchant: Mapped["Merchant"] = relationship(
         "Merchant", 
@@ -264,6 +317,11 @@ class Product(Base):
         "CartItem", 
         back_populates="product"
     )
+    tags: Mapped[List["ProductTag"]] = relationship(
+        "ProductTag",
+        secondary=product_tag_link,
+        back_populates="products"
+    )
     embedding: Mapped[Optional["ProductEmbedding"]] = relationship(
         "ProductEmbedding", 
         back_populates="product",
@@ -272,39 +330,57 @@ class Product(Base):
     
     # 索引
     __table_args__ = (
-        Index("idx_products_merchant_status", "merchant_id", "status"),
+        # 列表类索引只覆盖未删除商品（查询需带 is_deleted = false 才能命中）
+        # 商家/分类列表页的覆盖索引：INCLUDE 列表展示字段，支持 index-only scan
+        # 商家后台按状态、时间倒序键集分页：(created_at, id) 已在索引键中，无需额外排序
+        Index(
+            "idx_products_merchant_list", "merchant_id", "status",
+            text("created_at DESC"), text("id DESC"),
+            postgresql_include=["price", "rating", "sales_count", "title", "stock"],
+            postgresql_where=text("is_deleted = false"),
+        ),
+        Index(
+            "idx_products_category_cover", "category_id", "status",
+            postgresql_include=["price", "rating", "sales_count", "title"],
+            postgresql_where=text("is_deleted = false"),
+        ),
         Index("idx_products_category", "category_id"),
-        Index("idx_products_price", "price"),
-        Index("idx_products_rating", "rating"),
-        Index("idx_products_sales", "sales_count"),
-        Index("idx_products_created", "created_at"),
-        Index("idx_products_published", "published_at"),
-        Index("idx_products_tags", "tags", postgresql_using="gin"),
-        Index("idx_products_attributes", "attributes", postgresql_using="gin"),
-    )
-    
-    @property
-    def is_available(self) -> bool:
-        """商品是否可用"""
-        return (
-            self.status == ProductStatus.ACTIVE and 
-            self.stock > 0 and 
-            not self.is_deleted
-        )
-    
-    @property
-    def discount_percentage(self) -> Optional[float]:
-        """折扣百分比"""
-        if self.original_price and self.original_price > self.price:
-            return round((1 - self.price / self.original_price) * 100, 2)
-        return None
-    
-    @property
-    def main_image(self) -> Optional["ProductImage"]:
-        """主图片"""
-        if self.images:
-            return self.images[0]
-        return None
+        Index("idx_products_price", "price", postgresql_where=text("is_deleted = false")),
+        Index("idx_products_rating", "rating", postgresql_where=text("is_deleted = false")),
+        Index("idx_products_sales", "sales_count", postgresql_where=text("is_deleted = false")),
+        # created_at 随插入单调递增、与堆物理顺序相关，BRIN 体积远小于 BTREE；
+        # 按时间排序的可售列表由 idx_products_available_created 提供
+        Index(
+            "idx_products_created_brin", "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+        Index("idx_products_published", "published_at", postgresql_where=text("is_deleted = false")),
+        # 可售商品列表（生成列 is_available 已隐含未删除条件）
+        Index("idx_products_available_created", "created_at", postgresql_where=text("is_available")),
+        # jsonb_path_ops 仅支持 @> / @? / @@，索引更小、包含查询更快；属性过滤应使用 attributes.contains(...)
+        Index(
+            "idx_products_attributes", "attributes",
+            postgresql_using="gin",
+            postgresql_ops={"attributes": "jsonb_path_ops"},
+        ),
+        Index(
+            "idx_products_specifications", "specifications",
+            postgresql_using="gin",
+            postgresql_ops={"specifications": "jsonb_path_ops"},
+        ),
+        Index(
+            "idx_products_variants", "variants",
+            postgresql_using="gin",
+            postgresql_ops={"variants": "jsonb_path_ops"},
+        ),
+        # 热点属性键的 BTREE 表达式索引，支持等值/范围查询（GIN 无法加速 ->>）
+        # 查询需使用 Product.attributes["brand"].astext，编译为 (attributes ->> 'brand') 才能命中
+        Index("idx_products_attr_brand", text("(attributes->>'brand')")),
+        Index("idx_products_attr_color", text("(attributes->>'color')")),
+        # 表级 fillfactor = 70（为计数/库存的 HOT 更新预留页内空间）由迁移 0016 设置，
+        # SQLAlchemy 的 Table 不接受 postgresql_with 参数
+    )
     
     def __repr__(self) -> str:
         return f"<Product(id={self.id}, title='{self.title}', price={self.price})>"
@@ -314,6 +390,7 @@ class ProductImage(Base):
     """商品图片模型"""
     
     __tablename__ = "product_images"
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -378,8 +455,8 @@ class ProductImage(Base):
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     
@@ -393,6 +470,12 @@ class ProductImage(Base):
     __table_args__ = (
         Index("idx_product_images_product", "product_id"),
         Index("idx_product_images_order", "product_id", "order_index"),
+        # 每个商品至多一张主图
+        Index(
+            "uq_product_images_primary", "product_id",
+            unique=True,
+            postgresql_where=text("is_primary = true"),
+        ),
     )
     
     def __repr__(self) -> str:
@@ -403,6 +486,7 @@ class ProductCategory(Base):
     """商品分类模型"""
     
     __tablename__ = "product_categories"
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -430,14 +514,18 @@ class ProductCategory(Base):
         ForeignKey("product_categories.id"),
         comment="父分类ID"
     )
+    # level 与 path 由数据库触发器根据 parent_id 维护
     level: Mapped[int] = mapped_column(
         Integer,
-        default=0,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
         comment="分类层级"
     )
     path: Mapped[Optional[str]] = mapped_column(
-        String(500),
-        comment="分类路径"
+        LtreeType,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+        comment="分类ID路径（ltree，如 1.5.12）"
     )
     
     # 排序和状态
@@ -474,14 +562,14 @@ class ProductCategory(Base):
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow, 
-        onupdate=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
         comment="更新时间"
     )
     
@@ -506,15 +594,10 @@ class ProductCategory(Base):
         Index("idx_product_categories_parent", "parent_id"),
         Index("idx_product_categories_level", "level"),
         Index("idx_product_categories_active", "is_active"),
+        # 子树查询: ProductCategory.path.descendant_of(category.path)
+        Index("idx_product_categories_path_gist", "path", postgresql_using="gist"),
     )
     
-    @property
-    def full_path(self) -> str:
-        """获取完整路径"""
-        if self.path:
-            return self.path
-        return self.name
-    
     def __repr__(self) -> str:
         return f"<ProductCategory(id={self.id}, name='{self.name}', level={self.level})>"
 
@@ -523,6 +606,7 @@ class ProductTag(Base):
     """商品标签模型"""
     
     __tablename__ = "product_tags"
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -565,17 +649,24 @@ class ProductTag(Base):
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow, 
-        onupdate=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
         comment="更新时间"
     )
     
+    # 关系
+    products: Mapped[List["Product"]] = relationship(
+        "Product",
+        secondary=product_tag_link,
+        back_populates="tags"
+    )
+    
     # 索引
     __table_args__ = (
         Index("idx_product_tags_name", "name"),
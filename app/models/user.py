@@ -17,9 +17,10 @@ from datetime import datetime
 from typing import Optional, List
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, Enum, JSON, Index
+    ForeignKey, Enum, JSON, Index, Numeric, Computed, FetchedValue, func, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import enum
 import uuid
@@ -46,6 +47,8 @@ class User(Base):
     """用户模型"""
     
     __tablename__ = "users"
+    # 插入/更新后通过 RETURNING 取回数据库生成的时间戳和生成列，避免异步会话中的延迟加载
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -88,14 +91,14 @@ class User(Base):
         comment="是否已验证邮箱"
     )
     
-    # 角色和权限
+    # 角色和权限（PostgreSQL 原生枚举，4 字节定长）
     role: Mapped[UserRole] = mapped_column(
-        Enum(UserRole),
+        Enum(UserRole, name="userrole"),
         default=UserRole.USER,
         comment="用户角色"
     )
     status: Mapped[UserStatus] = mapped_column(
-        Enum(UserStatus),
+        Enum(UserStatus, name="userstatus"),
         default=UserStatus.PENDING,
         comment="用户状态"
     )
@@ -117,23 +120,34 @@ class User(Base):
         Text,
         comment="个人简介"
     )
+    full_name: Mapped[str] = mapped_column(
+        String(255),
+        Computed(
+            "coalesce(first_name || ' ' || last_name, first_name, last_name, "
+            "username, split_part(email, '@', 1))",
+            persisted=True,
+        ),
+        comment="全名（生成列）"
+    )
     
     # 扩展信息 (JSONB 存储灵活数据)
     profile_data: Mapped[Optional[dict]] = mapped_column(
         JSONB,
+        deferred=True,
+        deferred_group="profile",
         comment="扩展个人信息"
     )
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow, 
-        onupdate=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
         comment="更新时间"
     )
     last_login_at: Mapped[Optional[datetime]] = mapped_column(
@@ -178,29 +192,32 @@ class User(Base):
     
     # 索引
     __table_args__ = (
-        Index("idx_users_email_active", "email", "is_active"),
-        Index("idx_users_role_status", "role", "status"),
-        Index("idx_users_created_at", "created_at"),
+        # 只覆盖未删除用户（查询需带 is_deleted = false 才能命中）
+        Index("idx_users_email_active", "email", "is_active", postgresql_where=text("is_deleted = false")),
+        Index("idx_users_role_status", "role", "status", postgresql_where=text("is_deleted = false")),
+        # created_at 随插入单调递增，使用 BRIN 代替 BTREE
+        Index(
+            "idx_users_created_at_brin", "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+        # 认证路径按ID查询可用用户
+        Index(
+            "idx_users_active", "id",
+            postgresql_where=text("is_active AND NOT is_deleted"),
+        ),
     )
     
-    @property
-    def full_name(self) -> str:
-        """获取全名"""
-        if self.first_name and self.last_name:
-            return f"{self.first_name} {self.last_name}"
-        elif self.first_name:
-            return self.first_name
-        elif self.last_name:
-            return self.last_name
-        else:
-            return self.username or self.email.split("@")[0]
-    
-    @property
+    @hybrid_property
     def is_merchant(self) -> bool:
         """是否为商家"""
-        return self.role in [UserRole.MERCHANT, UserRole.ADMIN]
+        return self.role in (UserRole.MERCHANT, UserRole.ADMIN)
     
-    @property
+    @is_merchant.expression
+    def is_merchant(cls):
+        return cls.role.in_((UserRole.MERCHANT, UserRole.ADMIN))
+    
+    @hybrid_property
     def is_admin(self) -> bool:
         """是否为管理员"""
         return self.role == UserRole.ADMIN
@@ -213,6 +230,7 @@ class Merchant(Base):
     """商家模型"""
     
     __tablename__ = "merchants"
+    __mapper_args__ = {"eager_defaults": True}
     
     # 主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -288,30 +306,34 @@ class Merchant(Base):
         comment="配送半径(公里)"
     )
     delivery_fee: Mapped[Optional[float]] = mapped_column(
-        default=0.0,
+        Numeric(10, 2),
+        default=0,
         comment="配送费"
     )
     min_order_amount: Mapped[Optional[float]] = mapped_column(
-        default=0.0,
+        Numeric(10, 2),
+        default=0,
         comment="最低起送金额"
     )
     
     # 扩展信息
     business_data: Mapped[Optional[dict]] = mapped_column(
         JSONB,
+        deferred=True,
+        deferred_group="profile",
         comment="商家扩展信息"
     )
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
         comment="创建时间"
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=datetime.utcnow, 
-        onupdate=datetime.utcnow,
+        DateTime(timezone=True),
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
         comment="更新时间"
     )
     
@@ -14,18 +14,25 @@
 6. 缓存和性能优化
 """
 
-from .user_service import UserService
-from .merchant_service import MerchantService
-from .product_service import ProductService
-from .order_service import OrderService
-from .payment_service import PaymentService
-from .cart_service import CartService
-from .address_service import AddressService
-from .review_service import ReviewService
-from .notification_service import NotificationService
-from .email_service import EmailService
-from .ai_service import AIService
-from .search_service import SearchService
+import importlib
+from typing import Any
+
+# 服务类按需导入（PEP 562），首次访问时才加载对应模块，
+# 避免仅使用单个服务时在启动阶段导入全部服务及其依赖
+_LAZY_IMPORTS = {
+    "UserService": ".user_service",
+    "MerchantService": ".merchant_service",
+    "ProductService": ".product_service",
+    "OrderService": ".order_service",
+    "PaymentService": ".payment_service",
+    "CartService": ".cart_service",
+    "AddressService": ".address_service",
+    "ReviewService": ".review_service",
+    "NotificationService": ".notification_service",
+    "EmailService": ".email_service",
+    "AIService": ".ai_service",
+    "SearchService": ".search_service",
+}
 
 __all__ = [
     "UserService",
@@ -42,3 +49,16 @@ __all__ = [
     "SearchService",
 ]
 
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到模块全局，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
@@ -6,8 +6,10 @@ AI 服务
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.ai_embedding import ProductEmbedding, EmbeddingStatus, EmbeddingModel
-from sqlalchemy import select
+from ..models.product import Product
+from sqlalchemy import select, or_
 from datetime import datetime
+from typing import List
 
 
 class AIService:
@@ -15,29 +17,55 @@ class AIService:
         self.db = db
 
     async def generate_product_embedding(self, product_id: int) -> None:
-        # 简化：仅写入占位记录（生产应调用模型/向量DB）
-        res = await self.db.execute(select(ProductEmbedding).where(ProductEmbedding.product_id == product_id))
-        emb = res.scalar_one_or_none()
-        if emb is None:
-            emb = ProductEmbedding(
-                product_id=product_id,
-                embedding_model=EmbeddingModel.SENTENCE_TRANSFORMERS,
-                embedding_version="v1",
-                embedding_dimension=384,
-                status=EmbeddingStatus.COMPLETED,
-                source_text=f"product:{product_id}",
-                text_hash=str(product_id),
-                generated_at=datetime.utcnow(),
-            )
-            self.db.add(emb)
-        else:
-            emb.status = EmbeddingStatus.COMPLETED
-            emb.generated_at = datetime.utcnow()
+        await self.generate_product_embeddings([product_id])
+
+    async def generate_product_embeddings(self, product_ids: List[int]) -> None:
+        # 简化：仅写入占位记录（生产应按批调用模型/向量DB）
+        # 一次 IN 查询取回已有记录，整批只提交一次
+        res = await self.db.execute(
+            select(ProductEmbedding).where(ProductEmbedding.product_id.in_(product_ids))
+        )
+        existing = {emb.product_id: emb for emb in res.scalars()}
+        now = datetime.utcnow()
+        for product_id in product_ids:
+            emb = existing.get(product_id)
+            if emb is None:
+                emb = ProductEmbedding(
+                    product_id=product_id,
+                    embedding_model=EmbeddingModel.SENTENCE_TRANSFORMERS,
+                    embedding_version="v1",
+                    embedding_dimension=384,
+                    status=EmbeddingStatus.COMPLETED,
+                    source_text=f"product:{product_id}",
+                    text_hash=str(product_id),
+                    generated_at=now,
+                )
+                self.db.add(emb)
+                existing[product_id] = emb
+            else:
+                emb.status = EmbeddingStatus.COMPLETED
+                emb.generated_at = now
         await self.db.commit()
 
-    async def refresh_outdated_embeddings(self) -> int:
-        # 占位：返回0表示无操作
-        return 0
+    async def refresh_outdated_embeddings(self, batch_size: int = 256) -> int:
+        # 找出缺失、未完成或早于商品更新时间的嵌入，按批写回（每批一次查询+一次提交）
+        res = await self.db.execute(
+            select(Product.id)
+            .outerjoin(ProductEmbedding, ProductEmbedding.product_id == Product.id)
+            .where(
+                Product.is_deleted == False,
+                or_(
+                    ProductEmbedding.id.is_(None),
+                    ProductEmbedding.status != EmbeddingStatus.COMPLETED,
+                    ProductEmbedding.generated_at < Product.updated_at,
+                ),
+            )
+            .order_by(Product.id)
+        )
+        product_ids = list(res.scalars())
+        for i in range(0, len(product_ids), batch_size):
+            await self.generate_product_embeddings(product_ids[i:i + batch_size])
+        return len(product_ids)
 
 
 
@@ -17,37 +17,329 @@
 它被API路由层调用，使用模型层定义的数据结构。
 """
 
-import json
-from datetime import datetime, timedelta
+import asyncio
+import time
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Any
 import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-import aioredis
+from sqlalchemy import bindparam, select, delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import noload
+from redis.commands.core import AsyncScript
+from cachetools import TTLCache
+import msgpack
+import orjson
 
 # 引入模型层定义的数据结构
 from ..models.cart import Cart, CartItem
+from ..models.money import from_cents, to_cents
 from ..models.product import Product
 from ..models.user import User
 from ..core.config import settings
-from ..services.product_service import get_cached_stock
+from ..core.redis import get_redis
+from ..services.product_service import get_cached_stock, get_product_view
 
 # 配置日志
 logger = structlog.get_logger(__name__)
 
-# Redis 连接
-redis_client = aioredis.from_url(settings.redis_url)
+
+# 购物车在 Redis 中以哈希存储：每个商品一个字段（值为 msgpack 编码的购物车项），
+# 另有保留字段 _ca/_ua 记录创建/更新时间。修改单个商品只读写对应字段，无需整体重新序列化。
+# 购物车项由 Lua 脚本（Redis 内置 cmsgpack）在服务端直接修改；cmsgpack 不支持扩展类型，
+# 时间戳以毫秒整数存储，读取时转换回 datetime。
+# 金额以整数分存储（unit_price_cents/total_price_cents），避免 Lua 浮点乘法的舍入误差，
+# 读取时补充以元为单位的 unit_price/total_price 供展示。
+CART_EXPIRE_SECONDS = 43200 * 60  # 30天
+_TIMESTAMP_FIELDS = ("created_at", "updated_at")
+_YUAN_FIELDS = ("unit_price", "total_price")
+_CREATED_FIELD = b"_ca"
+_UPDATED_FIELD = b"_ua"
+
+# 进程内购物车读缓存：购物车键 -> (_ua, 购物车数据)。
+# _ua 由 Lua 脚本保证严格递增，可作为版本号：读取时只需 HGET _ua 比对，
+# 未变化则直接返回已解码的数据，省去整个哈希的传输与解码
+_cart_read_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# 同步购物车时按用户查询数据库购物车（购物车项随后整体重建，不加载现有项）
+_CART_BY_USER = (
+    select(Cart)
+    .where(Cart.user_id == bindparam("user_id"))
+    .options(noload(Cart.items))
+)
+
+
+def _legacy_key(cart_key: str) -> str:
+    """迁移前的购物车键：整体 JSON 字符串（cart:）"""
+    suffix = cart_key.split(":", 2)[2]
+    return f"cart:{suffix}"
+
+
+def _now_ms() -> int:
+    """当前 UTC 时间的毫秒时间戳（购物车内时间字段统一使用此整数格式）"""
+    return time.time_ns() // 1_000_000
+
+
+def _from_ms(value: Any) -> Any:
+    """毫秒时间戳（或旧 JSON 数据中的时间字符串）转换为 datetime，其他值原样返回"""
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _encode_default(value: Any) -> Any:
+    """msgpack 默认编码：datetime 转为毫秒时间戳"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _pack_item(item: Dict[str, Any]) -> bytes:
+    """将购物车项编码为 msgpack（只保存以分为单位的金额）"""
+    stored = {k: v for k, v in item.items() if k not in _YUAN_FIELDS}
+    return msgpack.packb(stored, default=_encode_default, use_bin_type=True)
+
+
+def _normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """规范化购物车项：补充缺省字段、金额（分/元）与时间"""
+    # Lua 表中值为 nil 的字段会被丢弃
+    item.setdefault("product_image", None)
+    # 兼容以元（浮点）存储金额的旧数据
+    if "unit_price_cents" not in item:
+        item["unit_price_cents"] = to_cents(item["unit_price"])
+    item["total_price_cents"] = item["unit_price_cents"] * item["quantity"]
+    item["unit_price"] = from_cents(item["unit_price_cents"])
+    item["total_price"] = from_cents(item["total_price_cents"])
+    for field in _TIMESTAMP_FIELDS:
+        if field in item:
+            item[field] = _from_ms(item[field])
+    return item
+
+
+def _cart_from_hash(fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+    """由购物车哈希的字段构造购物车数据"""
+    cart_data: Dict[str, Any] = {"items": {}}
+    for field, value in fields.items():
+        if field == _CREATED_FIELD:
+            cart_data["created_at"] = _from_ms(int(value))
+        elif field == _UPDATED_FIELD:
+            cart_data["updated_at"] = _from_ms(int(value))
+        else:
+            cart_data["items"][field.decode()] = _normalize_item(
+                msgpack.unpackb(value, raw=False)
+            )
+    return cart_data
+
+
+def _cart_from_script(result: List[bytes]) -> Dict[str, Any]:
+    """由 Lua 脚本返回的 HGETALL 结果（字段、值交替的列表）构造购物车数据"""
+    return _cart_from_hash(dict(zip(result[::2], result[1::2])))
+
+
+def _unpack_legacy_cart(raw: bytes) -> Dict[str, Any]:
+    """解码迁移前整体存储的 JSON 购物车"""
+    cart_data = orjson.loads(raw)
+    
+    items = cart_data.get("items") or {}
+    cart_data["items"] = items
+    for item in items.values():
+        _normalize_item(item)
+    for field in _TIMESTAMP_FIELDS:
+        if field in cart_data:
+            cart_data[field] = _from_ms(cart_data[field])
+    return cart_data
+
+
+# Lua 公共函数：将迁移前整体存储的购物车（JSON 字符串）转换为哈希并删除旧键
+_CART_LUA_PRELUDE = """
+local function normalize_prices(item)
+    -- 旧数据以元（浮点）存储金额，转换为整数分
+    if not item['unit_price_cents'] then
+        item['unit_price_cents'] = math.floor(item['unit_price'] * 100 + 0.5)
+        item['total_price_cents'] = item['unit_price_cents'] * item['quantity']
+        item['unit_price'] = nil
+        item['total_price'] = nil
+    end
+    return item
+end
+
+local function migrate_cart(key, legacy_key, ttl, now)
+    if redis.call('EXISTS', key) == 1 then
+        return
+    end
+    local raw = redis.call('GET', legacy_key)
+    if not raw then
+        return
+    end
+    local cart = cjson.decode(raw)
+    for _, item in pairs(cart['items']) do
+        if item['product_image'] == cjson.null then
+            item['product_image'] = nil
+        end
+    end
+    local created_at = tonumber(cart['created_at']) or now
+    local updated_at = tonumber(cart['updated_at']) or now
+    redis.call('HSET', key, '_ca', created_at, '_ua', updated_at)
+    for pid, item in pairs(cart['items']) do
+        redis.call('HSET', key, pid, cmsgpack.pack(normalize_prices(item)))
+    end
+    redis.call('EXPIRE', key, ttl)
+    redis.call('DEL', legacy_key)
+end
+
+local function touch_cart(key, ttl, now)
+    -- _ua 严格递增，同时作为购物车版本号
+    local last = tonumber(redis.call('HGET', key, '_ua')) or 0
+    redis.call('HSET', key, '_ua', math.max(now, last + 1))
+    redis.call('HSETNX', key, '_ca', now)
+    redis.call('EXPIRE', key, ttl)
+end
+"""
+
+# 添加商品  KEYS: [购物车键, JSON 旧键]
+# ARGV: [ttl, 商品ID, 数量, 库存, 单价(分), 当前毫秒时间戳, 新购物车项(msgpack)]
+# 返回更新后的购物车（HGETALL）；超出库存返回 -1
+_ADD_ITEM_LUA = _CART_LUA_PRELUDE + """
+local now = tonumber(ARGV[6])
+migrate_cart(KEYS[1], KEYS[2], ARGV[1], now)
+local quantity = tonumber(ARGV[3])
+local raw = redis.call('HGET', KEYS[1], ARGV[2])
+local item
+if raw then
+    item = cmsgpack.unpack(raw)
+    quantity = item['quantity'] + quantity
+end
+if quantity > tonumber(ARGV[4]) then
+    return -1
+end
+if item then
+    item['quantity'] = quantity
+    item['total_price_cents'] = tonumber(ARGV[5]) * quantity
+    raw = cmsgpack.pack(item)
+else
+    raw = ARGV[7]
+end
+redis.call('HSET', KEYS[1], ARGV[2], raw)
+touch_cart(KEYS[1], ARGV[1], now)
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# 修改数量  KEYS: [购物车键, JSON 旧键]  ARGV: [ttl, 商品ID, 数量, 单价(分), 当前毫秒时间戳]
+# 返回更新后的购物车（HGETALL）；商品不在购物车中返回 0
+_UPDATE_ITEM_LUA = _CART_LUA_PRELUDE + """
+local now = tonumber(ARGV[5])
+migrate_cart(KEYS[1], KEYS[2], ARGV[1], now)
+local raw = redis.call('HGET', KEYS[1], ARGV[2])
+if not raw then
+    return 0
+end
+local quantity = tonumber(ARGV[3])
+local item = cmsgpack.unpack(raw)
+item['quantity'] = quantity
+item['unit_price_cents'] = tonumber(ARGV[4])
+item['total_price_cents'] = tonumber(ARGV[4]) * quantity
+redis.call('HSET', KEYS[1], ARGV[2], cmsgpack.pack(item))
+touch_cart(KEYS[1], ARGV[1], now)
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# 移除商品  KEYS: [购物车键, JSON 旧键]  ARGV: [ttl, 商品ID, 当前毫秒时间戳]
+# 返回更新后的购物车（HGETALL）；商品不在购物车中返回 0
+_REMOVE_ITEM_LUA = _CART_LUA_PRELUDE + """
+local now = tonumber(ARGV[3])
+migrate_cart(KEYS[1], KEYS[2], ARGV[1], now)
+if redis.call('HDEL', KEYS[1], ARGV[2]) == 0 then
+    return 0
+end
+touch_cart(KEYS[1], ARGV[1], now)
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# 合并购物车  KEYS: [游客购物车键, 游客 JSON 旧键, 用户购物车键, 用户 JSON 旧键]
+# ARGV: [ttl, 当前毫秒时间戳, 库存键前缀]
+# 游客购物车为空时返回用户购物车（不存在返回 0）；否则合并写回用户购物车并删除游客购物车
+_MERGE_CARTS_LUA = _CART_LUA_PRELUDE + """
+local now = tonumber(ARGV[2])
+migrate_cart(KEYS[1], KEYS[2], ARGV[1], now)
+migrate_cart(KEYS[3], KEYS[4], ARGV[1], now)
+local guest = redis.call('HGETALL', KEYS[1])
+local merged = false
+for i = 1, #guest, 2 do
+    local pid = guest[i]
+    if string.sub(pid, 1, 1) ~= '_' then
+        local guest_item = cmsgpack.unpack(guest[i + 1])
+        local raw = redis.call('HGET', KEYS[3], pid)
+        if raw then
+            -- 合并数量，不超过缓存库存（无库存信息视为 0）
+            local item = cmsgpack.unpack(raw)
+            local quantity = item['quantity'] + guest_item['quantity']
+            local stock = tonumber(redis.call('GET', ARGV[3] .. pid)) or 0
+            if quantity > stock then
+                quantity = stock
+            end
+            item['quantity'] = quantity
+            item['total_price_cents'] = guest_item['unit_price_cents'] * quantity
+            redis.call('HSET', KEYS[3], pid, cmsgpack.pack(item))
+        else
+            redis.call('HSET', KEYS[3], pid, guest[i + 1])
+        end
+        merged = true
+    end
+end
+if not merged then
+    if redis.call('EXISTS', KEYS[3]) == 1 then
+        return redis.call('HGETALL', KEYS[3])
+    end
+    return 0
+end
+touch_cart(KEYS[3], ARGV[1], now)
+redis.call('DEL', KEYS[1])
+return redis.call('HGETALL', KEYS[3])
+"""
+
+# 整体重写购物车  KEYS: [购物车键, JSON 旧键]
+# ARGV: [ttl, 当前毫秒时间戳, 创建时间, 字段1, 值1, 字段2, 值2, ...]
+# 重写前读取旧的 _ua，保证版本号严格递增（同一毫秒内的多次保存也不会复用旧版本号）
+_SAVE_CART_LUA = """
+local last = tonumber(redis.call('HGET', KEYS[1], '_ua')) or 0
+redis.call('DEL', KEYS[1], KEYS[2])
+redis.call('HSET', KEYS[1], '_ca', ARGV[3], '_ua', math.max(tonumber(ARGV[2]), last + 1))
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+@lru_cache(maxsize=None)
+def _script(source: str) -> AsyncScript:
+    """
+    获取 Lua 脚本对象（首次使用时创建）
+    
+    脚本以 EVALSHA 执行（首次或缓存失效时自动回退 EVAL）；调用时显式传入
+    client=get_redis()，Redis 客户端重建后仍使用当前客户端
+    """
+    return get_redis().register_script(source)
 
 
 class CartService:
     """购物车服务类"""
     
     @staticmethod
-    async def get_cart_key(
+    def get_cart_key(
             user_id: Optional[int] = None,
             session_id: Optional[str] = None) -> str:
         """
-        获取购物车Redis键
+        获取购物车Redis键（纯字符串拼接，无需 await）
         
         Args:
             user_id: 用户ID
@@ -57,9 +349,9 @@ class CartService:
             str: Redis键
         """
         if user_id:
-            return f"cart:user:{user_id}"
+            return f"cart:v3:user:{user_id}"
         elif session_id:
-            return f"cart:session:{session_id}"
+            return f"cart:v3:session:{session_id}"
         else:
             raise ValueError("Either user_id or session_id must be provided")
     
@@ -71,6 +363,8 @@ class CartService:
         """
         从Redis获取购物车数据
         
+        购物车未变化时返回进程内缓存的数据（多次调用可能返回同一对象，调用方不应修改）
+        
         Args:
             user_id: 用户ID
             session_id: 会话ID
@@ -81,14 +375,28 @@ class CartService:
         # 使用try-except捕获可能的异常，确保程序稳定性
         try:
             # 获取购物车在Redis中的键名
-            cart_key = await CartService.get_cart_key(user_id, session_id)
-            # 从Redis中获取购物车数据
-            cart_data = await redis_client.get(cart_key)
-            
-            # 如果购物车数据存在
-            if cart_data:
-                # 将JSON字符串解析为Python字典并返回
-                return json.loads(cart_data)
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            
+            # 本进程读过该购物车：只比对版本号，未变化直接返回缓存
+            cached = _cart_read_cache.get(cart_key)
+            if cached is not None:
+                version = await get_redis().hget(cart_key, _UPDATED_FIELD)
+                if version is not None and version == cached[0]:
+                    return cached[1]
+            
+            # 同时读取购物车哈希和迁移前的旧键，一次往返
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hgetall(cart_key)
+            pipe.get(_legacy_key(cart_key))
+            fields, legacy_data = await pipe.execute()
+            
+            # 如果购物车数据存在，解码为Python字典并返回
+            if fields:
+                cart_data = _cart_from_hash(fields)
+                _cart_read_cache[cart_key] = (fields.get(_UPDATED_FIELD), cart_data)
+                return cart_data
+            if legacy_data:
+                return _unpack_legacy_cart(legacy_data)
             # 如果购物车数据不存在，返回None
             return None
             
@@ -107,7 +415,7 @@ class CartService:
         cart_data: Dict[str, Any],
         user_id: Optional[int] = None, 
         session_id: Optional[str] = None,
-        expire_minutes: int = 43200  # 30天
+        expire_minutes: int = CART_EXPIRE_SECONDS // 60
     ) -> bool:
         """
         保存购物车数据到Redis
@@ -124,13 +432,23 @@ class CartService:
         # 使用try-except捕获可能的异常，确保程序稳定性
         try:
             # 获取购物车在Redis中的键名
-            cart_key = await CartService.get_cart_key(user_id, session_id)
-            # 将购物车数据保存到Redis，设置过期时间
-            await redis_client.setex(
-                cart_key, 
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            # 在 Redis 服务端整体重写购物车哈希（每个商品一个字段），设置过期时间并删除旧键
+            now_ms = _now_ms()
+            created_at = cart_data.get("created_at")
+            args = [
                 expire_minutes * 60,  # 将分钟转换为秒
-                json.dumps(cart_data, default=str)  # 将字典序列化为JSON字符串
+                now_ms,
+                _encode_default(created_at) if isinstance(created_at, datetime) else now_ms,
+            ]
+            for pid, item in cart_data.get("items", {}).items():
+                args.extend((str(pid), _pack_item(item)))
+            await _script(_SAVE_CART_LUA)(
+                keys=[cart_key, _legacy_key(cart_key)],
+                args=args,
+                client=get_redis()
             )
+            _cart_read_cache.pop(cart_key, None)
             # 保存成功返回True
             return True
             
@@ -166,20 +484,18 @@ class CartService:
             Optional[Dict[str, Any]]: 更新后的购物车数据，如果失败返回None
         """
         try:
-            # 检查商品是否存在且可购买 (使用模型层Product)
-            result = await db.execute(
-                select(Product)
-                .where(Product.id == product_id)
-                .where(Product.is_deleted == False)
+            # 商品信息（Redis 缓存，未命中回源数据库）与库存读取互不依赖，并发执行
+            product, stock = await asyncio.gather(
+                get_product_view(db, product_id),
+                get_cached_stock(product_id)
             )
-            product = result.scalar_one_or_none()
             
-            if not product or not product.is_available:
+            # 检查商品是否存在且可购买
+            if not product or not product["is_available"]:
                 logger.warning("Product not available", product_id=product_id)
                 return None
             
             # 检查库存
-            stock = await get_cached_stock(product_id)
             if stock is None or stock < quantity:
                 logger.warning("Insufficient stock", 
                              product_id=product_id, 
@@ -187,56 +503,33 @@ class CartService:
                              available=stock)
                 return None
             
-            # 获取当前购物车数据
-            cart_data = await CartService.get_cart_from_redis(user_id, session_id)
-            if not cart_data:
-                cart_data = {
-                    "items": {},
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-            
-            # 更新购物车项
+            # 读取-修改-写回在 Redis 服务端由 Lua 脚本原子完成，一次往返且无并发覆盖
             item_key = str(product_id)
-            if item_key in cart_data["items"]:
-                # 增加现有项的数量
-                current_quantity = cart_data["items"][item_key]["quantity"]
-                new_quantity = current_quantity + quantity
-                
-                # 检查增加后的数量是否超过库存
-                if new_quantity > stock:
-                    logger.warning("Quantity exceeds stock after addition", 
-                                 product_id=product_id, 
-                                 current_quantity=current_quantity,
-                                 added_quantity=quantity,
-                                 stock=stock)
-                    return None
-                
-                cart_data["items"][item_key]["quantity"] = new_quantity
-                cart_data["items"][item_key]["total_price"] = float(product.price) * new_quantity
-            else:
-                # 添加新项
-                if quantity > stock:
-                    logger.warning("Quantity exceeds stock", 
-                                 product_id=product_id, 
-                                 requested=quantity, 
-                                 available=stock)
-                    return None
-                
-                cart_data["items"][item_key] = {
-                    "product_id": product_id,
-                    "product_name": product.title,
-                    "product_image": product.main_image.url if product.main_image else None,
-                    "unit_price": float(product.price),
-                    "quantity": quantity,
-                    "total_price": float(product.price) * quantity,
-                    "created_at": datetime.utcnow().isoformat()
-                }
-            
-            cart_data["updated_at"] = datetime.utcnow().isoformat()
-            
-            # 保存到Redis
-            await CartService.save_cart_to_redis(cart_data, user_id, session_id)
+            now_ms = _now_ms()
+            price_cents = product["price_cents"]
+            new_item = {
+                "product_id": product_id,
+                "product_name": product["title"],
+                "product_image": product["main_image_url"],
+                "unit_price_cents": price_cents,
+                "quantity": quantity,
+                "total_price_cents": price_cents * quantity,
+                "created_at": now_ms
+            }
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            result = await _script(_ADD_ITEM_LUA)(
+                keys=[cart_key, _legacy_key(cart_key)],
+                args=[CART_EXPIRE_SECONDS, item_key, quantity, stock,
+                      price_cents, now_ms, _pack_item(new_item)],
+                client=get_redis()
+            )
+            if result == -1:
+                logger.warning("Quantity exceeds stock", 
+                             product_id=product_id, 
+                             requested=quantity, 
+                             stock=stock)
+                return None
+            cart_data = _cart_from_script(result)
             
             logger.info("Item added to cart", 
                        product_id=product_id, 
@@ -277,20 +570,18 @@ class CartService:
             Optional[Dict[str, Any]]: 更新后的购物车数据，如果失败返回None
         """
         try:
-            # 检查商品是否存在且可购买 (使用模型层Product)
-            result = await db.execute(
-                select(Product)
-                .where(Product.id == product_id)
-                .where(Product.is_deleted == False)
+            # 商品信息（Redis 缓存，未命中回源数据库）与库存读取互不依赖，并发执行
+            product, stock = await asyncio.gather(
+                get_product_view(db, product_id),
+                get_cached_stock(product_id)
             )
-            product = result.scalar_one_or_none()
             
-            if not product or not product.is_available:
+            # 检查商品是否存在且可购买
+            if not product or not product["is_available"]:
                 logger.warning("Product not available", product_id=product_id)
                 return None
             
             # 检查库存
-            stock = await get_cached_stock(product_id)
             if stock is None or stock < quantity:
                 logger.warning("Insufficient stock", 
                              product_id=product_id, 
@@ -298,20 +589,18 @@ class CartService:
                              available=stock)
                 return None
             
-            # 获取当前购物车数据
-            cart_data = await CartService.get_cart_from_redis(user_id, session_id)
-            if not cart_data or str(product_id) not in cart_data["items"]:
+            # 在 Redis 服务端原子更新数量
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            result = await _script(_UPDATE_ITEM_LUA)(
+                keys=[cart_key, _legacy_key(cart_key)],
+                args=[CART_EXPIRE_SECONDS, str(product_id), quantity,
+                      product["price_cents"], _now_ms()],
+                client=get_redis()
+            )
+            if result == 0:
                 logger.warning("Item not in cart", product_id=product_id)
                 return None
-            
-            # 更新数量
-            item_key = str(product_id)
-            cart_data["items"][item_key]["quantity"] = quantity
-            cart_data["items"][item_key]["total_price"] = float(product.price) * quantity
-            cart_data["updated_at"] = datetime.utcnow().isoformat()
-            
-            # 保存到Redis
-            await CartService.save_cart_to_redis(cart_data, user_id, session_id)
+            cart_data = _cart_from_script(result)
             
             logger.info("Cart item updated", 
                        product_id=product_id, 
@@ -348,20 +637,18 @@ class CartService:
             Optional[Dict[str, Any]]: 更新后的购物车数据，如果失败返回None
         """
         try:
-            # 获取当前购物车数据
-            cart_data = await CartService.get_cart_from_redis(user_id, session_id)
-            if not cart_data or str(product_id) not in cart_data["items"]:
+            # 在 Redis 服务端原子移除
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            result = await _script(_REMOVE_ITEM_LUA)(
+                keys=[cart_key, _legacy_key(cart_key)],
+                args=[CART_EXPIRE_SECONDS, str(product_id), _now_ms()],
+                client=get_redis()
+            )
+            if result == 0:
                 logger.warning("Item not in cart",
                                product_id=product_id)
                 return None
-            
-            # 移除项
-            item_key = str(product_id)
-            del cart_data["items"][item_key]
-            cart_data["updated_at"] = datetime.utcnow().isoformat()
-            
-            # 保存到Redis
-            await CartService.save_cart_to_redis(cart_data, user_id, session_id)
+            cart_data = _cart_from_script(result)
             
             logger.info("Item removed from cart", 
                        product_id=product_id,
@@ -393,15 +680,8 @@ class CartService:
         Returns:
             Optional[Dict[str, Any]]: 购物车数据，如果失败返回None
         """
-        try:
-            return await CartService.get_cart_from_redis(user_id, session_id)
-            
-        except Exception as e:
-            logger.error("Get cart error", 
-                        error=str(e), 
-                        user_id=user_id,
-                        session_id=session_id)
-            return None
+        # get_cart_from_redis 已处理异常并记录日志
+        return await CartService.get_cart_from_redis(user_id, session_id)
     
     @staticmethod
     async def clear_cart(
@@ -419,8 +699,10 @@ class CartService:
             bool: 是否清空成功
         """
         try:
-            cart_key = await CartService.get_cart_key(user_id, session_id)
-            await redis_client.delete(cart_key)
+            cart_key = CartService.get_cart_key(user_id, session_id)
+            # 同时删除迁移前的旧键，避免读取时回退到旧数据
+            await get_redis().delete(cart_key, _legacy_key(cart_key))
+            _cart_read_cache.pop(cart_key, None)
             
             logger.info("Cart cleared", 
                        user_id=user_id,
@@ -453,55 +735,17 @@ class CartService:
             Optional[Dict[str, Any]]: 合并后的购物车数据，如果失败返回None
         """
         try:
-            # 获取游客购物车
-            guest_cart = await CartService.get_cart_from_redis(session_id=session_id)
-            if not guest_cart or not guest_cart["items"]:
-                return await CartService.get_cart_from_redis(user_id=user_id)
-            
-            # 获取用户购物车
-            user_cart = await CartService.get_cart_from_redis(user_id=user_id)
-            if not user_cart:
-                user_cart = {
-                    "items": {},
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-            
-            # 合并购物车项
-            for item_key, guest_item in guest_cart["items"].items():
-                product_id = guest_item["product_id"]
-                guest_quantity = guest_item["quantity"]
-                
-                # 检查用户购物车中是否已有该商品
-                if item_key in user_cart["items"]:
-                    # 合并数量（需要检查库存）
-                    user_quantity = user_cart["items"][item_key]["quantity"]
-                    total_quantity = user_quantity + guest_quantity
-                    
-                    # 检查库存
-                    stock = await get_cached_stock(product_id)
-                    if stock is not None and total_quantity <= stock:
-                        # 库存充足，合并数量
-                        user_cart["items"][item_key]["quantity"] = total_quantity
-                        user_cart["items"][item_key]["total_price"] = \
-                            guest_item["unit_price"] * total_quantity
-                    else:
-                        # 库存不足，使用较小的数量
-                        max_quantity = min(total_quantity, stock or 0)
-                        user_cart["items"][item_key]["quantity"] = max_quantity
-                        user_cart["items"][item_key]["total_price"] = \
-                            guest_item["unit_price"] * max_quantity
-                else:
-                    # 直接添加新项
-                    user_cart["items"][item_key] = guest_item
-            
-            user_cart["updated_at"] = datetime.utcnow().isoformat()
-            
-            # 保存合并后的购物车
-            await CartService.save_cart_to_redis(user_cart, user_id=user_id)
-            
-            # 清除游客购物车
-            await CartService.clear_cart(session_id=session_id)
+            # 读取两个购物车、校验库存、写回并删除游客购物车在 Redis 服务端一次完成
+            guest_key = CartService.get_cart_key(session_id=session_id)
+            user_key = CartService.get_cart_key(user_id=user_id)
+            result = await _script(_MERGE_CARTS_LUA)(
+                keys=[guest_key, _legacy_key(guest_key), user_key, _legacy_key(user_key)],
+                args=[CART_EXPIRE_SECONDS, _now_ms(), "stock:"],
+                client=get_redis()
+            )
+            if result == 0:
+                return None
+            user_cart = _cart_from_script(result)
             
             logger.info("Carts merged", 
                        user_id=user_id,
@@ -539,9 +783,8 @@ class CartService:
             
             async with db.begin():
                 # 获取或创建数据库购物车 (使用模型层Cart)
-                result = await db.execute(
-                    select(Cart).where(Cart.user_id == user_id)
-                )
+                # 购物车项随后整体重建，无需加载现有项
+                result = await db.execute(_CART_BY_USER, {"user_id": user_id})
                 db_cart = result.scalar_one_or_none()
                 
                 if not db_cart:
@@ -554,30 +797,34 @@ class CartService:
                     delete(CartItem).where(CartItem.cart_id == db_cart.id)
                 )
                 
-                # 创建新的购物车项 (使用模型层CartItem)
-                subtotal = 0.0
+                # 一次遍历构造购物车项并累计统计，executemany 批量写入 (使用模型层CartItem)
+                rows = []
+                subtotal_cents = 0
                 total_quantity = 0
-                item_count = 0
                 
                 for item_data in cart_data["items"].values():
-                    cart_item = CartItem(
-                        cart_id=db_cart.id,
-                        product_id=item_data["product_id"],
-                        product_name=item_data["product_name"],
-                        product_image=item_data["product_image"],
-                        unit_price=item_data["unit_price"],
-                        quantity=item_data["quantity"],
-                        total_price=item_data["total_price"]
-                    )
-                    
-                    db.add(cart_item)
-                    subtotal += item_data["total_price"]
-                    total_quantity += item_data["quantity"]
-                    item_count += 1
+                    quantity = item_data["quantity"]
+                    unit_price_cents = item_data["unit_price_cents"]
+                    total_price_cents = item_data["total_price_cents"]
+                    rows.append({
+                        "cart_id": db_cart.id,
+                        "product_id": item_data["product_id"],
+                        "product_name": item_data["product_name"],
+                        "product_image": item_data["product_image"],
+                        "unit_price_cents": unit_price_cents,
+                        "quantity": quantity,
+                        "total_price_cents": total_price_cents,
+                    })
+                    subtotal_cents += total_price_cents
+                    total_quantity += quantity
+                item_count = len(rows)
+                
+                if rows:
+                    await db.execute(insert(CartItem), rows)
                 
                 # 更新购物车统计信息
-                db_cart.subtotal = subtotal
-                db_cart.total_amount = subtotal  # 简化处理，实际应考虑税费、运费等
+                db_cart.subtotal_cents = subtotal_cents
+                db_cart.total_amount_cents = subtotal_cents  # 简化处理，实际应考虑税费、运费等
                 db_cart.item_count = item_count
                 db_cart.total_quantity = total_quantity
                 db_cart.updated_at = datetime.utcnow()
@@ -596,4 +843,56 @@ class CartService:
             logger.error("Sync cart to database error", 
                         error=str(e), 
                         user_id=user_id)
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    async def upsert_cart_item(
+        db: AsyncSession,
+        cart_id: int,
+        product: Product,
+        quantity: int
+    ) -> Optional[int]:
+        """
+        添加商品到数据库购物车（INSERT ... ON CONFLICT 单次往返完成新增或累加）
+        
+        依赖 cart_items 上 (cart_id, product_id) 唯一索引；调用方负责提交事务。
+        
+        Args:
+            db: 数据库会话
+            cart_id: 购物车ID
+            product: 商品对象
+            quantity: 增加的数量
+            
+        Returns:
+            Optional[int]: 累加后的商品数量，如果失败返回None
+        """
+        try:
+            table = CartItem.__table__
+            unit_price_cents = to_cents(product.price)
+            stmt = pg_insert(table).values(
+                cart_id=cart_id,
+                product_id=product.id,
+                product_name=product.title,
+                unit_price=unit_price_cents,
+                quantity=quantity,
+                total_price=unit_price_cents * quantity,
+            )
+            new_quantity = table.c.quantity + stmt.excluded.quantity
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.cart_id, table.c.product_id],
+                set_={
+                    "quantity": new_quantity,
+                    "total_price": new_quantity * table.c.unit_price,
+                    "updated_at": func.now(),
+                },
+            ).returning(table.c.quantity)
+            
+            result = await db.execute(stmt)
+            return result.scalar_one()
+            
+        except Exception as e:
+            logger.error("Upsert cart item error", 
+                        error=str(e), 
+                        cart_id=cart_id,
+                        product_id=product.id)
+            return None
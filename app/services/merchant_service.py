@@ -4,6 +4,7 @@
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import undefer_group
 from ..models.user import Merchant
 
 
@@ -12,7 +13,12 @@ class MerchantService:
         self.db = db
 
     async def get_by_user(self, user_id: int) -> Merchant | None:
-        res = await self.db.execute(select(Merchant).where(Merchant.user_id == user_id))
+        # 商家本人档案，加载延迟的扩展信息
+        res = await self.db.execute(
+            select(Merchant)
+            .options(undefer_group("profile"))
+            .where(Merchant.user_id == user_id)
+        )
         return res.scalar_one_or_none()
 
 
@@ -14,27 +14,210 @@
 6. 支持订单查询和统计分析
 """
 
-import uuid
+import asyncio
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import structlog
+from cachetools import TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, select
+from sqlalchemy import and_, bindparam, func, insert, literal, select, text, update
+from sqlalchemy.orm import undefer
 
 from ..models.order import Order, OrderItem, OrderStatus, PaymentStatus
 from ..models.product import Product
 from ..models.user import User
 from ..services.product_service import (
-    check_stock_availability, 
+    get_cached_stocks,
+    seed_cached_stocks,
     reserve_stock, 
     confirm_stock_reservation, 
     rollback_stock_reservation
 )
-from ..core.database import async_engine
+from ..core.database import async_engine, restore_instance, snapshot_instance
+from ..core.redis import acquire_lock, release_lock
 
 # 配置日志
 logger = structlog.get_logger(__name__)
 
+# 下单锁：同一用户同时只处理一个下单请求，锁超时兜底进程异常退出的情况
+ORDER_LOCK_KEY = "lock:order:user:{user_id}"
+ORDER_LOCK_TTL_MS = 5000
+
+# 订单编号日期前缀缓存：(日期序数, "ORDYYYYMMDD")
+_DAY_PREFIX = (0, "")
+
+# 订单号查询缓存：order_number -> 订单列快照（不持有会话中的对象），供回调轮询等重复读取使用。
+# 本进程内的状态变更会立即失效，其他进程的变更最多延迟 TTL 秒可见
+_order_cache: TTLCache = TTLCache(maxsize=10_000, ttl=10)
+
+# 订单完成时按订单项汇总数量更新商品销量（模块加载时构造，执行时只绑定 order_id）
+_ORDER_ITEM_TOTALS = (
+    select(
+        OrderItem.product_id,
+        func.sum(OrderItem.quantity).label("quantity")
+    )
+    .where(OrderItem.order_id == bindparam("order_id"))
+    .group_by(OrderItem.product_id)
+    .subquery()
+)
+_INCREMENT_SALES_FOR_ORDER = (
+    update(Product)
+    .where(Product.id == _ORDER_ITEM_TOTALS.c.product_id)
+    .values(sales_count=Product.sales_count + _ORDER_ITEM_TOTALS.c.quantity)
+    .execution_options(synchronize_session=False)
+)
+
+# 下单补偿：恢复已确认扣减的数据库库存与销量（executemany）
+_PRODUCTS_TABLE = Product.__table__
+_RESTORE_CONFIRMED_STOCK = (
+    update(_PRODUCTS_TABLE)
+    .where(_PRODUCTS_TABLE.c.id == bindparam("pid"))
+    .values(
+        stock=_PRODUCTS_TABLE.c.stock + bindparam("quantity"),
+        sales_count=_PRODUCTS_TABLE.c.sales_count - bindparam("quantity")
+    )
+)
+
+# 订单变更锁：事务级 advisory lock，按订单ID串行化状态变更，事务结束时自动释放
+_LOCK_ORDER = text("SELECT pg_advisory_xact_lock(hashtext('order'), :order_id)")
+
+
+async def lock_order(db: AsyncSession, order_id: int) -> None:
+    """
+    在当前事务内获取订单变更锁（须在事务开始后首先调用）
+    
+    Args:
+        db: 数据库会话
+        order_id: 订单ID
+    """
+    await db.execute(_LOCK_ORDER, {"order_id": order_id})
+
+
+def invalidate_order_cache(order_number: Optional[str] = None) -> None:
+    """
+    失效订单号查询缓存
+    
+    Args:
+        order_number: 订单号，为None时清空全部缓存（批量更新时使用）
+    """
+    if order_number is None:
+        _order_cache.clear()
+    else:
+        _order_cache.pop(order_number, None)
+
+
+def _today_prefix() -> str:
+    """获取当天的订单编号前缀（日期变化时才重新格式化）"""
+    global _DAY_PREFIX
+    today = datetime.now()
+    ordinal = today.toordinal()
+    if _DAY_PREFIX[0] != ordinal:
+        _DAY_PREFIX = (ordinal, f"ORD{today.strftime('%Y%m%d')}")
+    return _DAY_PREFIX[1]
+
+
+def generate_order_number() -> str:
+    """生成订单编号"""
+    return f"{_today_prefix()}{secrets.token_hex(4).upper()}"
+
+
+def merge_item_quantities(items: List[Dict[str, Any]]) -> Dict[int, int]:
+    """合并相同商品的数量，返回商品ID到数量的映射"""
+    quantities: Dict[int, int] = {}
+    for item in items:
+        product_id = int(item["product_id"])
+        quantities[product_id] = quantities.get(product_id, 0) + int(item["quantity"])
+    return quantities
+
+
+class OrderService:
+    """订单服务类（供路由层使用）"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create_simple(
+        self,
+        user_id: int,
+        items: List[Dict[str, Any]]
+    ) -> Optional[Order]:
+        """
+        创建简单订单（不含配送信息）
+        
+        商品一次 IN 查询加锁读取，订单项通过一次 executemany 批量写入。
+        事务由调用方提交，提交后调用方需用 decrement_cached_stocks 同步缓存库存。
+        
+        Args:
+            user_id: 用户ID
+            items: 订单项列表 [{product_id, quantity}]
+            
+        Returns:
+            Optional[Order]: 创建的订单对象，如果商品不可用或库存不足返回None
+        """
+        quantities = merge_item_quantities(items)
+        
+        if not quantities or any(q <= 0 for q in quantities.values()):
+            logger.warning("Invalid order items", user_id=user_id, items=items)
+            return None
+        
+        # 一次查询获取全部商品并加行锁
+        result = await self.db.execute(
+            select(Product)
+            .options(undefer(Product.attributes), undefer(Product.specifications))
+            .where(Product.id.in_(quantities.keys()), Product.is_deleted == False)
+            .with_for_update()
+        )
+        products = {product.id: product for product in result.scalars()}
+        
+        total_amount = 0.0
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if not product or not product.is_available or product.stock < quantity:
+                logger.warning("Product unavailable or insufficient stock",
+                             product_id=product_id,
+                             quantity=quantity)
+                return None
+            total_amount += float(product.price) * quantity
+        
+        order = Order(
+            order_number=generate_order_number(),
+            user_id=user_id,
+            status=OrderStatus.PENDING,
+            payment_status=PaymentStatus.PENDING,
+            subtotal=total_amount,
+            total_amount=total_amount
+        )
+        self.db.add(order)
+        await self.db.flush()  # 获取订单ID
+        
+        # 批量写入订单项并扣减库存
+        order_items = []
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            order_items.append({
+                "order_id": order.id,
+                "product_id": product_id,
+                "product_name": product.title,
+                "unit_price": float(product.price),
+                "quantity": quantity,
+                "total_price": float(product.price) * quantity,
+                "product_attributes": product.attributes,
+                "product_specifications": product.specifications,
+            })
+            product.stock -= quantity
+        
+        await self.db.execute(insert(OrderItem), order_items)
+        await self.db.flush()
+        
+        logger.info("Order created",
+                   order_id=order.id,
+                   order_number=order.order_number,
+                   user_id=user_id,
+                   item_count=len(order_items))
+        
+        return order
+
 
 async def create_order(
     db: AsyncSession,
@@ -45,6 +228,9 @@ async def create_order(
     """
     创建订单
     
+    同一用户的下单请求由 Redis 锁串行化（防止重复提交），锁在数据库事务之外获取；
+    各商品库存的并发扣减仍由 reserve_stock 的商品锁保护
+    
     Args:
         db: 数据库会话
         user: 用户对象
@@ -52,76 +238,111 @@ async def create_order(
         delivery_address: 配送地址信息
         
     Returns:
-        Optional[Order]: 创建的订单对象，如果失败返回None
+        Optional[Order]: 创建的订单对象，如果失败或该用户已有下单请求在处理中返回None
+    """
+    lock_key = ORDER_LOCK_KEY.format(user_id=user.id)
+    try:
+        lock_token = await acquire_lock(lock_key, ORDER_LOCK_TTL_MS)
+    except Exception as e:
+        logger.error("Order lock error", error=str(e), user_id=user.id)
+        return None
+    if lock_token is None:
+        logger.warning("Order creation already in progress", user_id=user.id)
+        return None
+    
+    try:
+        return await _create_order(db, user, items, delivery_address)
+    finally:
+        try:
+            await release_lock(lock_key, lock_token)
+        except Exception as e:
+            logger.warning("Order lock release error", error=str(e), user_id=user.id)
+
+
+async def _create_order(
+    db: AsyncSession,
+    user: User,
+    items: List[Dict[str, Any]],
+    delivery_address: Optional[Dict[str, Any]]
+) -> Optional[Order]:
+    """
+    创建订单（调用方已持有该用户的下单锁）
+    
+    拆分为多个短事务，Redis 等外部调用均在事务之外完成，缩短行锁持有时间：
+    1. 读取商品（只读事务）
+    2. 检查并预扣库存（Redis，无数据库事务）
+    3. 写入订单与订单项（一个事务，无外部调用）
+    4. 逐个确认库存预扣（每个确认为独立的短事务）
+    任一步骤失败时显式补偿已完成的步骤。
     """
+    stock_reservations: List[Dict[str, int]] = []
+    confirmed: List[Dict[str, int]] = []
+    order: Optional[Order] = None
+    order_committed = False
     try:
-        # 开始数据库事务
+        product_ids = [item["product_id"] for item in items]
+        
+        # 1. 一次 IN 查询取回全部商品（含订单项快照所需的延迟列），在预扣任何库存前校验
         async with db.begin():
-            # 1. 验证库存并预扣库存
-            stock_reservations = []
-            total_amount = 0.0
-            
-            for item in items:
-                product_id = item["product_id"]
-                quantity = item["quantity"]
-                
-                # 检查库存
-                if not await check_stock_availability(db, product_id, quantity):
-                    logger.warning("Insufficient stock for product", 
-                                 product_id=product_id, 
-                                 quantity=quantity)
-                    # 回滚已预扣的库存
-                    for reserved_item in stock_reservations:
-                        await rollback_stock_reservation(
-                            reserved_item["product_id"],
-                            reserved_item["quantity"],
-                            None  # 还没有订单ID
-                        )
-                    return None
-                
-                # 预扣库存
-                reservation_success = await reserve_stock(db, product_id, quantity)
-                if not reservation_success:
-                    logger.warning("Failed to reserve stock for product", 
-                                 product_id=product_id, 
-                                 quantity=quantity)
-                    # 回滚已预扣的库存
-                    for reserved_item in stock_reservations:
-                        await rollback_stock_reservation(
-                            reserved_item["product_id"],
-                            reserved_item["quantity"],
-                            None
-                        )
-                    return None
-                
+            result = await db.execute(
+                select(Product)
+                .options(undefer(Product.attributes), undefer(Product.specifications))
+                .where(Product.id.in_(product_ids))
+            )
+            products = {product.id: product for product in result.scalars()}
+        missing_ids = [pid for pid in product_ids if pid not in products]
+        if missing_ids:
+            logger.error("Product not found", product_ids=missing_ids)
+            return None
+        
+        # 同一商品可能出现在多个订单项中，按商品合并数量后统一检查与预扣
+        total_amount = 0.0
+        quantities: Dict[int, int] = {}
+        for item in items:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+            total_amount += float(products[item["product_id"]].price) * item["quantity"]
+        
+        # 2a. 检查库存（一次 MGET；缓存未命中的商品使用上面查询到的数据库库存，
+        # 并写入缓存，保证随后并发预扣时不再回退查询数据库会话）
+        cached_stocks = await get_cached_stocks(product_ids)
+        uncached = {
+            pid: products[pid].stock
+            for pid in quantities
+            if pid not in cached_stocks
+        }
+        if uncached:
+            await seed_cached_stocks(uncached)
+        for product_id, quantity in quantities.items():
+            stock = cached_stocks.get(product_id, uncached.get(product_id))
+            if stock is None or stock < quantity:
+                logger.warning("Insufficient stock for product", 
+                             product_id=product_id, 
+                             quantity=quantity)
+                return None
+        
+        # 2b. 并发预扣库存（均为 Redis 操作），部分失败时回滚已成功的预扣
+        reserved = await asyncio.gather(*[
+            reserve_stock(db, product_id, quantity)
+            for product_id, quantity in quantities.items()
+        ])
+        for (product_id, quantity), success in zip(quantities.items(), reserved):
+            if success:
                 stock_reservations.append({
                     "product_id": product_id,
                     "quantity": quantity
                 })
-                
-                # 获取商品信息计算价格
-                result = await db.execute(
-                    select(Product).where(Product.id == product_id)
-                )
-                product = result.scalar_one_or_none()
-                if not product:
-                    logger.error("Product not found", product_id=product_id)
-                    # 回滚已预扣的库存
-                    for reserved_item in stock_reservations:
-                        await rollback_stock_reservation(
-                            reserved_item["product_id"],
-                            reserved_item["quantity"],
-                            None
-                        )
-                    return None
-                
-                total_amount += float(product.price) * quantity
-            
-            # 2. 创建订单
-            order_number = f"ORD{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
-            
+        if len(stock_reservations) != len(quantities):
+            logger.warning("Failed to reserve stock for order", 
+                         user_id=user.id,
+                         reserved=len(stock_reservations),
+                         required=len(quantities))
+            await _release_reservations(stock_reservations)
+            return None
+        
+        # 3. 创建订单与订单项（一次 executemany 批量插入）
+        async with db.begin():
             order = Order(
-                order_number=order_number,
+                order_number=generate_order_number(),
                 user_id=user.id,
                 status=OrderStatus.PENDING,
                 payment_status=PaymentStatus.PENDING,
@@ -129,73 +350,112 @@ async def create_order(
                 total_amount=total_amount,
                 delivery_address=delivery_address
             )
-            
             db.add(order)
-            await db.flush()  # 获取订单ID但不提交事务
+            await db.flush()  # 获取订单ID
             
-            # 3. 创建订单项
+            order_items = []
             for item in items:
                 product_id = item["product_id"]
                 quantity = item["quantity"]
                 
-                # 获取商品信息
-                result = await db.execute(
-                    select(Product).where(Product.id == product_id)
-                )
-                product = result.scalar_one_or_none()
-                
-                if not product:
-                    continue
-                
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=product_id,
-                    product_name=product.title,
-                    unit_price=float(product.price),
-                    quantity=quantity,
-                    total_price=float(product.price) * quantity,
-                    product_attributes=product.attributes,
-                    product_specifications=product.specifications
-                )
-                
-                db.add(order_item)
-            
-            # 4. 确认库存预扣
-            for reservation in stock_reservations:
-                confirm_success = await confirm_stock_reservation(
-                    db, 
-                    reservation["product_id"], 
-                    reservation["quantity"],
-                    order.id
-                )
-                
-                if not confirm_success:
-                    logger.error("Failed to confirm stock reservation", 
-                               order_id=order.id,
-                               product_id=reservation["product_id"])
-                    # 这里事务会自动回滚
-                    return None
-            
-            # 提交事务
-            await db.commit()
-            await db.refresh(order)
-            
-            logger.info("Order created successfully", 
-                       order_id=order.id, 
-                       order_number=order.order_number,
-                       user_id=user.id)
+                product = products[product_id]
+                order_items.append({
+                    "order_id": order.id,
+                    "product_id": product_id,
+                    "product_name": product.title,
+                    "unit_price": float(product.price),
+                    "quantity": quantity,
+                    "total_price": float(product.price) * quantity,
+                    "product_attributes": product.attributes,
+                    "product_specifications": product.specifications
+                })
             
-            return order
+            await db.execute(insert(OrderItem), order_items)
+        order_committed = True
+        
+        # 4. 确认库存预扣（各自为独立的短事务）
+        for reservation in stock_reservations:
+            confirm_success = await confirm_stock_reservation(
+                db, 
+                reservation["product_id"], 
+                reservation["quantity"],
+                order.id
+            )
             
+            if not confirm_success:
+                logger.error("Failed to confirm stock reservation", 
+                           order_id=order.id,
+                           product_id=reservation["product_id"])
+                # 失败的预扣已由 confirm_stock_reservation 回滚，补偿其余步骤
+                pending = stock_reservations[len(confirmed) + 1:]
+                await _compensate_order(db, order, confirmed, pending)
+                return None
+            confirmed.append(reservation)
+        
+        logger.info("Order created successfully", 
+                   order_id=order.id, 
+                   order_number=order.order_number,
+                   user_id=user.id)
+        
+        return order
+        
     except Exception as e:
         logger.error("Order creation error", 
                     error=str(e), 
                     user_id=user.id,
                     items=items)
-        # 事务会自动回滚
+        if order_committed:
+            # 订单已写入：取消订单并恢复已确认的库存，归还其余 Redis 预扣
+            await _compensate_order(db, order, confirmed, stock_reservations[len(confirmed):])
+        else:
+            # 订单尚未写入时只需归还 Redis 预扣
+            await _release_reservations(stock_reservations)
         return None
 
 
+async def _release_reservations(reservations: List[Dict[str, int]]) -> None:
+    """并发归还 Redis 中的库存预扣"""
+    await asyncio.gather(*[
+        rollback_stock_reservation(
+            reservation["product_id"],
+            reservation["quantity"],
+            None  # 预扣时还没有订单ID
+        )
+        for reservation in reservations
+    ])
+
+
+async def _compensate_order(
+    db: AsyncSession,
+    order: Order,
+    confirmed: List[Dict[str, int]],
+    pending: List[Dict[str, int]]
+) -> None:
+    """
+    订单写入后确认库存失败或出现异常时的补偿：取消订单，恢复已确认商品的数据库库存与销量，并归还全部 Redis 预扣
+    
+    Args:
+        db: 数据库会话
+        order: 已写入的订单
+        confirmed: 已确认（已扣减数据库库存）的预扣
+        pending: 尚未确认的预扣
+    """
+    try:
+        async with db.begin():
+            order.status = OrderStatus.CANCELLED
+            order.payment_status = PaymentStatus.CANCELLED
+            if confirmed:
+                await db.execute(_RESTORE_CONFIRMED_STOCK, [
+                    {"pid": reservation["product_id"], "quantity": reservation["quantity"]}
+                    for reservation in confirmed
+                ])
+        await _release_reservations(confirmed + pending)
+    except Exception as e:
+        logger.error("Order compensation error", 
+                    error=str(e), 
+                    order_id=order.id)
+
+
 async def update_order_status(
     db: AsyncSession,
     order_id: int,
@@ -216,6 +476,8 @@ async def update_order_status(
     """
     try:
         async with db.begin():
+            await lock_order(db, order_id)
+            
             # 获取订单
             result = await db.execute(
                 select(Order).where(Order.id == order_id)
@@ -233,20 +495,11 @@ async def update_order_status(
             
             # 如果订单完成，更新商品销量
             if status == OrderStatus.COMPLETED:
-                # 获取订单项
-                result = await db.execute(
-                    select(OrderItem).where(OrderItem.order_id == order_id)
-                )
-                order_items = result.scalars().all()
-                
-                # 更新商品销量
-                for item in order_items:
-                    await db.execute(
-                        "UPDATE products SET sales_count = sales_count + :quantity WHERE id = :product_id",
-                        {"quantity": item.quantity, "product_id": item.product_id}
-                    )
+                # 按商品汇总订单项数量，一条 UPDATE ... FROM 更新全部商品销量
+                await db.execute(_INCREMENT_SALES_FOR_ORDER, {"order_id": order_id})
             
             await db.commit()
+            invalidate_order_cache(order.order_number)
             await db.refresh(order)
             
             logger.info("Order status updated", 
@@ -282,6 +535,8 @@ async def cancel_order(
     """
     try:
         async with db.begin():
+            await lock_order(db, order_id)
+            
             # 获取订单
             query = select(Order).where(Order.id == order_id)
             if user_id:
@@ -311,6 +566,7 @@ async def cancel_order(
             # 这里需要根据具体业务需求实现库存回滚
             
             await db.commit()
+            invalidate_order_cache(order.order_number)
             
             logger.info("Order cancelled", 
                        order_id=order.id, 
@@ -343,13 +599,21 @@ async def get_order_by_number(
         Optional[Order]: 订单对象，如果未找到返回None
     """
     try:
-        query = select(Order).where(Order.order_number == order_number)
-        if user_id:
-            query = query.where(Order.user_id == user_id)
-            
-        result = await db.execute(query)
-        order = result.scalar_one_or_none()
+        # 缓存保存列快照；命中时重建对象并以 merge(load=False) 挂到当前会话，不查询数据库
+        snapshot = _order_cache.get(order_number)
+        if snapshot is None:
+            result = await db.execute(
+                select(Order).where(Order.order_number == order_number)
+            )
+            order = result.scalar_one_or_none()
+            if order is None:
+                return None
+            _order_cache[order_number] = snapshot_instance(order)
+        else:
+            order = await db.merge(restore_instance(Order, snapshot), load=False)
         
+        if user_id and order.user_id != user_id:
+            return None
         return order
         
     except Exception as e:
@@ -415,25 +679,28 @@ async def process_order_timeout(
         timeout_time = datetime.utcnow() - timedelta(minutes=timeout_minutes)
         
         async with db.begin():
-            # 查找超时且未支付的订单
+            # 一条 UPDATE ... RETURNING 取消超时且未支付的订单，不加载 ORM 对象
             result = await db.execute(
-                select(Order)
+                update(Order)
                 .where(and_(
-                    Order.status == OrderStatus.PENDING,
-                    Order.payment_status == PaymentStatus.PENDING,
+                    # 状态条件内联为字面量，使计划器能匹配 idx_orders_pending_created 部分索引
+                    Order.status == literal(OrderStatus.PENDING, Order.status.type, literal_execute=True),
+                    Order.payment_status == literal(PaymentStatus.PENDING, Order.payment_status.type, literal_execute=True),
                     Order.created_at < timeout_time
                 ))
+                .values(
+                    status=OrderStatus.CANCELLED,
+                    payment_status=PaymentStatus.CANCELLED
+                )
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
             )
-            orders = result.scalars().all()
-            
-            processed_count = 0
-            for order in orders:
-                order.status = OrderStatus.CANCELLED
-                order.payment_status = PaymentStatus.CANCELLED
-                # TODO: 实现库存回滚
-                processed_count += 1
+            # TODO: 实现库存回滚
+            processed_count = len(result.scalars().all())
             
             await db.commit()
+            if processed_count:
+                invalidate_order_cache()
             
             logger.info("Processed order timeout", 
                        processed_count=processed_count,
@@ -14,21 +14,136 @@
 6. 集成通知服务发送支付结果通知
 """
 
-import uuid
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import structlog
+from cachetools import TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, exists, literal, select, text, update
+from sqlalchemy.orm.attributes import set_committed_value
 
 from ..models.payment import Payment, PaymentStatus, PaymentMethod
+from ..models.ids import next_id, decode_base32
+from ..models.money import to_cents
 from ..models.order import Order, OrderStatus, PaymentStatus as OrderPaymentStatus
-from ..services.order_service import update_order_status
+from ..services.order_service import invalidate_order_cache, lock_order, update_order_status
 from ..core.config import settings
+from ..core.database import restore_instance, snapshot_instance
+from ..core.redis import get_redis
 
 # 配置日志
 logger = structlog.get_logger(__name__)
 
+# 支付回调幂等键有效期（秒）
+CALLBACK_IDEMPOTENCY_TTL = 86400
+
+# 支付编号查询缓存：payment_number -> 支付列快照（不持有会话中的对象），供回调轮询等重复读取使用。
+# 本进程内的状态变更会立即失效，其他进程的变更最多延迟 TTL 秒可见
+_payment_cache: TTLCache = TTLCache(maxsize=10_000, ttl=10)
+
+# 按支付ID获取所属订单的变更锁（与 order_service.lock_order 使用同一锁空间）
+_LOCK_ORDER_BY_PAYMENT = text(
+    "SELECT pg_advisory_xact_lock(hashtext('order'), "
+    "(SELECT order_id FROM payments WHERE id = :payment_id))"
+)
+
+_PAYMENTS_TABLE = Payment.__table__
+_ORDERS_TABLE = Order.__table__
+
+
+def _payment_order_update(payment_filter, success: bool):
+    """
+    构造支付结果语句：CTE 中更新支付记录，外层按 RETURNING 的订单ID更新订单
+    
+    WITH p AS (UPDATE payments ... RETURNING ...) UPDATE orders ... FROM p，
+    支付与订单在一次往返中完成更新；订单不是待支付状态时不更新任何记录，
+    调用方应将空结果视为冲突
+    
+    Args:
+        payment_filter: 待更新支付记录的过滤条件
+        success: 是否为支付成功
+    """
+    # updated_at 显式赋值：列上的 Python onupdate 默认值无法在 CTE 内的 UPDATE 中预取
+    payment_values = {
+        "status": (PaymentStatus.SUCCESS if success else PaymentStatus.FAILED).value,
+        "updated_at": bindparam("now"),
+        "gateway_response": bindparam(
+            "gateway_response", type_=_PAYMENTS_TABLE.c.gateway_response.type
+        ),
+    }
+    if success:
+        payment_values["paid_at"] = bindparam("now")
+        payment_values["gateway_transaction_id"] = bindparam("transaction_id")
+    else:
+        payment_values["failed_at"] = bindparam("now")
+    
+    # 订单仍为待支付时才更新：已被取消或超时关闭的订单不会被改回已支付
+    order_pending = _ORDERS_TABLE.c.status == OrderStatus.PENDING
+    updated = (
+        update(_PAYMENTS_TABLE)
+        .where(payment_filter)
+        .where(exists().where(
+            _ORDERS_TABLE.c.id == _PAYMENTS_TABLE.c.order_id,
+            order_pending,
+        ))
+        .values(payment_values)
+        .returning(
+            _PAYMENTS_TABLE.c.id,
+            _PAYMENTS_TABLE.c.payment_number,
+            _PAYMENTS_TABLE.c.order_id,
+        )
+        .cte("updated_payments")
+    )
+    return (
+        update(_ORDERS_TABLE)
+        .where(_ORDERS_TABLE.c.id == updated.c.order_id)
+        .where(order_pending)
+        .values(
+            status=OrderStatus.PAID if success else OrderStatus.PENDING,
+            payment_status=OrderPaymentStatus.SUCCESS if success else OrderPaymentStatus.FAILED,
+            updated_at=bindparam("now"),
+        )
+        .returning(updated.c.id, updated.c.payment_number, _ORDERS_TABLE.c.order_number)
+    )
+
+
+# 支付结果语句在模块加载时构造一次
+# 回调只更新订单最新的一条待支付记录
+_CALLBACK_PAYMENT_ID = (
+    select(_PAYMENTS_TABLE.c.id)
+    .where(_PAYMENTS_TABLE.c.order_id == bindparam("order_id"))
+    .where(_PAYMENTS_TABLE.c.status == PaymentStatus.PENDING.value)
+    .order_by(_PAYMENTS_TABLE.c.created_at.desc(), _PAYMENTS_TABLE.c.id.desc())
+    .limit(1)
+    .scalar_subquery()
+)
+_CALLBACK_FILTER = and_(
+    _PAYMENTS_TABLE.c.id == _CALLBACK_PAYMENT_ID,
+    _PAYMENTS_TABLE.c.status == PaymentStatus.PENDING.value,
+)
+_CALLBACK_SUCCESS = _payment_order_update(_CALLBACK_FILTER, True)
+_CALLBACK_FAILED = _payment_order_update(_CALLBACK_FILTER, False)
+_PROCESS_PAYMENT = _payment_order_update(
+    and_(
+        _PAYMENTS_TABLE.c.id == bindparam("payment_id"),
+        _PAYMENTS_TABLE.c.status == PaymentStatus.PENDING.value,
+    ),
+    True,
+)
+
+
+def invalidate_payment_cache(payment_number: Optional[int] = None) -> None:
+    """
+    失效支付编号查询缓存
+    
+    Args:
+        payment_number: 支付编号，为None时清空全部缓存（批量更新时使用）
+    """
+    if payment_number is None:
+        _payment_cache.clear()
+    else:
+        _payment_cache.pop(payment_number, None)
+
 
 async def create_payment(
     db: AsyncSession,
@@ -52,8 +167,8 @@ async def create_payment(
     """
     try:
         async with db.begin():
-            # 生成支付编号
-            payment_number = f"PMT{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
+            # 生成支付编号（Snowflake，按时间递增）
+            payment_number = next_id()
             
             # 创建支付记录
             payment = Payment(
@@ -69,11 +184,10 @@ async def create_payment(
             
             db.add(payment)
             await db.commit()
-            await db.refresh(payment)
             
             logger.info("Payment created", 
                        payment_id=payment.id, 
-                       payment_number=payment.payment_number,
+                       payment_number=payment.public_number,
                        order_id=order.id,
                        amount=amount)
             
@@ -107,6 +221,9 @@ async def process_payment(
     """
     try:
         async with db.begin():
+            # 与取消订单、支付回调等变更串行化
+            await db.execute(_LOCK_ORDER_BY_PAYMENT, {"payment_id": payment_id})
+            
             # 获取支付记录
             result = await db.execute(
                 select(Payment).where(Payment.id == payment_id)
@@ -121,7 +238,7 @@ async def process_payment(
             if payment.status != PaymentStatus.PENDING:
                 logger.warning("Payment status is not pending", 
                              payment_id=payment_id, 
-                             status=payment.status.value)
+                             status=payment.status)
                 return None
             
             # 检查支付是否过期
@@ -129,25 +246,38 @@ async def process_payment(
                 payment.status = PaymentStatus.FAILED
                 payment.failed_at = datetime.utcnow()
                 await db.commit()
+                invalidate_payment_cache(payment.payment_number)
                 logger.warning("Payment expired", payment_id=payment_id)
                 return payment
             
-            # 更新支付状态为成功
-            payment.status = PaymentStatus.SUCCESS
-            payment.paid_at = datetime.utcnow()
-            payment.gateway_transaction_id = gateway_transaction_id
-            payment.gateway_response = gateway_response
-            
-            # 更新订单状态
-            await update_order_status(
-                db, 
-                payment.order_id, 
-                OrderStatus.PAID,
-                OrderPaymentStatus.SUCCESS
+            # 一条语句将支付更新为成功并更新订单状态（仍为待支付时才更新）
+            paid_at = datetime.utcnow()
+            result = await db.execute(
+                _PROCESS_PAYMENT,
+                {
+                    "payment_id": payment_id,
+                    "now": paid_at,
+                    "transaction_id": gateway_transaction_id,
+                    "gateway_response": gateway_response,
+                }
             )
+            row = result.first()
+            if row is None:
+                # 订单已被取消或关闭，不再标记为已支付
+                logger.warning("Order is not pending, payment not applied", 
+                             payment_id=payment_id, 
+                             order_id=payment.order_id)
+                return None
+            
+            # 同步已加载对象的属性（不标记为脏数据，避免再次 flush）
+            set_committed_value(payment, "status", PaymentStatus.SUCCESS.value)
+            set_committed_value(payment, "paid_at", paid_at)
+            set_committed_value(payment, "gateway_transaction_id", gateway_transaction_id)
+            set_committed_value(payment, "gateway_response", gateway_response)
             
             await db.commit()
-            await db.refresh(payment)
+            invalidate_payment_cache(payment.payment_number)
+            invalidate_order_cache(row.order_number)
             
             logger.info("Payment processed successfully", 
                        payment_id=payment.id, 
@@ -178,70 +308,92 @@ async def handle_payment_callback(
     Returns:
         bool: 是否处理成功
     """
+    # 使用幂等性键防止重复处理：SET NX 成功者处理回调，重复回调直接返回
+    idempotency_key = f"payment_callback:{order_id}:{payment_data.get('transaction_id', '')}"
+    try:
+        acquired = await get_redis().set(
+            idempotency_key, "1", nx=True, ex=CALLBACK_IDEMPOTENCY_TTL
+        )
+    except Exception as e:
+        logger.error("Payment callback idempotency check error", 
+                    error=str(e), 
+                    order_id=order_id)
+        return False
+    if not acquired:
+        logger.info("Duplicate payment callback ignored", 
+                   order_id=order_id,
+                   transaction_id=payment_data.get("transaction_id"))
+        return True
+    
+    processed = False
+    try:
+        processed = await _process_payment_callback(db, order_id, payment_data)
+        return processed
+    finally:
+        if not processed:
+            # 处理失败时删除幂等键，允许网关重试
+            try:
+                await get_redis().delete(idempotency_key)
+            except Exception as e:
+                logger.warning("Payment callback idempotency key cleanup error", 
+                              error=str(e), 
+                              order_id=order_id)
+
+
+async def _process_payment_callback(
+    db: AsyncSession,
+    order_id: int,
+    payment_data: Dict[str, Any]
+) -> bool:
+    """处理支付回调（调用方已通过幂等键排除重复回调）"""
+    success = payment_data.get("status") == "success"
     try:
-        # 使用幂等性键防止重复处理
-        idempotency_key = f"payment_callback:{order_id}:{payment_data.get('transaction_id', '')}"
-        
-        # 检查是否已处理过此回调
-        # 在生产环境中，这应该使用Redis等来实现
-        # 这里简化处理，直接查询支付记录
-        
         async with db.begin():
-            # 获取订单相关的支付记录
+            # 与取消订单等变更串行化
+            await lock_order(db, order_id)
+            
+            # 一条语句同时更新待支付记录与订单状态
             result = await db.execute(
-                select(Payment).where(Payment.order_id == order_id)
+                _CALLBACK_SUCCESS if success else _CALLBACK_FAILED,
+                {
+                    "order_id": order_id,
+                    "now": datetime.utcnow(),
+                    "transaction_id": payment_data.get("transaction_id"),
+                    "gateway_response": payment_data,
+                }
             )
-            payment = result.scalar_one_or_none()
-            
-            if not payment:
-                logger.warning("Payment not found for order", order_id=order_id)
+            rows = result.all()
+            
+            if not rows:
+                # 没有待支付记录：区分支付不存在与已处理
+                statuses = (await db.scalars(
+                    select(Payment.status).where(Payment.order_id == order_id)
+                )).all()
+                if not statuses:
+                    logger.warning("Payment not found for order", order_id=order_id)
+                    return False
+                if any(status in (PaymentStatus.SUCCESS, PaymentStatus.REFUNDED) for status in statuses):
+                    logger.info("Payment already processed", order_id=order_id)
+                    return True
+                if PaymentStatus.PENDING in statuses:
+                    # 存在待支付记录但订单已被取消或关闭
+                    logger.warning("Order is not pending, callback not applied", 
+                                 order_id=order_id)
+                    return False
+                logger.warning("No pending payment for order", 
+                             order_id=order_id, 
+                             statuses=statuses)
                 return False
             
-            # 检查是否已处理
-            if payment.status in [PaymentStatus.SUCCESS, PaymentStatus.REFUNDED]:
-                logger.info("Payment already processed", 
-                           payment_id=payment.id, 
-                           status=payment.status.value)
-                return True
-            
-            # 处理支付结果
-            if payment_data.get("status") == "success":
-                # 支付成功
-                payment.status = PaymentStatus.SUCCESS
-                payment.paid_at = datetime.utcnow()
-                payment.gateway_transaction_id = payment_data.get("transaction_id")
-                payment.gateway_response = payment_data
-                
-                # 更新订单状态
-                await update_order_status(
-                    db, 
-                    order_id, 
-                    OrderStatus.PAID,
-                    OrderPaymentStatus.SUCCESS
-                )
-                
-                logger.info("Payment callback processed successfully", 
-                           payment_id=payment.id, 
-                           order_id=order_id)
-            else:
-                # 支付失败
-                payment.status = PaymentStatus.FAILED
-                payment.failed_at = datetime.utcnow()
-                payment.gateway_response = payment_data
-                
-                # 更新订单状态
-                await update_order_status(
-                    db, 
-                    order_id, 
-                    OrderStatus.PENDING,
-                    OrderPaymentStatus.FAILED
-                )
-                
-                logger.info("Payment callback processed as failed", 
-                           payment_id=payment.id, 
-                           order_id=order_id)
-            
+            row = rows[0]
             await db.commit()
+            invalidate_payment_cache(row.payment_number)
+            invalidate_order_cache(row.order_number)
+            
+            logger.info("Payment callback processed successfully" if success
+                       else "Payment callback processed as failed", 
+                       payment_id=row.id, 
+                       order_id=order_id)
             return True
             
     except Exception as e:
@@ -272,6 +424,9 @@ async def refund_payment(
     """
     try:
         async with db.begin():
+            # 串行化同一订单的退款与状态变更，避免并发退款重复累加
+            await db.execute(_LOCK_ORDER_BY_PAYMENT, {"payment_id": payment_id})
+            
             # 获取支付记录
             result = await db.execute(
                 select(Payment).where(Payment.id == payment_id)
@@ -286,19 +441,21 @@ async def refund_payment(
             if payment.status != PaymentStatus.SUCCESS:
                 logger.warning("Payment is not successful", 
                              payment_id=payment_id, 
-                             status=payment.status.value)
+                             status=payment.status)
                 return False
             
-            # 计算退款金额
+            # 计算退款金额（以分为单位的整数运算）
+            remaining_cents = payment.amount_cents - (payment.refunded_amount_cents or 0)
             if amount is None:
                 # 全额退款
-                refund_amount = float(payment.amount) - float(payment.refunded_amount)
+                refund_cents = remaining_cents
             else:
-                refund_amount = amount
+                refund_cents = to_cents(amount)
+            refund_amount = refund_cents / 100
             
             # 检查退款金额是否超过可退款金额
-            remaining_amount = float(payment.amount) - float(payment.refunded_amount)
-            if refund_amount > remaining_amount:
+            remaining_amount = remaining_cents / 100
+            if refund_cents > remaining_cents:
                 logger.warning("Refund amount exceeds remaining amount", 
                              payment_id=payment_id, 
                              refund_amount=refund_amount,
@@ -306,11 +463,11 @@ async def refund_payment(
                 return False
             
             # 更新支付状态和退款信息
-            payment.refunded_amount = float(payment.refunded_amount) + refund_amount
+            payment.refunded_amount_cents = (payment.refunded_amount_cents or 0) + refund_cents
             payment.refund_count += 1
             
             # 更新支付状态
-            if refund_amount >= float(payment.amount):
+            if payment.refunded_amount_cents >= payment.amount_cents:
                 payment.status = PaymentStatus.REFUNDED
             else:
                 payment.status = PaymentStatus.PARTIALLY_REFUNDED
@@ -332,6 +489,7 @@ async def refund_payment(
                 )
             
             await db.commit()
+            invalidate_payment_cache(payment.payment_number)
             
             logger.info("Payment refund processed", 
                        payment_id=payment_id, 
@@ -349,23 +507,33 @@ async def refund_payment(
 
 async def get_payment_by_number(
     db: AsyncSession,
-    payment_number: str
+    payment_number: Union[int, str]
 ) -> Optional[Payment]:
     """
     根据支付编号获取支付记录
     
     Args:
         db: 数据库会话
-        payment_number: 支付编号
+        payment_number: 支付编号（整数或 Base32 展示编号）
         
     Returns:
         Optional[Payment]: 支付对象，如果未找到返回None
     """
     try:
+        if isinstance(payment_number, str):
+            payment_number = decode_base32(payment_number)
+        
+        # 缓存保存列快照；命中时重建对象并以 merge(load=False) 挂到当前会话，不查询数据库
+        snapshot = _payment_cache.get(payment_number)
+        if snapshot is not None:
+            return await db.merge(restore_instance(Payment, snapshot), load=False)
+        
         result = await db.execute(
             select(Payment).where(Payment.payment_number == payment_number)
         )
         payment = result.scalar_one_or_none()
+        if payment is not None:
+            _payment_cache[payment_number] = snapshot_instance(payment)
         
         return payment
         
@@ -394,30 +562,37 @@ async def process_payment_timeout(
         timeout_time = datetime.utcnow() - timedelta(minutes=timeout_minutes)
         
         async with db.begin():
-            # 查找超时且待支付的支付记录
+            # 一条 UPDATE ... RETURNING 标记超时且待支付的支付记录
+            now = datetime.utcnow()
             result = await db.execute(
-                select(Payment)
-                .where(Payment.status == PaymentStatus.PENDING)
+                update(Payment)
+                # 状态条件内联为字面量，使计划器能匹配 idx_payments_pending_created 部分索引
+                .where(Payment.status == literal(PaymentStatus.PENDING.value, literal_execute=True))
                 .where(Payment.created_at < timeout_time)
+                .values(status=PaymentStatus.FAILED, failed_at=now)
+                .returning(Payment.order_id)
+                .execution_options(synchronize_session=False)
             )
-            payments = result.scalars().all()
-            
-            processed_count = 0
-            for payment in payments:
-                payment.status = PaymentStatus.FAILED
-                payment.failed_at = datetime.utcnow()
-                
-                # 更新订单状态
-                await update_order_status(
-                    db, 
-                    payment.order_id, 
-                    OrderStatus.PENDING,
-                    OrderPaymentStatus.FAILED
+            failed_order_ids = result.scalars().all()
+            processed_count = len(failed_order_ids)
+            order_ids = list(set(failed_order_ids))
+            
+            # 批量更新对应订单的支付状态
+            if order_ids:
+                await db.execute(
+                    update(Order)
+                    .where(Order.id.in_(order_ids))
+                    .values(
+                        status=OrderStatus.PENDING,
+                        payment_status=OrderPaymentStatus.FAILED
+                    )
+                    .execution_options(synchronize_session=False)
                 )
-                
-                processed_count += 1
             
             await db.commit()
+            if processed_count:
+                invalidate_payment_cache()
+                invalidate_order_cache()
             
             logger.info("Processed payment timeout", 
                        processed_count=processed_count,
@@ -14,21 +14,49 @@
 """
 
 import asyncio
+import base64
+from datetime import datetime
 import structlog
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, update
-from redis import asyncio as aioredis
+from sqlalchemy import and_, bindparam, select, tuple_, update
+from redis.exceptions import ResponseError
+import msgpack
+from cachetools import TTLCache
 
 from ..core.config import settings
-from ..models.product import Product
+from ..core.redis import get_redis
+from ..models.money import to_cents
+from ..models.product import Product, ProductStatus
 from ..core.database import async_engine
 
 # 配置日志
 logger = structlog.get_logger(__name__)
 
-# Redis 连接
-redis_client = aioredis.from_url(settings.redis_url)
+# 进程内库存缓存：product_id -> 库存，吸收购物车操作中对同一商品的重复读取。
+# 仅用于购物车校验，下单时 reserve_stock 仍以 Redis 为准
+_stock_cache: TTLCache = TTLCache(maxsize=10_000, ttl=2)
+
+# 商品简要信息缓存（购物车热路径使用），商品修改后需调用 invalidate_product_view
+PRODUCT_VIEW_KEY = "product:v:{product_id}"
+PRODUCT_VIEW_TTL = 300
+
+# 商品简要信息查询，语句在模块加载时构造一次，每次调用只绑定参数
+_PRODUCT_VIEW_BY_ID = select(
+    Product.id,
+    Product.title,
+    Product.price,
+    Product.main_image_url,
+    Product.is_available
+).where(Product.id == bindparam("product_id"), Product.is_deleted == False)
+
+# 库存查询（数据库回退路径），同样在模块加载时构造
+_STOCKS = select(Product.id, Product.stock).where(Product.is_deleted == False)
+_STOCK_BY_ID = _STOCKS.where(Product.id == bindparam("product_id"))
+
+# 缓冲计数器：Redis 哈希 {product_id: 增量}，由定时任务批量写回数据库
+COUNTER_FIELDS = ("view_count", "favorite_count")
+COUNTER_KEY = "product:counter:{field}"
 
 
 async def check_stock_availability(
@@ -50,23 +78,20 @@ async def check_stock_availability(
     try:
         # 先从Redis检查库存（快速检查）
         redis_key = f"stock:{product_id}"
-        redis_stock = await redis_client.get(redis_key)
+        redis_stock = await get_redis().get(redis_key)
         
         if redis_stock is not None:
             # Redis中有库存信息，直接比较
             return int(redis_stock) >= quantity
         
         # Redis中没有库存信息，从数据库查询
-        result = await db.execute(
-            "SELECT stock FROM products WHERE id = :product_id AND is_deleted = false",
-            {"product_id": product_id}
-        )
+        result = await db.execute(_STOCK_BY_ID, {"product_id": product_id})
         row = result.fetchone()
         
         if not row:
             return False
             
-        return row[0] >= quantity
+        return row.stock >= quantity
         
     except Exception as e:
         logger.error("Stock availability check error", 
@@ -99,7 +124,7 @@ async def reserve_stock(
     
     try:
         # 获取分布式锁（最多等待10秒，锁持有时间30秒）
-        lock_acquired = await redis_client.set(
+        lock_acquired = await get_redis().set(
             lock_key, 
             lock_value, 
             nx=True, 
@@ -115,21 +140,18 @@ async def reserve_stock(
         try:
             # 从Redis获取当前库存
             redis_key = f"stock:{product_id}"
-            current_stock = await redis_client.get(redis_key)
+            current_stock = await get_redis().get(redis_key)
             
             if current_stock is None:
                 # Redis中没有库存信息，从数据库加载
-                result = await db.execute(
-                    "SELECT stock FROM products WHERE id = :product_id AND is_deleted = false",
-                    {"product_id": product_id}
-                )
+                result = await db.execute(_STOCK_BY_ID, {"product_id": product_id})
                 row = result.fetchone()
                 if not row:
                     return False
                 
-                current_stock = row[0]
+                current_stock = row.stock
                 # 同步到Redis
-                await redis_client.set(redis_key, current_stock)
+                await get_redis().set(redis_key, current_stock)
             else:
                 current_stock = int(current_stock)
             
@@ -139,11 +161,11 @@ async def reserve_stock(
             
             # 预扣库存（Redis中减库存）
             new_stock = current_stock - quantity
-            await redis_client.set(redis_key, new_stock)
+            await get_redis().set(redis_key, new_stock)
             
             # 记录预扣操作到Redis（用于后续确认或回滚）
             reserve_key = f"reserve:{product_id}:{order_id}"
-            await redis_client.setex(
+            await get_redis().setex(
                 reserve_key, 
                 600,  # 10分钟过期
                 quantity
@@ -164,7 +186,7 @@ async def reserve_stock(
                 return 0
             end
             """
-            await redis_client.eval(lua_script, 1, lock_key, lock_value)
+            await get_redis().eval(lua_script, 1, lock_key, lock_value)
             
     except Exception as e:
         logger.error("Stock reservation error", 
@@ -217,7 +239,7 @@ async def confirm_stock_reservation(
             
             # 删除Redis中的预扣记录
             reserve_key = f"reserve:{product_id}:{order_id}"
-            await redis_client.delete(reserve_key)
+            await get_redis().delete(reserve_key)
             
             logger.info("Stock reservation confirmed", 
                        product_id=product_id, 
@@ -251,11 +273,11 @@ async def rollback_stock_reservation(
     try:
         # 归还Redis中的库存
         redis_key = f"stock:{product_id}"
-        await redis_client.incrby(redis_key, quantity)
+        await get_redis().incrby(redis_key, quantity)
         
         # 删除预扣记录
         reserve_key = f"reserve:{product_id}:{order_id}"
-        await redis_client.delete(reserve_key)
+        await get_redis().delete(reserve_key)
         
         logger.info("Stock reservation rolled back", 
                    product_id=product_id, 
@@ -284,20 +306,15 @@ async def sync_stock_to_cache(
     try:
         if product_id:
             # 同步单个商品
-            result = await db.execute(
-                "SELECT id, stock FROM products WHERE id = :product_id AND is_deleted = false",
-                {"product_id": product_id}
-            )
+            result = await db.execute(_STOCK_BY_ID, {"product_id": product_id})
             rows = result.fetchall()
         else:
             # 同步所有商品（在生产环境中可能需要分批处理）
-            result = await db.execute(
-                "SELECT id, stock FROM products WHERE is_deleted = false"
-            )
+            result = await db.execute(_STOCKS)
             rows = result.fetchall()
         
         # 批量更新Redis
-        pipe = redis_client.pipeline()
+        pipe = get_redis().pipeline()
         for row in rows:
             redis_key = f"stock:{row[0]}"
             pipe.set(redis_key, row[1])
@@ -317,18 +334,313 @@ async def get_cached_stock(product_id: int) -> Optional[int]:
     """
     获取缓存中的库存数量
     
+    结果在进程内缓存 2 秒，短时间内重复读取同一商品不再访问 Redis
+    
     Args:
         product_id: 商品ID
         
     Returns:
         Optional[int]: 库存数量，如果不存在返回None
     """
+    stock = _stock_cache.get(product_id)
+    if stock is not None:
+        return stock
     try:
         redis_key = f"stock:{product_id}"
-        stock = await redis_client.get(redis_key)
-        return int(stock) if stock is not None else None
+        value = await get_redis().get(redis_key)
+        if value is None:
+            return None
+        stock = _stock_cache[product_id] = int(value)
+        return stock
     except Exception as e:
         logger.error("Get cached stock error", 
                     error=str(e), 
                     product_id=product_id)
-        return None
\ No newline at end of file
+        return None
+
+
+async def get_cached_stocks(product_ids: List[int]) -> Dict[int, int]:
+    """
+    批量获取缓存中的库存数量（一次 MGET）
+    
+    Args:
+        product_ids: 商品ID列表
+        
+    Returns:
+        Dict[int, int]: 商品ID到库存数量的映射，缓存中不存在的商品不包含在内
+    """
+    if not product_ids:
+        return {}
+    try:
+        values = await get_redis().mget([f"stock:{pid}" for pid in product_ids])
+        return {
+            pid: int(value)
+            for pid, value in zip(product_ids, values)
+            if value is not None
+        }
+    except Exception as e:
+        logger.error("Get cached stocks error", 
+                    error=str(e), 
+                    product_ids=product_ids)
+        return {}
+
+
+async def seed_cached_stocks(stocks: Dict[int, int]) -> None:
+    """
+    将数据库库存写入缓存（仅在缓存中不存在时写入，不覆盖已有库存）
+    
+    Args:
+        stocks: 商品ID到数据库库存数量的映射
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for product_id, stock in stocks.items():
+            pipe.set(f"stock:{product_id}", stock, nx=True)
+        await pipe.execute()
+    except Exception as e:
+        logger.error("Seed cached stocks error", 
+                    error=str(e), 
+                    product_ids=list(stocks))
+
+
+_DECR_IF_EXISTS_LUA = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("DECRBY", KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+async def decrement_cached_stocks(quantities: Dict[int, int]) -> None:
+    """
+    数据库扣减库存并提交后，同步扣减缓存中的库存
+    
+    仅扣减缓存中已存在的键：不存在的键下次读取时会从数据库重新加载，
+    不能凭空写入负数。
+    
+    Args:
+        quantities: 商品ID到已扣减数量的映射
+    """
+    for product_id in quantities:
+        _stock_cache.pop(product_id, None)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for product_id, quantity in quantities.items():
+            pipe.eval(_DECR_IF_EXISTS_LUA, 1, f"stock:{product_id}", quantity)
+        await pipe.execute()
+    except Exception as e:
+        logger.error("Decrement cached stocks error", 
+                    error=str(e), 
+                    quantities=quantities)
+
+
+async def increment_product_counter(
+    product_id: int,
+    field: str = "view_count",
+    amount: int = 1
+) -> None:
+    """
+    缓冲递增商品计数（浏览数、收藏数）
+
+    只写 Redis，不更新 products 行；由 flush_product_counters 批量写回。
+
+    Args:
+        product_id: 商品ID
+        field: 计数字段，取值见 COUNTER_FIELDS
+        amount: 增量（可为负数）
+    """
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f"Unsupported counter field: {field}")
+    try:
+        await get_redis().hincrby(COUNTER_KEY.format(field=field), product_id, amount)
+    except Exception as e:
+        logger.error("Increment product counter error",
+                    error=str(e),
+                    product_id=product_id,
+                    field=field)
+
+
+async def flush_product_counters(db: AsyncSession) -> int:
+    """
+    将 Redis 中缓冲的计数增量批量写回数据库
+
+    先将计数哈希原子重命名为 flushing 键，新的递增写入新哈希；
+    写库成功后再删除 flushing 键，失败时保留到下次重试。
+
+    Args:
+        db: 数据库会话
+
+    Returns:
+        int: 本次更新的商品计数条数
+    """
+    table = Product.__table__
+    flushed = 0
+    for field in COUNTER_FIELDS:
+        key = COUNTER_KEY.format(field=field)
+        flushing_key = f"{key}:flushing"
+        try:
+            # 上次写库失败遗留的 flushing 键优先处理
+            if not await get_redis().exists(flushing_key):
+                try:
+                    await get_redis().rename(key, flushing_key)
+                except ResponseError:
+                    # 计数哈希不存在，没有待写回的增量
+                    continue
+
+            deltas = await get_redis().hgetall(flushing_key)
+            # 按商品ID排序更新，避免并发事务间死锁
+            params = sorted(
+                ({"pid": int(pid), "delta": int(delta)} for pid, delta in deltas.items() if int(delta)),
+                key=lambda p: p["pid"]
+            )
+            if params:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("pid"))
+                    .values({field: table.c[field] + bindparam("delta")}),
+                    params
+                )
+                await db.commit()
+
+            await get_redis().delete(flushing_key)
+            flushed += len(params)
+
+        except Exception as e:
+            await db.rollback()
+            logger.error("Flush product counters error",
+                        error=str(e),
+                        field=field)
+
+    if flushed:
+        logger.info("Product counters flushed", count=flushed)
+    return flushed
+
+
+def encode_product_cursor(product: Product) -> str:
+    """将商品的 (created_at, id) 编码为分页游标"""
+    raw = f"{product.created_at.isoformat()}|{product.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_product_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解码分页游标
+    
+    Raises:
+        ValueError: 游标格式无效
+    """
+    raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    created_at, product_id = raw.split("|", 1)
+    return datetime.fromisoformat(created_at), int(product_id)
+
+
+async def get_merchant_products_page(
+    db: AsyncSession,
+    merchant_id: int,
+    status: ProductStatus,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[Product], Optional[str]]:
+    """
+    游标分页获取商家商品列表（商家后台）
+    
+    按 (created_at, id) 倒序进行键集分页，沿 idx_products_merchant_list 顺序扫描，
+    无需 OFFSET 和排序
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        status: 商品状态
+        limit: 每页数量
+        cursor: 上一页返回的游标
+        
+    Returns:
+        Tuple[List[Product], Optional[str]]: 商品列表和下一页游标
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    query = (
+        select(Product)
+        .where(
+            Product.merchant_id == merchant_id,
+            Product.status == status,
+            Product.is_deleted == False
+        )
+        .order_by(Product.created_at.desc(), Product.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, product_id = decode_product_cursor(cursor)
+        query = query.where(
+            tuple_(Product.created_at, Product.id) < tuple_(created_at, product_id)
+        )
+    
+    result = await db.execute(query)
+    products = list(result.scalars().all())
+    
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_product_cursor(products[-1])
+    
+    return products, next_cursor
+
+
+async def get_product_view(db: AsyncSession, product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    获取商品简要信息（标题、价格（分）、主图、是否可售）
+    
+    优先读取 Redis 缓存，未命中时查询数据库并缓存 PRODUCT_VIEW_TTL 秒
+    
+    Args:
+        db: 数据库会话
+        product_id: 商品ID
+        
+    Returns:
+        Optional[Dict[str, Any]]: 商品简要信息，商品不存在或已删除返回None
+    """
+    key = PRODUCT_VIEW_KEY.format(product_id=product_id)
+    try:
+        cached = await get_redis().get(key)
+        if cached is not None:
+            return msgpack.unpackb(cached, raw=False)
+    except Exception as e:
+        logger.error("Get product view cache error", 
+                    error=str(e), 
+                    product_id=product_id)
+    
+    result = await db.execute(_PRODUCT_VIEW_BY_ID, {"product_id": product_id})
+    row = result.one_or_none()
+    if row is None:
+        return None
+    
+    view = {
+        "id": row.id,
+        "title": row.title,
+        "price_cents": to_cents(row.price),
+        "main_image_url": row.main_image_url,
+        "is_available": row.is_available,
+    }
+    try:
+        await get_redis().setex(key, PRODUCT_VIEW_TTL, msgpack.packb(view, use_bin_type=True))
+    except Exception as e:
+        logger.error("Set product view cache error", 
+                    error=str(e), 
+                    product_id=product_id)
+    return view
+
+
+async def invalidate_product_view(product_id: int) -> None:
+    """
+    删除商品简要信息缓存
+    
+    Args:
+        product_id: 商品ID
+    """
+    try:
+        await get_redis().delete(PRODUCT_VIEW_KEY.format(product_id=product_id))
+    except Exception as e:
+        logger.error("Invalidate product view error", 
+                    error=str(e), 
+                    product_id=product_id)
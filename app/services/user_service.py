@@ -14,16 +14,23 @@
 6. 提供用户统计和分析功能
 """
 
+import base64
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, func
+from sqlalchemy import select, update, and_, func, tuple_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
 from ..models.user import User, UserRole, UserStatus, Merchant
 from ..models.address import Address
-from ..core.security import get_password_hash, verify_password, create_tokens_for_user
+from ..core.security import (
+    aget_password_hash,
+    averify_and_update_password,
+    create_tokens_for_user,
+    publish_user_invalidation,
+)
 from ..core.config import settings
 from ..schemas.user import UserCreate, UserUpdate
 
@@ -58,6 +65,38 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
         return None
 
 
+async def get_active_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    根据用户ID获取可用（活跃且未删除）用户
+    
+    状态条件在 SQL 中过滤，可由部分索引 idx_users_active 支撑
+    
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        
+    Returns:
+        Optional[User]: 用户对象，如果不存在或不可用返回None
+    """
+    try:
+        result = await db.execute(
+            select(User)
+            .options(selectinload(User.merchant))
+            .where(
+                User.id == user_id,
+                User.is_active.is_(True),
+                User.is_deleted.is_(False)
+            )
+        )
+        return result.scalar_one_or_none()
+        
+    except Exception as e:
+        logger.error("Get active user by ID error", 
+                    error=str(e), 
+                    user_id=user_id)
+        return None
+
+
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """
     根据邮箱获取用户
@@ -103,10 +142,15 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> Opti
             logger.info("User not found", email=email)
             return None
         
-        if not verify_password(password, user.password_hash):
+        verified, new_hash = await averify_and_update_password(password, user.password_hash)
+        if not verified:
             logger.info("Invalid password", email=email)
             return None
         
+        # 历史 bcrypt 哈希或参数过时，登录时升级为当前算法
+        if new_hash:
+            user.password_hash = new_hash
+        
         # 更新最后登录时间
         user.last_login_at = datetime.utcnow()
         await db.commit()
@@ -157,7 +201,7 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> Optional[User]
                 first_name=user_data.first_name,
                 last_name=user_data.last_name,
                 bio=user_data.bio,
-                password_hash=get_password_hash(user_data.password),
+                password_hash=await aget_password_hash(user_data.password),
                 role=user_data.role or UserRole.USER,
                 status=UserStatus.PENDING,
                 is_active=True,
@@ -240,18 +284,18 @@ async def update_user(
             
             # 处理密码更新
             if "password" in update_data:
-                update_data["password_hash"] = get_password_hash(update_data.pop("password"))
+                update_data["password_hash"] = await aget_password_hash(update_data.pop("password"))
             
             # 更新其他字段
             for field, value in update_data.items():
                 if hasattr(user, field):
                     setattr(user, field, value)
             
-            user.updated_at = datetime.utcnow()
-            
             await db.commit()
             await db.refresh(user)
             
+            await publish_user_invalidation(user_id)
+            
             logger.info("User updated", 
                        user_id=user.id, 
                        updated_fields=list(update_data.keys()))
@@ -289,10 +333,10 @@ async def delete_user(db: AsyncSession, user_id: int) -> bool:
             user.is_deleted = True
             user.deleted_at = datetime.utcnow()
             user.is_active = False
-            user.updated_at = datetime.utcnow()
-            
             await db.commit()
             
+            await publish_user_invalidation(user_id)
+            
             logger.info("User deleted", user_id=user_id)
             
             return True
@@ -327,11 +371,11 @@ async def activate_user(db: AsyncSession, user_id: int) -> Optional[User]:
             # 激活用户
             user.status = UserStatus.ACTIVE
             user.is_active = True
-            user.updated_at = datetime.utcnow()
-            
             await db.commit()
             await db.refresh(user)
             
+            await publish_user_invalidation(user_id)
+            
             logger.info("User activated", user_id=user_id)
             
             return user
@@ -366,11 +410,11 @@ async def deactivate_user(db: AsyncSession, user_id: int) -> Optional[User]:
             # 停用用户
             user.status = UserStatus.SUSPENDED
             user.is_active = False
-            user.updated_at = datetime.utcnow()
-            
             await db.commit()
             await db.refresh(user)
             
+            await publish_user_invalidation(user_id)
+            
             logger.info("User deactivated", user_id=user_id)
             
             return user
@@ -411,6 +455,89 @@ async def get_user_addresses(db: AsyncSession, user_id: int) -> List[Address]:
         return []
 
 
+def encode_address_cursor(address: Address) -> str:
+    """将地址的 (created_at, id) 编码为分页游标"""
+    raw = f"{address.created_at.isoformat()}|{address.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_address_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解码分页游标
+    
+    Raises:
+        ValueError: 游标格式无效
+    """
+    raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    created_at, address_id = raw.split("|", 1)
+    return datetime.fromisoformat(created_at), int(address_id)
+
+
+async def get_user_addresses_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[Address], Optional[str]]:
+    """
+    游标分页获取用户地址列表
+    
+    按 (created_at, id) 倒序进行键集分页，避免 OFFSET 扫描
+    
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        limit: 每页数量
+        cursor: 上一页返回的游标
+        
+    Returns:
+        Tuple[List[Address], Optional[str]]: 地址列表和下一页游标
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    query = (
+        select(Address)
+        .where(Address.user_id == user_id, Address.is_active == True)
+        .order_by(Address.created_at.desc(), Address.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, address_id = decode_address_cursor(cursor)
+        query = query.where(
+            tuple_(Address.created_at, Address.id) < tuple_(created_at, address_id)
+        )
+    
+    result = await db.execute(query)
+    addresses = list(result.scalars().all())
+    
+    next_cursor = None
+    if len(addresses) > limit:
+        addresses = addresses[:limit]
+        next_cursor = encode_address_cursor(addresses[-1])
+    
+    return addresses, next_cursor
+
+
+async def get_user_addresses_version(db: AsyncSession, user_id: int) -> str:
+    """
+    获取用户地址列表版本标识（用于 ETag）
+    
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        
+    Returns:
+        str: 由地址数量和最近更新时间组成的版本标识
+    """
+    result = await db.execute(
+        select(func.count(Address.id), func.max(Address.updated_at))
+        .where(Address.user_id == user_id, Address.is_active == True)
+    )
+    count, last_updated = result.one()
+    return f"{count}:{last_updated.isoformat() if last_updated else ''}"
+
+
 async def create_user_address(
     db: AsyncSession, 
     user_id: int, 
@@ -467,9 +594,11 @@ async def get_users(
     limit: int = 100,
     role: Optional[UserRole] = None,
     status: Optional[UserStatus] = None
-) -> List[User]:
+) -> Tuple[List[User], int]:
     """
-    获取用户列表
+    获取用户列表及总数
+    
+    总数通过 COUNT(*) OVER() 窗口函数在同一查询中返回，无需额外的 COUNT 往返
     
     Args:
         db: 数据库会话
@@ -479,10 +608,10 @@ async def get_users(
         status: 用户状态过滤
         
     Returns:
-        List[User]: 用户列表
+        Tuple[List[User], int]: 用户列表和符合条件的总数（页越界时为0）
     """
     try:
-        query = select(User)
+        query = select(User, func.count().over().label("total"))
         
         # 添加过滤条件
         conditions = [User.is_deleted == False]
@@ -497,16 +626,19 @@ async def get_users(
         query = query.offset(skip).limit(limit).order_by(User.created_at.desc())
         
         result = await db.execute(query)
-        users = result.scalars().all()
+        rows = result.all()
+        
+        users = [row[0] for row in rows]
+        total = rows[0].total if rows else 0
         
-        return users
+        return users, total
         
     except Exception as e:
         logger.error("Get users error", 
                     error=str(e), 
                     skip=skip,
                     limit=limit)
-        return []
+        return [], 0
 
 
 async def get_user_count(
@@ -543,3 +675,31 @@ async def get_user_count(
         logger.error("Get user count error", 
                     error=str(e))
         return 0
+
+
+class UserService:
+    """用户服务类（供路由层使用，封装模块级函数）"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        return await get_user_by_id(self.db, user_id)
+    
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        return await get_user_by_email(self.db, email)
+    
+    async def create_user(self, user_data: UserCreate) -> Optional[User]:
+        return await create_user(self.db, user_data)
+    
+    async def update_user(self, user_id: int, user_data: UserUpdate) -> Optional[User]:
+        return await update_user(self.db, user_id, user_data)
+    
+    async def get_users(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        role: Optional[UserRole] = None,
+        status: Optional[UserStatus] = None
+    ) -> Tuple[List[User], int]:
+        return await get_users(self.db, skip, limit, role, status)
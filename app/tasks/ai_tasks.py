@@ -7,7 +7,7 @@ AI 相关异步任务
 
 from ..core.celery import celery_app
 from ..services.ai_service import AIService
-from ..core.database import AsyncSessionLocal
+from ..core.database import TaskSessionLocal
 import asyncio
 
 
@@ -15,17 +15,28 @@ import asyncio
 def generate_product_embedding(product_id: int) -> str:
     """生成商品的向量嵌入（同步包装异步）。"""
     async def _run():
-        async with AsyncSessionLocal() as db:
+        async with TaskSessionLocal() as db:
             svc = AIService(db)
             await svc.generate_product_embedding(product_id)
     asyncio.run(_run())
     return "ok"
 
 
+@celery_app.task(name="app.tasks.ai_tasks.generate_product_embeddings", acks_late=True)
+def generate_product_embeddings(product_ids: list[int]) -> str:
+    """批量生成商品的向量嵌入（同步包装异步）。"""
+    async def _run():
+        async with TaskSessionLocal() as db:
+            svc = AIService(db)
+            await svc.generate_product_embeddings(product_ids)
+    asyncio.run(_run())
+    return "ok"
+
+
 @celery_app.task(name="app.tasks.ai_tasks.refresh_outdated_embeddings", acks_late=True)
 def refresh_outdated_embeddings() -> str:
     async def _run():
-        async with AsyncSessionLocal() as db:
+        async with TaskSessionLocal() as db:
             svc = AIService(db)
             await svc.refresh_outdated_embeddings()
     asyncio.run(_run())
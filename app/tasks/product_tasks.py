@@ -0,0 +1,23 @@
+"""
+商品异步任务
+============
+"""
+import asyncio
+
+from ..core.celery import celery_app
+from ..core.database import TaskSessionLocal
+from ..core.redis import close_redis
+from ..services.product_service import flush_product_counters
+
+
+@celery_app.task(name="app.tasks.product_tasks.flush_product_counters")
+def flush_counters() -> int:
+    """将缓冲的商品浏览/收藏计数写回数据库（同步包装异步）。"""
+    async def _run() -> int:
+        try:
+            async with TaskSessionLocal() as db:
+                return await flush_product_counters(db)
+        finally:
+            # Redis 连接绑定在本次 asyncio.run 的事件循环上，结束前关闭（数据库会话使用 NullPool，不复用连接）
+            await close_redis()
+    return asyncio.run(_run())
@@ -0,0 +1,48 @@
+"""
+测试公共夹具
+============
+
+数据库相关测试需要 PostgreSQL：通过 TEST_DATABASE_URL
+（postgresql+asyncpg://...）指定测试库，未设置时跳过。
+"""
+
+import os
+from typing import AsyncGenerator
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.database import Base
+from app.models import Merchant, Order, Payment, User
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# 支付/订单测试只创建所需的表，避免依赖 ltree 等扩展
+_TABLES = [
+    User.__table__,
+    Merchant.__table__,
+    Order.__table__,
+    Payment.__table__,
+]
+
+
+@pytest.fixture
+async def db() -> AsyncGenerator[AsyncSession, None]:
+    """每个测试使用新建的表与独立的会话，结束后删除表"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL 未设置")
+    
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=_TABLES)
+        await conn.run_sync(Base.metadata.create_all, tables=_TABLES)
+    
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        await session.close()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all, tables=_TABLES)
+        await engine.dispose()
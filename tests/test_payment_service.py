@@ -0,0 +1,130 @@
+"""
+支付服务测试
+============
+
+在 PostgreSQL 上实际执行支付结果语句（CTE 中更新支付记录、外层更新订单）。
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models.order import Order, OrderStatus, PaymentStatus as OrderPaymentStatus
+from app.models.payment import Payment, PaymentStatus
+from app.models.user import User
+from app.services.payment_service import _process_payment_callback, process_payment
+
+
+async def _create_order(db, status: OrderStatus = OrderStatus.PENDING) -> Order:
+    async with db.begin():
+        user = User(email="buyer@example.com", password_hash="x")
+        db.add(user)
+        await db.flush()
+        order = Order(
+            order_number=f"ORD{user.id:08d}",
+            user_id=user.id,
+            status=status,
+            payment_status=OrderPaymentStatus.PENDING,
+            subtotal=100,
+            total_amount=100,
+        )
+        db.add(order)
+    return order
+
+
+async def _create_payment(
+    db,
+    order: Order,
+    status: PaymentStatus = PaymentStatus.PENDING,
+    created_at: datetime = None,
+) -> Payment:
+    async with db.begin():
+        payment = Payment(
+            order_id=order.id,
+            status=status.value,
+            payment_method="alipay",
+            amount_cents=10000,
+            net_amount_cents=10000,
+            created_at=created_at or datetime.utcnow(),
+        )
+        db.add(payment)
+    return payment
+
+
+async def _fetch(db, model, pk):
+    async with db.begin():
+        return (await db.execute(
+            select(model).where(model.id == pk).execution_options(populate_existing=True)
+        )).scalar_one()
+
+
+async def test_process_payment_marks_payment_and_order_paid(db):
+    order = await _create_order(db)
+    payment = await _create_payment(db, order)
+    
+    result = await process_payment(db, payment.id, "tx-1", {"status": "success"})
+    
+    assert result is not None
+    assert result.status == PaymentStatus.SUCCESS.value
+    stored = await _fetch(db, Payment, payment.id)
+    assert stored.status == PaymentStatus.SUCCESS.value
+    assert stored.gateway_transaction_id == "tx-1"
+    assert stored.paid_at is not None
+    stored_order = await _fetch(db, Order, order.id)
+    assert stored_order.status == OrderStatus.PAID
+    assert stored_order.payment_status == OrderPaymentStatus.SUCCESS
+
+
+async def test_process_payment_rejects_cancelled_order(db):
+    order = await _create_order(db, status=OrderStatus.CANCELLED)
+    payment = await _create_payment(db, order)
+    
+    assert await process_payment(db, payment.id, "tx-1", {}) is None
+    
+    stored = await _fetch(db, Payment, payment.id)
+    assert stored.status == PaymentStatus.PENDING.value
+    stored_order = await _fetch(db, Order, order.id)
+    assert stored_order.status == OrderStatus.CANCELLED
+
+
+async def test_callback_success_updates_only_newest_pending_payment(db):
+    order = await _create_order(db)
+    failed = await _create_payment(db, order, PaymentStatus.FAILED)
+    older = await _create_payment(
+        db, order, created_at=datetime.utcnow() - timedelta(minutes=5)
+    )
+    newest = await _create_payment(db, order)
+    
+    assert await _process_payment_callback(
+        db, order.id, {"status": "success", "transaction_id": "tx-2"}
+    )
+    
+    assert (await _fetch(db, Payment, newest.id)).status == PaymentStatus.SUCCESS.value
+    assert (await _fetch(db, Payment, older.id)).status == PaymentStatus.PENDING.value
+    assert (await _fetch(db, Payment, failed.id)).status == PaymentStatus.FAILED.value
+    stored_order = await _fetch(db, Order, order.id)
+    assert stored_order.status == OrderStatus.PAID
+    assert stored_order.payment_status == OrderPaymentStatus.SUCCESS
+
+
+async def test_callback_failure_marks_payment_failed(db):
+    order = await _create_order(db)
+    payment = await _create_payment(db, order)
+    
+    assert await _process_payment_callback(
+        db, order.id, {"status": "failed", "transaction_id": "tx-3"}
+    )
+    
+    stored = await _fetch(db, Payment, payment.id)
+    assert stored.status == PaymentStatus.FAILED.value
+    assert stored.failed_at is not None
+    assert (await _fetch(db, Order, order.id)).payment_status == OrderPaymentStatus.FAILED
+
+
+async def test_callback_already_processed_is_idempotent(db):
+    order = await _create_order(db)
+    await _create_payment(db, order, PaymentStatus.SUCCESS)
+    
+    assert await _process_payment_callback(
+        db, order.id, {"status": "success", "transaction_id": "tx-4"}
+    )